@@ -1,139 +1,424 @@
-import RPi.GPIO as GPIO
 from sensors.touch import TouchSensor, TouchType
 from sensors.temperature import DHT11Sensor
 from sensors.camera import CameraSensor
+from sensors.gps import GPSReader
 from services.gemini import GeminiHandler
-from gtts import gTTS
+from services.tts_cache import TTSCache
 from services.wit import WitAiClient,IntentType
+from services.vad import EnergyVad
+from services.registry import ResourceRegistry
+from services.scene_cache import SceneCache, dhash
+from services.response_cache import ResponseCache
+from services.speculation import Speculator
+from services.aio import get_runner
+from services.http_pool import TTS_URL
+from services.sound_bank import SoundBank, init_mixer
+from services.timeseries import TimeSeriesStore
+from services.poi_index import PoiIndex
+from services.text_regions import prepare_text_upload
 import pygame
 import os
 import re
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
 
 class ApplicationState:
     def __init__(self):
         self.is_recording = False
+        self.lock = threading.Lock()
 
 
-def explore_scene(gemini_key):
+SCENE_PROMPT = (
+    "Describe this scene as if narrating to someone who can't see it. "
+    "Be detailed but natural, avoiding any mention of an image. "
+    "Use only elements present in the scene. Keep your description "
+    "concise, under 100 words, while capturing the essence of what's visible."
+)
+
+CURRENCY_PROMPT = (
+    "Analyze the image and identify the currency. Provide the name of the currency and its denomination."
+    "If there are multiple currencies, provide details for each one."
+)
+
+READ_TEXT_PROMPT = (
+    "Read out the text in this image exactly as written, in reading order. "
+    "Do not describe the image or add commentary. If no text is legible, say so briefly."
+)
+
+
+def print_capture_latency(captured, gemini, start):
+    """Report payload size and latency of a vision request"""
+    first_audio = gemini.metrics.get("time_to_first_audio")
+    print(
+        f"Vision request: {len(captured.jpeg)} bytes ({captured.width}x{captured.height}), "
+        f"capture {captured.capture_ms:.0f} ms, encode {captured.encode_ms:.0f} ms, "
+        f"first audio after {(first_audio or 0) * 1000:.0f} ms, total {time.time() - start:.2f}s"
+    )
+
+
+def describe_image(gemini, scene_cache, captured, prompt):
+    """Narrate the model's answer for a frame, replaying it for a near-identical scene"""
+    start = time.time()
+    frame_hash = dhash(captured.pixels)
+    cached = scene_cache.lookup(frame_hash, prompt)
+    if cached:
+        print(f"Scene cache hit: {scene_cache.stats()}")
+        gemini.speak(cached.text)
+        return
+    text = gemini.generate_with_tts(prompt, image=captured.jpeg)
+    # A failed or interrupted answer would be replayed for every similar frame
+    if gemini.metrics.get("complete"):
+        scene_cache.store(frame_hash, prompt, text, time.time() - start)
+
+
+def explore_scene(camera, gemini, scene_cache, captured=None):
     try:
-        CameraSensor().capture("image.jpg")
+        start = time.time()
+        if captured is None:
+            captured = camera.capture_jpeg()
         print("Image captured")
-        print(f"Gemini Key: {gemini_key}")
-        gemini = GeminiHandler(api_key=gemini_key)
-        gemini.generate_with_tts(
-            "Describe this scene as if narrating to someone who can't see it. "
-            "Be detailed but natural, avoiding any mention of an image. "
-            "Use only elements present in the scene. Keep your description "
-            "concise, under 100 words, while capturing the essence of what's visible.",
-            image_path="image.jpg",
-        )
+        describe_image(gemini, scene_cache, captured, SCENE_PROMPT)
+        print_capture_latency(captured, gemini, start)
         print("Text to speech completed")
     except Exception as e:
         print(f"Error in explore_scene: {str(e)}")
 
-def handle_currency_intent():
+def handle_currency_intent(camera, gemini, scene_cache, early_capture=None):
     try:
-        CameraSensor().capture("image.jpg")
+        start = time.time()
+        if early_capture:
+            # Capture was started silently when the partial transcript showed
+            # this intent, the shutter sound waits until it is confirmed
+            captured = early_capture.result()
+            camera.play_capture_sound()
+        else:
+            captured = camera.capture_jpeg()
         print("Image captured")
-        gemini = GeminiHandler(api_key=os.environ.get("API_KEY"))
-        gemini.generate_with_tts(
-            "Analyze the image and identify the currency. Provide the name of the currency and its denomination."
-            "If there are multiple currencies, provide details for each one.",
-            image_path="image.jpg",
-        );
+        describe_image(gemini, scene_cache, captured, CURRENCY_PROMPT)
+        print_capture_latency(captured, gemini, start)
         print("Text to speech completed")
 
     except Exception as e:
         print(f"Error handling currency intent: {str(e)}")
 
-def handle_gpt_intent(transcript: str):
+def handle_gpt_intent(transcript: str, gemini, response_cache):
     try:
-        prompt = transcript.replace(r"Hey Visio", "").strip();
-        print(f"Prompt: {prompt}")
-        gemini = GeminiHandler(api_key=os.environ.get("API_KEY"))
-        gemini.generate_with_tts(f"Generate text based on the provided prompt. Remove any phrases like 'ask visio' or 'hey visio.' Ensure the text is concise (under 100 words unless otherwise specified). Avoid introductory phrases such as 'here is the generated text.' prompt: {prompt}")
+        start = time.time()
+        cached = response_cache.lookup(transcript)
+        if cached:
+            print(f"Response cache hit for: {cached.prompt}")
+            gemini.speak(cached.text)
+        else:
+            prompt = transcript.replace(r"Hey Visio", "").strip();
+            print(f"Prompt: {prompt}")
+            text = gemini.generate_with_tts(f"Generate text based on the provided prompt. Remove any phrases like 'ask visio' or 'hey visio.' Ensure the text is concise (under 100 words unless otherwise specified). Avoid introductory phrases such as 'here is the generated text.' prompt: {prompt}")
+            if gemini.metrics.get("complete"):
+                response_cache.store(transcript, text, time.time() - start)
+        first_audio = gemini.metrics.get("time_to_first_audio")
+        if first_audio is not None:
+            response_cache.observe(cached is not None, first_audio)
+        print(f"Response cache: {response_cache.stats()}")
         print("Text to speech completed");
     except Exception as e:
         print(f"Error handling GPT intent: {str(e)}")
 
 
-def create_touch_handler(state, wit_client):
+def handle_temperature_intent(dht11, gemini):
+    """Speak the latest sampled reading, never waiting on the sensor"""
+    reading = dht11.fresh_reading()
+    if reading is None:
+        stale = dht11.latest
+        if stale is None:
+            gemini.speak("The temperature sensor is still warming up, please try again in a few seconds")
+        else:
+            print(f"Last temperature reading is {stale.age:.0f}s old, sensor not responding")
+            gemini.speak("The temperature sensor is not responding right now, so I can't tell the current temperature")
+        return
+    print(f"Temperature: {reading.temperature}°C, Humidity: {reading.humidity}%, {reading.age:.0f}s old")
+    gemini.speak(
+        f"The temperature is {reading.temperature:.0f} degrees Celsius "
+        f"and humidity is {reading.humidity:.0f} percent"
+    )
+
+COMPASS_POINTS = ["north", "north-east", "east", "south-east", "south", "south-west", "west", "north-west"]
+
+
+def describe_pois(pois):
+    """Turn nearby places into a sentence for the TTS path"""
+    parts = []
+    for poi in pois:
+        direction = COMPASS_POINTS[int((poi.bearing + 22.5) % 360 // 45)]
+        parts.append(f"{poi.name}, a {poi.category}, {poi.distance:.0f} meters {direction}")
+    return "Nearby: " + ". ".join(parts) + "."
+
+def handle_maps_intent(gps, poi_index, gemini):
+    """Answer "what's near me" from the offline index and the current fix"""
+    if poi_index is None:
+        gemini.speak("No offline map is installed")
+        return
+    # has_fix also rejects a fix the reader has not refreshed for a few
+    # seconds, so a lost signal never answers for an old position
+    fix = gps.fix
+    if fix is None or not fix.has_fix:
+        if fix is not None and fix.latitude is not None:
+            print(f"GPS fix is {fix.age:.0f}s old")
+            gemini.speak("My location is unavailable right now, the GPS signal was lost")
+        else:
+            gemini.speak("I don't have a GPS fix yet, please try again outside")
+        return
+    start = time.time()
+    pois = poi_index.nearest(fix.latitude, fix.longitude, k=5, max_distance=1000)
+    print(f"POI lookup: {len(pois)} results in {(time.time() - start) * 1000:.1f} ms")
+    if not pois:
+        gemini.speak("I couldn't find any places within a kilometer")
+        return
+    gemini.speak(describe_pois(pois))
+
+def handle_read_text_intent(camera, gemini):
+    """
+    Read text aloud, uploading only cleaned-up crops of the text regions
+
+    Falls back to the full frame when no text regions are found, or always
+    with READ_TEXT_FULL_FRAME=1 to compare the two on the device.
+    """
+    try:
+        start = time.time()
+        frame = camera.capture_frame()
+        captured_ms = (time.time() - start) * 1000
+        upload = None
+        if os.environ.get("READ_TEXT_FULL_FRAME") != "1":
+            upload = prepare_text_upload(frame)
+        if upload is None:
+            print("Reading text from the full frame")
+            captured = camera.encode_jpeg(frame, capture_ms=captured_ms)
+            gemini.generate_with_tts(READ_TEXT_PROMPT, image=captured.jpeg)
+            print_capture_latency(captured, gemini, start)
+            return
+        gemini.generate_with_tts(READ_TEXT_PROMPT, image=upload.data, image_mime=upload.mime_type)
+        # Encoded only for the log, to show what the crops saved
+        full_size = len(camera.encode_jpeg(frame).jpeg)
+        first_audio = gemini.metrics.get("time_to_first_audio")
+        print(
+            f"Text crops: {len(upload.regions)} regions, {len(upload.data)} bytes vs {full_size} full frame "
+            f"({full_size - len(upload.data)} saved), capture {captured_ms:.0f} ms, "
+            f"prepare {upload.prepare_ms:.0f} ms, first audio after {(first_audio or 0) * 1000:.0f} ms, "
+            f"total {time.time() - start:.2f}s"
+        )
+    except Exception as e:
+        print(f"Error handling read text intent: {str(e)}")
+
+def create_touch_handler(state, wit_client, registry):
+    executor = ThreadPoolExecutor(max_workers=2)
+    speculator = Speculator(executor)
+
+    def start_early_work(intent, early_work):
+        """Start sensor work for an intent before the final transcript arrives"""
+        if intent == IntentType.CURRENCY:
+            # Silent until the final intent confirms it, it may go unused
+            early_work[intent] = executor.submit(lambda: registry.get("camera").capture_jpeg(play_sound=False))
+
+    def finish_recording():
+        """Stop recording, send the audio to Wit.ai and handle the intent"""
+        with state.lock:
+            if not state.is_recording:
+                return
+            state.is_recording = False
+        audio_file = wit_client.stop()
+        registry.get("sound_bank").play("start")
+        early_work = {}
+        intent, data, transcript, result = wit_client.process_audio(
+            audio_file,
+            on_early_intent=lambda early: start_early_work(early, early_work),
+        )
+        print(f"Intent: {intent}")
+        print(f"Data: {data}")
+        print(f"Transcript: {transcript}")
+        print(f"Result: {result}")
+        print(f"HTTP connections: {get_runner().http.stats()}")
+        
+        print("Recording stopped")
+        if intent == IntentType.GPT:
+            handle_gpt_intent(transcript, registry.get("gemini"), registry.get("response_cache"))
+        elif intent == IntentType.CURRENCY:
+            handle_currency_intent(
+                registry.get("camera"), registry.get("gemini"), registry.get("scene_cache"), early_work.get(intent)
+            );
+        elif intent == IntentType.TEMPERATURE:
+            handle_temperature_intent(registry.get("dht11"), registry.get("gemini"))
+        elif intent == IntentType.MAPS:
+            try:
+                poi_index = registry.get("poi_index")
+            except FileNotFoundError:
+                poi_index = None
+            handle_maps_intent(registry.get("gps"), poi_index, registry.get("gemini"))
+        elif intent == IntentType.READ_TEXT:
+            handle_read_text_intent(registry.get("camera"), registry.get("gemini"))
+
+    def on_auto_stop():
+        try:
+            print("End of speech detected")
+            finish_recording()
+        except Exception as e:
+            print(f"Error in touch handler: {str(e)}")
+
+    def on_press():
+        # Any new touch interrupts the current narration. This runs on the
+        # gesture timer thread, so never build or wait for a warming handler:
+        # if it is not built yet there is nothing to interrupt
+        gemini = registry.peek("gemini")
+        if gemini is not None:
+            gemini.stop_speaking()
+        # A single touch is only known half a second after release, so start
+        # the capture now and throw it away if the gesture is something else
+        if not state.is_recording:
+            speculator.start(lambda: registry.get("camera").capture_jpeg(play_sound=False))
+
     def on_touch(props):
         try:
-            print("Is recording: ", state.is_recording)
+            # Read once: the VAD's auto-stop thread can change it at any time
+            recording = state.is_recording
+            print("Is recording: ", recording)
+
+            if props == TouchType.SINGLE and not recording:
+                camera = registry.get("camera")
+                captured = speculator.claim()
+                if captured is not None:
+                    camera.play_capture_sound()
+                    print(f"Speculative capture used: {speculator.stats()}")
+            else:
+                speculator.discard()
 
             if props == TouchType.SINGLE:
                 print("Single touch detected")
-                if state.is_recording:
-                    state.is_recording = False
-                    audio_file = wit_client.stop()
-                    play_sound("assets/sfx/start.mp3")
-                    intent, data, transcript, result = wit_client.process_audio(
-                        audio_file
-                    )
-                    print(f"Intent: {intent}")
-                    print(f"Data: {data}")
-                    print(f"Transcript: {transcript}")
-                    print(f"Result: {result}")
-                    
-                    print("Recording stopped")
-                    if intent == IntentType.GPT:
-                        handle_gpt_intent(transcript)
-                    elif intent == IntentType.CURRENCY:
-                        handle_currency_intent();
-                    elif intent == IntentType.TEMPERATURE:
-                        temperature, humidity = DHT11Sensor().read_sensor()
-                        print(f"Temperature: {temperature}°C, Humidity: {humidity}%")
-                        gTTS(f"The temperature is {temperature} degrees Celsius and humidity is {humidity} percent", lang="en").save("output.mp3")
-                        play_sound("output.mp3")
-                        
+                if recording:
+                    finish_recording()
                 else:
-                    explore_scene(os.environ.get("API_KEY"))
+                    explore_scene(camera, registry.get("gemini"), registry.get("scene_cache"), captured)
 
             elif props == TouchType.DOUBLE:
                 print("Double touch detected")
-                wit_client.record(timeout=10)
-                state.is_recording = True
-                play_sound("assets/sfx/end.mp3")
+                with state.lock:
+                    state.is_recording = True
+                wit_client.record(timeout=10, on_auto_stop=on_auto_stop)
+                registry.get("sound_bank").play("end")
 
             print(f"Touch Detected {props}")
 
         except Exception as e:
             print(f"Error in touch handler: {str(e)}")
 
-    return on_touch
+    return on_touch, on_press
 
 
-def play_sound(sound_file):
-    try:
-        pygame.mixer.music.load(sound_file)
-        pygame.mixer.music.play()
-    except Exception as e:
-        print(f"Error playing sound: {str(e)}")
+def create_camera(sound_bank):
+    camera = CameraSensor(sound_bank=sound_bank)
+    if os.environ.get("CAMERA_PRECAPTURE") == "1":
+        # Trade some idle CPU for an instant frame on every vision intent
+        camera.start_background()
+    return camera
+
+
+def create_climate_history():
+    # A week of readings at the DHT11's 2 s sampling interval, about 5 MB on disk
+    return TimeSeriesStore(
+        os.path.expanduser("~/.cache/visio/climate.ts"), ["temperature", "humidity"], capacity=7 * 24 * 1800
+    )
+
+
+def create_dht11(history):
+    sensor = DHT11Sensor(history=history)
+    sensor.start_background()
+    return sensor
+
+
+def gps_port():
+    return os.environ.get("GPS_PORT", "/dev/ttyUSB0")
+
+
+def create_gps_history():
+    # Two days of 1 Hz fixes, about 6 MB on disk
+    return TimeSeriesStore(
+        os.path.expanduser("~/.cache/visio/track.ts"), ["latitude", "longitude", "altitude"],
+        capacity=2 * 24 * 3600, value_dtype="<f8",
+    )
+
+
+def create_gps(history):
+    gps = GPSReader(port=gps_port(), history=history)
+    # Keep the latest fix current so location lookups never wait on the receiver
+    gps.start()
+    return gps
+
+
+def create_poi_index():
+    # Built with: python -m services.poi_index build <extract.osm> ~/.cache/visio/poi
+    return PoiIndex.load(os.environ.get("POI_INDEX", os.path.expanduser("~/.cache/visio/poi")))
+
+
+def create_registry():
+    """Register the services shared by every touch handler"""
+    registry = ResourceRegistry()
+    registry.register("sound_bank", SoundBank, close=lambda bank: bank.close())
+    registry.register("tts_cache", TTSCache)
+    registry.register("scene_cache", SceneCache)
+    registry.register("response_cache", ResponseCache, close=lambda cache: cache.close())
+    registry.register("climate_history", create_climate_history, close=lambda store: store.close())
+    registry.register("dht11", lambda: create_dht11(registry.get("climate_history")), close=lambda sensor: sensor.close())
+    registry.register("gps_history", create_gps_history, close=lambda store: store.close())
+    registry.register("gps", lambda: create_gps(registry.get("gps_history")), close=lambda gps: gps.stop())
+    registry.register("poi_index", create_poi_index)
+    registry.register("camera", lambda: create_camera(registry.get("sound_bank")), close=lambda camera: camera.close())
+    registry.register(
+        "gemini",
+        lambda: GeminiHandler(
+            api_key=os.environ.get("API_KEY"),
+            tts_cache=registry.get("tts_cache"),
+            sound_bank=registry.get("sound_bank"),
+        ),
+        close=lambda gemini: gemini.close(),
+    )
+    return registry
 
 
 def initialize_system():
     try:
         load_dotenv()
+        # Small mixer buffer so cues start promptly, before pygame.init() opens it
+        init_mixer()
         pygame.init()
-        return DHT11Sensor()
+        registry = create_registry()
+        # Reuse connections for gTTS's per-sentence requests and open one now
+        http = get_runner().http
+        if http.install_gtts():
+            threading.Thread(target=http.warm_requests, args=(TTS_URL,), daemon=True).start()
+        # Camera start-up dominates the first touch, so build everything now
+        warm = ["sound_bank", "tts_cache", "dht11", "camera", "gemini"]
+        if os.path.exists(gps_port()):
+            # A receiver is attached, start acquiring a fix now
+            warm.append("gps")
+        registry.warm(warm)
+        return registry
     except Exception as e:
         print(f"Error initializing system: {str(e)}")
         return None
 
 
 def main():
+    registry = None
+    touch_sensor = None
     try:
-        dht11 = initialize_system()
-        print(f"Temperature: {dht11.get_temperature()}")
+        registry = initialize_system()
+        print(f"Temperature: {registry.get('dht11').get_temperature()} (sampling in the background)")
         state = ApplicationState()
-        wit_client = WitAiClient(wit_api_key=os.environ.get("WIT_API_KEY"))
+        wit_client = WitAiClient(
+            wit_api_key=os.environ.get("WIT_API_KEY"), streaming=True, vad=EnergyVad()
+        )
 
-        touch_handler = create_touch_handler(state, wit_client)
-        touch_sensor = TouchSensor(17, touch_handler)
+        touch_handler, press_handler = create_touch_handler(state, wit_client, registry)
+        touch_sensor = TouchSensor(17, touch_handler, press_callback=press_handler)
 
         print("Touch sensor is ready! Press Ctrl+C to exit")
         print("Waiting for touches...")
@@ -145,7 +430,11 @@ def main():
     except Exception as e:
         print(f"Error in main: {str(e)}")
     finally:
-        GPIO.cleanup()
+        if touch_sensor:
+            touch_sensor.cleanup()
+        if registry:
+            registry.shutdown()
+        get_runner().close()
         pygame.quit()
 
 
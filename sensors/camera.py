@@ -1,16 +1,257 @@
-from picamzero import Camera
-import pygame;
 import os;
+import io;
+import time;
+import threading;
+from collections import deque
+from typing import Any, NamedTuple, Optional, Sequence
+from PIL import Image
+import numpy as np
+
+
+class CapturedImage(NamedTuple):
+    jpeg: bytes
+    width: int
+    height: int
+    capture_ms: float
+    encode_ms: float
+    pixels: Any = None  # Downscaled RGB frame as a numpy array
+
+
+class FileCameraBackend:
+    """
+    Camera backend that serves stored images in turn, for testing without a
+    camera attached
+    """
+
+    def __init__(self, paths: Sequence[str]):
+        self.paths = list(paths)
+        self.index = 0
+
+    def _next_path(self):
+        path = self.paths[self.index % len(self.paths)]
+        self.index += 1
+        return path
+
+    def capture_array(self):
+        with Image.open(self._next_path()) as img:
+            return np.asarray(img.convert('RGB'))
+
+    def take_photo(self, filename):
+        with Image.open(self._next_path()) as img:
+            img.convert('RGB').save(filename)
+
+    def close(self):
+        pass
+
+
 class CameraSensor:
-    def __init__(self):
-        self.camera = Camera()
+    def __init__(self, backend=None, max_size: int = 768, jpeg_quality: int = 80, sound_bank=None):
+        """
+        Initialize the camera
 
-    def capture(self, filename):
-        # self.camera.start_preview();
-        self.camera.take_photo(filename);
+        Args:
+            backend: Object with picamzero's take_photo/capture_array/close
+                interface, a picamzero Camera by default
+            max_size (int): Longest side in pixels of images sent to the vision model
+            jpeg_quality (int): JPEG quality of images sent to the vision model
+            sound_bank (SoundBank, optional): Plays the preloaded shutter cue
+        """
+        if backend is None:
+            # Imported here so other backends work without the Pi camera stack
+            from picamzero import Camera
+            backend = Camera()
+        self.camera = backend
+        self.max_size = max_size
+        self.jpeg_quality = jpeg_quality
+        self.sound_bank = sound_bank
+        self.last_capture = None
+        self._lock = threading.Lock()
+
+        # Background pre-capture state
+        self._ring = deque(maxlen=1)
+        self._frame_ready = threading.Condition()
+        self._background_thread = None
+        self._background_stop = threading.Event()
+        self.max_frame_age = 0.5
+        self.background_metrics = {}
+
+    def start_background(self, interval: float = 0.5, ring_size: int = 2, max_frame_age: float = 1.0,
+                         store_max_size: Optional[int] = None):
+        """
+        Keep capturing frames on a background thread so capture_jpeg() can
+        return a recent frame without waiting for the camera
+
+        Args:
+            interval (float): Seconds between background captures
+            ring_size (int): Number of recent frames kept
+            max_frame_age (float): Oldest frame capture_jpeg() will use before
+                waiting for the next one
+            store_max_size (int, optional): Downscale stored frames to this
+                longest side to save memory, at some CPU cost
+        """
+        if self._background_thread:
+            return
+        self._ring = deque(maxlen=ring_size)
+        self.max_frame_age = max_frame_age
+        self._background_stop.clear()
+        self.background_metrics = {
+            'frames': 0,
+            'cpu_seconds': 0.0,
+            'started': time.time(),
+            'ring_bytes': 0,
+        }
+        self._background_thread = threading.Thread(
+            target=self._background_loop,
+            args=(interval, store_max_size),
+            daemon=True
+        )
+        self._background_thread.start()
+
+    def stop_background(self):
+        """Stop the background capture thread and drop stored frames"""
+        if not self._background_thread:
+            return
+        self._background_stop.set()
+        self._background_thread.join()
+        self._background_thread = None
+        self._ring.clear()
+
+    def _background_loop(self, interval, store_max_size):
+        """Internal loop that fills the ring of recent frames"""
+        while not self._background_stop.is_set():
+            cpu_start = time.thread_time()
+            try:
+                with self._lock:
+                    frame = self.camera.capture_array()
+                if store_max_size:
+                    img = Image.fromarray(frame)
+                    img.thumbnail((store_max_size, store_max_size), Image.BILINEAR)
+                    frame = np.asarray(img)
+                with self._frame_ready:
+                    self._ring.append((time.time(), frame))
+                    self._frame_ready.notify_all()
+                metrics = self.background_metrics
+                metrics['frames'] += 1
+                metrics['cpu_seconds'] += time.thread_time() - cpu_start
+                metrics['ring_bytes'] = sum(f.nbytes for _, f in self._ring)
+            except Exception as e:
+                print(f"Background capture error: {str(e)}")
+            self._background_stop.wait(interval)
+
+    def background_stats(self) -> dict:
+        """
+        Get the cost of the background capture loop
+
+        Returns:
+            dict: frames captured, CPU seconds, CPU share of one core and ring memory
+        """
+        metrics = dict(self.background_metrics)
+        if metrics:
+            elapsed = time.time() - metrics['started']
+            metrics['cpu_percent'] = 100 * metrics['cpu_seconds'] / elapsed if elapsed else 0.0
+        return metrics
+
+    def _recent_frame(self, timeout: float = 5.0):
+        """Return the newest ring frame, waiting for a new one if it is too old"""
+        deadline = time.time() + timeout
+        with self._frame_ready:
+            while True:
+                if self._ring:
+                    timestamp, frame = self._ring[-1]
+                    if time.time() - timestamp <= self.max_frame_age:
+                        return frame
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None
+                self._frame_ready.wait(remaining)
+
+    def play_capture_sound(self):
+        if self.sound_bank:
+            self.sound_bank.play('capture')
+            return
+        import pygame  # Only needed without a sound bank
         sound = pygame.mixer.Sound(os.path.join('assets','sfx','capture.mp3'));
         sound.play();
-    
+
+    def capture(self, filename):
+        # self.camera.start_preview();
+        with self._lock:
+            self.camera.take_photo(filename);
+        self.play_capture_sound()
+
+    def capture_frame(self, play_sound: bool = True):
+        """
+        Capture a full-resolution frame straight from the camera, for work
+        like reading text that needs more detail than the upload size keeps.
+        Background frames are not used as they may be stored downscaled.
+
+        Returns:
+            np.ndarray: RGB frame
+        """
+        with self._lock:
+            frame = self.camera.capture_array()
+        if play_sound:
+            self.play_capture_sound()
+        return frame
+
+    def encode_jpeg(self, frame, max_size: Optional[int] = None, quality: Optional[int] = None,
+                    capture_ms: float = 0.0) -> CapturedImage:
+        """
+        Downscale and compress a frame for upload
+
+        Args:
+            frame (np.ndarray): RGB frame
+            max_size (int, optional): Longest side in pixels, defaults to self.max_size
+            quality (int, optional): JPEG quality, defaults to self.jpeg_quality
+            capture_ms (float): Capture time to record with the image
+
+        Returns:
+            CapturedImage: Encoded JPEG bytes with its size and timings
+        """
+        max_size = max_size or self.max_size
+        quality = quality or self.jpeg_quality
+
+        start = time.time()
+        img = Image.fromarray(frame).convert('RGB')
+        img.thumbnail((max_size, max_size), Image.BILINEAR)
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=quality)
+        return CapturedImage(
+            jpeg=out.getvalue(),
+            width=img.width,
+            height=img.height,
+            capture_ms=capture_ms,
+            encode_ms=(time.time() - start) * 1000,
+            pixels=np.asarray(img),
+        )
+
+    def capture_jpeg(self, max_size: Optional[int] = None, quality: Optional[int] = None,
+                     play_sound: bool = True) -> CapturedImage:
+        """
+        Capture a frame in memory, downscaled and recompressed for upload
+
+        Args:
+            max_size (int, optional): Longest side in pixels, defaults to self.max_size
+            quality (int, optional): JPEG quality, defaults to self.jpeg_quality
+            play_sound (bool): Play the shutter sound, off for speculative captures
+
+        Returns:
+            CapturedImage: Encoded JPEG bytes with its size and timings
+        """
+        start = time.time()
+        frame = self._recent_frame() if self._background_thread else None
+        if frame is None:
+            with self._lock:
+                frame = self.camera.capture_array()
+        captured = time.time()
+        if play_sound:
+            self.play_capture_sound()
+
+        self.last_capture = captured = self.encode_jpeg(frame, max_size, quality, (captured - start) * 1000)
+        print(f"Captured {captured.width}x{captured.height}, {len(captured.jpeg)} bytes, "
+              f"capture {captured.capture_ms:.0f} ms, encode {captured.encode_ms:.0f} ms")
+        return captured
 
     def close(self):
+        self.stop_background()
         self.camera.close()
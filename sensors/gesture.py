@@ -0,0 +1,270 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from enum import Enum
+from typing import Callable, Optional
+
+
+class TouchType(Enum):
+    SINGLE = "single"
+    DOUBLE = "double"
+    TRIPLE = "triple"
+    LONG = "long"
+    HOLD_RELEASE = "hold_release"
+
+
+class TimerScheduler:
+    """
+    One thread that runs posted tasks and timers from a heap, in order.
+
+    Everything scheduled here runs on the same thread, so the state it
+    touches needs no locks.
+    """
+
+    def __init__(self, name: str = "gesture-scheduler"):
+        self._heap = []
+        self._counter = itertools.count()
+        self._cancelled = set()
+        self._condition = threading.Condition()
+        self._running = True
+        # Largest delay between a timer's deadline and when it ran
+        self.max_lateness = 0.0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def call_at(self, deadline: float, fn: Callable[[], None]) -> int:
+        """
+        Run fn at a time on the monotonic clock
+
+        Returns:
+            int: Handle for cancel()
+        """
+        with self._condition:
+            handle = next(self._counter)
+            heapq.heappush(self._heap, (deadline, handle, fn))
+            self._condition.notify()
+            return handle
+
+    def call_later(self, delay: float, fn: Callable[[], None]) -> int:
+        return self.call_at(time.monotonic() + delay, fn)
+
+    def post(self, fn: Callable[[], None]) -> int:
+        """Run fn on the scheduler thread as soon as possible"""
+        return self.call_at(0.0, fn)
+
+    def cancel(self, handle: Optional[int]):
+        if handle is None:
+            return
+        with self._condition:
+            self._cancelled.add(handle)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running:
+                    if self._heap:
+                        timeout = self._heap[0][0] - time.monotonic()
+                        if timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    else:
+                        self._condition.wait()
+                if not self._running:
+                    return
+                deadline, handle, fn = heapq.heappop(self._heap)
+                if handle in self._cancelled:
+                    self._cancelled.discard(handle)
+                    continue
+
+            if deadline:
+                self.max_lateness = max(self.max_lateness, time.monotonic() - deadline)
+            try:
+                fn()
+            except Exception as e:
+                print(f"Error in gesture scheduler: {str(e)}")
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+
+
+class GestureRecognizer:
+    """
+    Deterministic tap/hold state machine driven by timestamped edges.
+
+    Edges and timers are handled on one TimerScheduler thread. Gestures are
+    delivered to the callback through a single dispatch queue and thread,
+    so a slow handler delays later gestures but never the recognition of
+    them. Press callbacks run directly on the scheduler thread as soon as a
+    touch starts and must return quickly.
+
+    Taps counted on touch-down: reaching max_taps fires at once, fewer taps
+    fire once double_click_time passes without another touch. Holding past
+    long_press_time fires LONG, and releasing after that fires HOLD_RELEASE.
+    """
+
+    IDLE = "idle"
+    PRESSED = "pressed"
+    RELEASED = "released"
+    HOLDING = "holding"
+
+    TAP_GESTURES = {1: TouchType.SINGLE, 2: TouchType.DOUBLE, 3: TouchType.TRIPLE}
+
+    def __init__(self, callback: Optional[Callable[[TouchType], None]] = None,
+                 press_callback: Optional[Callable[[], None]] = None,
+                 long_press_time: float = 1.0, double_click_time: float = 0.5, max_taps: int = 2):
+        """
+        Args:
+            callback (callable, optional): Called with each recognised TouchType
+            press_callback (callable, optional): Called on every touch-down
+            long_press_time (float): Seconds held before LONG fires
+            double_click_time (float): Seconds allowed between taps of one gesture
+            max_taps (int): Taps that complete a gesture immediately, 2 or 3
+        """
+        self.callback = callback
+        self.press_callback = press_callback
+        self.long_press_time = long_press_time
+        self.double_click_time = double_click_time
+        self.max_taps = max_taps
+
+        self.state = self.IDLE
+        self.taps = 0
+        self.last_press = 0.0
+        self._long_timer = None
+        self._tap_timer = None
+
+        self.scheduler = TimerScheduler()
+        self._dispatch_queue = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch, name="gesture-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def post_edge(self, pressed: bool, timestamp: Optional[float] = None):
+        """Feed an edge from any thread, timestamp on the monotonic clock"""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        self.scheduler.post(lambda: self._on_edge(pressed, timestamp))
+
+    def _emit(self, touch_type: TouchType, timestamp: float):
+        self._dispatch_queue.put((touch_type, timestamp))
+
+    def _dispatch(self):
+        while True:
+            item = self._dispatch_queue.get()
+            if item is None:
+                return
+            touch_type, _ = item
+            if self.callback:
+                try:
+                    self.callback(touch_type)
+                except Exception as e:
+                    print(f"Error in touch callback: {str(e)}")
+
+    def _on_edge(self, pressed: bool, timestamp: float):
+        if pressed:
+            self._on_press(timestamp)
+        else:
+            self._on_release(timestamp)
+
+    def _on_press(self, timestamp: float):
+        if self.state in (self.PRESSED, self.HOLDING):
+            return  # Repeated level
+        if self.press_callback:
+            try:
+                self.press_callback()
+            except Exception as e:
+                print(f"Error in press callback: {str(e)}")
+
+        self.scheduler.cancel(self._tap_timer)
+        self._tap_timer = None
+        if self.state == self.RELEASED and timestamp - self.last_press < self.double_click_time:
+            self.taps += 1
+        else:
+            if self.state == self.RELEASED:
+                # The tap timer was due before this edge but had not run yet
+                self._emit(self.TAP_GESTURES[self.taps], self.last_press + self.double_click_time)
+            self.taps = 1
+        self.last_press = timestamp
+        self.state = self.PRESSED
+
+        if self.taps >= self.max_taps:
+            self._emit(self.TAP_GESTURES[self.max_taps], timestamp)
+            self.taps = 0
+            return
+        self._long_timer = self.scheduler.call_at(timestamp + self.long_press_time, self._on_long_press)
+
+    def _on_release(self, timestamp: float):
+        if self.state == self.HOLDING:
+            self._emit(TouchType.HOLD_RELEASE, timestamp)
+            self.state = self.IDLE
+            return
+        if self.state != self.PRESSED:
+            return
+        self.scheduler.cancel(self._long_timer)
+        self._long_timer = None
+        if self.taps and timestamp - self.last_press >= self.long_press_time:
+            # The long press timer was due before this edge but had not run yet
+            self._emit(TouchType.LONG, self.last_press + self.long_press_time)
+            self._emit(TouchType.HOLD_RELEASE, timestamp)
+            self.state = self.IDLE
+            self.taps = 0
+            return
+        if self.taps == 0:
+            # Release of a press that already completed a gesture
+            self.state = self.IDLE
+            return
+        self.state = self.RELEASED
+        self._tap_timer = self.scheduler.call_at(self.last_press + self.double_click_time, self._on_tap_timeout)
+
+    def _on_long_press(self):
+        self._long_timer = None
+        if self.state != self.PRESSED:
+            return
+        self._emit(TouchType.LONG, self.last_press + self.long_press_time)
+        self.state = self.HOLDING
+        self.taps = 0
+
+    def _on_tap_timeout(self):
+        self._tap_timer = None
+        if self.state != self.RELEASED:
+            return
+        self._emit(self.TAP_GESTURES[self.taps], self.last_press + self.double_click_time)
+        self.state = self.IDLE
+        self.taps = 0
+
+    def stop(self):
+        self.scheduler.stop()
+        self._dispatch_queue.put(None)
+        self._dispatcher.join()
+
+
+def _benchmark(taps: int = 2000, interval: float = 0.002):
+    """Feed a rapid synthetic edge stream and report threads and timer lateness"""
+    recognised = []
+    threads_before = threading.active_count()
+    recognizer = GestureRecognizer(lambda t: recognised.append(t), double_click_time=0.05, long_press_time=0.2)
+    peak_threads = threading.active_count()
+
+    start = time.monotonic()
+    for i in range(taps):
+        recognizer.post_edge(True)
+        time.sleep(interval / 2)
+        recognizer.post_edge(False)
+        time.sleep(interval / 2)
+        if i % 100 == 0:
+            peak_threads = max(peak_threads, threading.active_count())
+            time.sleep(0.1)  # Let a gesture complete now and then
+    feed_time = time.monotonic() - start
+    time.sleep(0.3)
+    recognizer.stop()
+
+    counts = {t.name: sum(1 for r in recognised if r == t) for t in TouchType}
+    print(f"{taps * 2} edges in {feed_time:.2f}s, gestures: {counts}")
+    print(f"Threads before {threads_before}, peak {peak_threads} (constant regardless of edge count)")
+    print(f"Max timer lateness {recognizer.scheduler.max_lateness * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,173 @@
+import os
+import select
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+# Called with (pressed, timestamp) for every edge, timestamp in seconds
+# on the monotonic clock
+EdgeCallback = Callable[[bool, float], None]
+
+
+class RPiGpioBackend:
+    """
+    Edge detection through RPi.GPIO's add_event_detect.
+
+    RPi.GPIO does not expose kernel timestamps, so edges are stamped when
+    its event thread runs the callback.
+    """
+
+    def __init__(self):
+        import RPi.GPIO as GPIO
+        self.GPIO = GPIO
+        self.pin = None
+
+    def start(self, pin: int, on_edge: EdgeCallback, bounce_ms: int):
+        GPIO = self.GPIO
+        self.pin = pin
+        GPIO.setmode(GPIO.BCM)  # Use BCM pin numbering
+        GPIO.setup(pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+
+        def _callback(channel):
+            on_edge(GPIO.input(channel) == GPIO.HIGH, time.monotonic())
+
+        if bounce_ms:
+            GPIO.add_event_detect(pin, GPIO.BOTH, callback=_callback, bouncetime=bounce_ms)
+        else:
+            GPIO.add_event_detect(pin, GPIO.BOTH, callback=_callback)
+
+    def read(self, pin: int) -> bool:
+        return self.GPIO.input(pin) == self.GPIO.HIGH
+
+    def stop(self):
+        if self.pin is None:
+            return
+        self.GPIO.remove_event_detect(self.pin)
+        self.GPIO.cleanup(self.pin)
+        self.pin = None
+
+
+class GpiodBackend:
+    """
+    Edge detection through the Linux GPIO character device (libgpiod v2).
+
+    The kernel debounces the line and timestamps each edge. A single thread
+    sleeps in epoll on the line request until an edge or stop() arrives.
+    """
+
+    def __init__(self, chip: str = "/dev/gpiochip0", consumer: str = "visio-touch"):
+        self.chip = chip
+        self.consumer = consumer
+        self.request = None
+        self._thread = None
+        self._wake_r = None
+        self._wake_w = None
+
+    def start(self, pin: int, on_edge: EdgeCallback, bounce_ms: int):
+        import gpiod
+        from datetime import timedelta
+        from gpiod.line import Bias, Edge
+
+        settings = gpiod.LineSettings(
+            edge_detection=Edge.BOTH,
+            bias=Bias.PULL_DOWN,
+            debounce_period=timedelta(milliseconds=bounce_ms),
+        )
+        self.request = gpiod.request_lines(self.chip, consumer=self.consumer, config={pin: settings})
+        self._wake_r, self._wake_w = os.pipe()
+        self._thread = threading.Thread(target=self._run, args=(on_edge,), daemon=True)
+        self._thread.start()
+
+    def _run(self, on_edge: EdgeCallback):
+        from gpiod import EdgeEvent
+
+        poller = select.epoll()
+        poller.register(self.request.fd, select.EPOLLIN)
+        poller.register(self._wake_r, select.EPOLLIN)
+        try:
+            while True:
+                ready = [fd for fd, _ in poller.poll()]
+                if self._wake_r in ready:
+                    return
+                for event in self.request.read_edge_events():
+                    # Edge timestamps come from CLOCK_MONOTONIC by default
+                    on_edge(event.event_type == EdgeEvent.Type.RISING_EDGE, event.timestamp_ns / 1e9)
+        finally:
+            poller.close()
+
+    def read(self, pin: int) -> bool:
+        from gpiod.line import Value
+        return self.request.get_value(pin) == Value.ACTIVE
+
+    def stop(self):
+        if self.request is None:
+            return
+        os.write(self._wake_w, b"\0")
+        self._thread.join()
+        self.request.release()
+        os.close(self._wake_r)
+        os.close(self._wake_w)
+        self.request = None
+
+
+class FakeGpioBackend:
+    """
+    Backend for tests and benchmarks: edges are injected by the caller and
+    debounced the same way the hardware backends are.
+    """
+
+    def __init__(self):
+        self.level = False
+        self.on_edge = None
+        self.bounce_ms = 0
+        self._last_edge = None
+        self._thread = None
+
+    def start(self, pin: int, on_edge: EdgeCallback, bounce_ms: int):
+        self.on_edge = on_edge
+        self.bounce_ms = bounce_ms
+
+    def inject(self, pressed: bool, timestamp: Optional[float] = None):
+        """Deliver one edge synchronously, stamped now unless a timestamp is given"""
+        timestamp = time.monotonic() if timestamp is None else timestamp
+        if self._last_edge is not None and (timestamp - self._last_edge) * 1000 < self.bounce_ms:
+            return
+        self._last_edge = timestamp
+        self.level = pressed
+        if self.on_edge:
+            self.on_edge(pressed, timestamp)
+
+    def play(self, edges: List[Tuple[float, bool]]) -> threading.Thread:
+        """
+        Deliver edges in real time from a background thread
+
+        Args:
+            edges: (delay after the previous edge in seconds, pressed) pairs
+        """
+        def _play():
+            for delay, pressed in edges:
+                time.sleep(delay)
+                self.inject(pressed)
+
+        self._thread = threading.Thread(target=_play, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def read(self, pin: int) -> bool:
+        return self.level
+
+    def stop(self):
+        if self._thread:
+            self._thread.join()
+        self.on_edge = None
+
+
+def default_backend():
+    """Prefer the character device, fall back to RPi.GPIO on older systems"""
+    try:
+        import gpiod  # noqa: F401
+        if hasattr(gpiod, "request_lines"):
+            return GpiodBackend()
+    except ImportError:
+        pass
+    return RPiGpioBackend()
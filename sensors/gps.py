@@ -1,16 +1,106 @@
 import serial
 import time
+import threading
 from datetime import datetime
-from typing import Optional, Tuple, Dict
+from typing import Optional, Tuple, Dict, NamedTuple
 import pynmea2
+from sensors.nmea import ChecksumError, parse_fix_updates
+from sensors.gps_source import SerialGpsSource
+
+# Seconds after its last sentence that a fix still counts as current
+MAX_FIX_AGE = 5.0
+
+
+class GpsFix(NamedTuple):
+    """Latest navigation state merged from GGA, RMC, VTG and GSA sentences"""
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    altitude: Optional[float] = None
+    speed_kmh: Optional[float] = None
+    course: Optional[float] = None  # Degrees from true north
+    hdop: Optional[float] = None
+    satellites: int = 0
+    quality: int = 0  # GGA fix quality, 0 means no fix
+    fix_type: int = 1  # GSA fix type: 1 none, 2 2D, 3 3D
+    fix_time: Optional[datetime] = None  # UTC time of the fix reported by the receiver
+    received: float = 0.0  # time.time() when the last sentence was applied
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last sentence was applied"""
+        return time.time() - self.received
+
+    @property
+    def has_fix(self) -> bool:
+        """A position is known and the receiver has reported within MAX_FIX_AGE"""
+        return self.quality > 0 and self.latitude is not None and self.age <= MAX_FIX_AGE
+
+    def as_dict(self) -> Dict:
+        """Dictionary in the format read_gps_data() has always returned, plus the new fields"""
+        data = self._asdict()
+        data['timestamp'] = datetime.fromtimestamp(self.received).isoformat()
+        return data
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _fix_updates(msg) -> Optional[Dict]:
+    """Fields of a GpsFix carried by one parsed sentence, None for other sentences"""
+    if isinstance(msg, pynmea2.GGA):
+        updates = {
+            'quality': msg.gps_qual or 0,
+            'satellites': int(msg.num_sats or 0),
+            'hdop': _to_float(msg.horizontal_dil),
+            'altitude': _to_float(msg.altitude),
+        }
+        if msg.gps_qual:
+            updates['latitude'] = msg.latitude
+            updates['longitude'] = msg.longitude
+        return updates
+    if isinstance(msg, pynmea2.RMC):
+        if msg.status != 'A':
+            return {}
+        updates = {
+            'latitude': msg.latitude,
+            'longitude': msg.longitude,
+            'course': _to_float(msg.true_course),
+        }
+        knots = _to_float(msg.spd_over_grnd)
+        if knots is not None:
+            updates['speed_kmh'] = knots * 1.852
+        if msg.datestamp and msg.timestamp:
+            updates['fix_time'] = datetime.combine(msg.datestamp, msg.timestamp)
+        return updates
+    if isinstance(msg, pynmea2.VTG):
+        return {
+            'speed_kmh': _to_float(msg.spd_over_grnd_kmph),
+            'course': _to_float(msg.true_track),
+        }
+    if isinstance(msg, pynmea2.GSA):
+        return {
+            'fix_type': int(msg.mode_fix_type or 1),
+            'hdop': _to_float(msg.hdop),
+        }
+    return None
+
 
 class GPSReader:
     """
     A class to handle reading and parsing GPS data from a GPS module
     using NMEA sentences over serial connection.
-    """
     
-    def __init__(self, port: str = '/dev/ttyUSB0', baud_rate: int = 9600, timeout: float = 1.0):
+    After start() a background thread consumes every sentence and keeps
+    self.fix up to date, so reads are instant lookups and wait_for_fix()
+    sleeps on a condition instead of polling.
+    """
+
+    def __init__(self, port: str = '/dev/ttyUSB0', baud_rate: int = 9600, timeout: float = 1.0,
+                 history=None, source=None):
         """
         Initialize GPS reader with serial connection parameters.
         
@@ -18,30 +108,47 @@ class GPSReader:
             port (str): Serial port where GPS module is connected
             baud_rate (int): Baud rate for serial communication
             timeout (float): Serial reading timeout in seconds
+            history: Optional TimeSeriesStore with latitude, longitude and
+                altitude columns (use value_dtype '<f8') that fixes are appended to
+            source: Optional NMEA source with open/readline/close, such as a
+                ReplayGpsSource; the serial port settings are ignored if given
         """
         self.port = port
+        self.source = source
         self.baud_rate = baud_rate
         self.timeout = timeout
+        self.history = history
         self.serial_conn = None
         self.last_read_time = 0
         self.min_read_interval = 1.0  # Minimum time between reads in seconds
+        
+        # Background reader state. fix is replaced, never modified, so
+        # readers can use it without the lock
+        self.fix: Optional[GpsFix] = None
+        self._fix_changed = threading.Condition()
+        self._reader_thread = None
+        self._reader_stop = threading.Event()
+        self.reconnect_interval = 2.0
+        self.max_reconnect_interval = 60.0  # Retries back off to this during an outage
+        self.sentence_stats = {'sentences': 0, 'parse_errors': 0}
 
-    def connect(self) -> bool:
+    def connect(self, report_errors: bool = True) -> bool:
         """
         Establish connection to the GPS module.
         
+        Args:
+            report_errors (bool): Print why the connection failed
+        
         Returns:
             bool: True if connection successful, False otherwise
         """
         try:
-            self.serial_conn = serial.Serial(
-                port=self.port,
-                baudrate=self.baud_rate,
-                timeout=self.timeout
-            )
+            self.serial_conn = self.source or SerialGpsSource(self.port, self.baud_rate, self.timeout)
+            self.serial_conn.open()
             return True
-        except serial.SerialException as e:
-            print(f"Error connecting to GPS module: {e}")
+        except (serial.SerialException, OSError) as e:
+            if report_errors:
+                print(f"Error connecting to GPS module: {e}")
             return False
 
     def disconnect(self):
@@ -49,63 +156,174 @@ class GPSReader:
         if self.serial_conn and self.serial_conn.is_open:
             self.serial_conn.close()
 
+    def start(self):
+        """Start consuming the NMEA stream on a background thread"""
+        if self._reader_thread:
+            return
+        self._reader_stop.clear()
+        self._reader_thread = threading.Thread(target=self._reader_loop, name="gps-reader", daemon=True)
+        self._reader_thread.start()
+
+    def stop(self):
+        """Stop the background reader and close the connection"""
+        if self._reader_thread:
+            self._reader_stop.set()
+            # readline() returns within the serial timeout
+            self._reader_thread.join()
+            self._reader_thread = None
+        self.disconnect()
+
+    def _reader_loop(self):
+        """Internal loop that reads sentences as they arrive"""
+        # Reconnects back off while the module is missing and an outage is
+        # reported once, not on every retry
+        outage_started = None
+        delay = self.reconnect_interval
+        while not self._reader_stop.is_set():
+            if not self.serial_conn or not self.serial_conn.is_open:
+                if not self.connect(report_errors=outage_started is None):
+                    if outage_started is None:
+                        outage_started = time.time()
+                        print("GPS module unavailable, retrying in the background")
+                    self._reader_stop.wait(delay)
+                    delay = min(delay * 2, self.max_reconnect_interval)
+                    continue
+                if outage_started is not None:
+                    print(f"GPS module reconnected after {time.time() - outage_started:.0f}s")
+                    outage_started = None
+                delay = self.reconnect_interval
+            try:
+                raw = self.serial_conn.readline()
+            except serial.SerialException as e:
+                print(f"Error reading GPS data: {e}")
+                self.disconnect()
+                continue
+            if raw:
+                try:
+                    self._handle_sentence(raw)
+                except Exception as e:
+                    # One bad sentence must never stop the reader
+                    self.sentence_stats['parse_errors'] += 1
+                    print(f"Error handling GPS sentence {raw[:20]!r}: {e}")
+
+    def _handle_sentence(self, raw: bytes):
+        """Apply one NMEA sentence to the current fix"""
+        try:
+            parsed = parse_fix_updates(raw)
+        except ChecksumError:
+            self.sentence_stats['parse_errors'] += 1
+            return
+        except ValueError:
+            # Odd field layouts from some receivers, let pynmea2 have a go
+            parsed = self._parse_with_pynmea2(raw)
+            if parsed is None:
+                self.sentence_stats['parse_errors'] += 1
+                return
+        self.sentence_stats['sentences'] += 1
+        if parsed is None:
+            return  # A sentence type the fix does not use
+        sentence_type, updates = parsed
+        self._apply(updates, history=sentence_type == 'GGA')
+
+    @staticmethod
+    def _parse_with_pynmea2(raw: bytes) -> Optional[Tuple[str, Dict]]:
+        try:
+            msg = pynmea2.parse(raw.decode('ascii', errors='replace').strip())
+            # Field properties like latitude convert lazily and raise here
+            updates = _fix_updates(msg)
+        except (pynmea2.ParseError, ValueError, TypeError):
+            return None
+        return (msg.sentence_type, updates) if updates is not None else None
+
+    def _apply(self, updates: Dict, history: bool = False):
+        now = time.time()
+        with self._fix_changed:
+            fix = self.fix = (self.fix or GpsFix())._replace(received=now, **updates)
+            self._fix_changed.notify_all()
+        if history:
+            self._record_history(now, fix.as_dict())
+
     def _parse_gps_data(self, nmea_sentence: str) -> Optional[Dict]:
         """
         Parse NMEA sentence to extract GPS data.
         
         Args:
             nmea_sentence (str): Raw NMEA sentence from GPS module
-            
+        
         Returns:
             Optional[Dict]: Dictionary containing parsed GPS data or None if parsing fails
         """
         try:
-            msg = pynmea2.parse(nmea_sentence)
-            if isinstance(msg, pynmea2.GGA):
-                return {
-                    'timestamp': datetime.now().isoformat(),
-                    'latitude': msg.latitude,
-                    'longitude': msg.longitude,
-                    'altitude': msg.altitude,
-                    'satellites': msg.num_sats,
-                    'quality': msg.gps_qual,
-                }
+            parsed = parse_fix_updates(nmea_sentence.encode('ascii', errors='replace'))
+        except ValueError:
             return None
-        except pynmea2.ParseError:
+        if not parsed or parsed[0] != 'GGA':
             return None
+        updates = parsed[1]
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'latitude': updates.get('latitude'),
+            'longitude': updates.get('longitude'),
+            'altitude': updates['altitude'],
+            'satellites': updates['satellites'],
+            'quality': updates['quality'],
+        }
+
+    def _record_history(self, timestamp: float, gps_data: Dict):
+        """Append a fix to the history store, skipping readings without a position"""
+        if self.history is None or not gps_data.get('quality'):
+            return
+        altitude = gps_data.get('altitude')
+        self.history.append(
+            timestamp,
+            gps_data['latitude'],
+            gps_data['longitude'],
+            float('nan') if altitude is None else altitude,
+        )
 
     def read_gps_data(self, force: bool = False) -> Optional[Dict]:
         """
         Read and parse GPS data from the module.
         
+        With the background reader running this returns the latest fix at
+        once and force has no effect.
+        
         Args:
             force (bool): If True, ignore minimum read interval
-            
+        
         Returns:
             Optional[Dict]: Dictionary containing GPS data or None if read fails
         """
+        if self._reader_thread:
+            fix = self.fix
+            return fix.as_dict() if fix else None
+        
         current_time = time.time()
         
         # Check if enough time has passed since last read
         if not force and (current_time - self.last_read_time) < self.min_read_interval:
             return None
-
+        
         if not self.serial_conn or not self.serial_conn.is_open:
             if not self.connect():
                 return None
-
+        
         try:
-            # Read lines until we get a GGA sentence
+            # Read lines until we get a GGA sentence, each readline() blocks
+            # for at most the serial timeout
             for _ in range(100):  # Limit attempts to prevent infinite loop
-                if self.serial_conn.in_waiting:
-                    line = self.serial_conn.readline().decode('ascii', errors='replace').strip()
-                    if line.startswith('$GPGGA') or line.startswith('$GNGGA'):
-                        gps_data = self._parse_gps_data(line)
-                        if gps_data:
-                            self.last_read_time = current_time
-                            return gps_data
+                raw = self.serial_conn.readline()
+                if not raw:
+                    return None
+                line = raw.decode('ascii', errors='replace').strip()
+                if line.startswith('$GPGGA') or line.startswith('$GNGGA'):
+                    gps_data = self._parse_gps_data(line)
+                    if gps_data:
+                        self.last_read_time = current_time
+                        self._record_history(current_time, gps_data)
+                        return gps_data
             return None
-            
+        
         except (serial.SerialException, UnicodeDecodeError) as e:
             print(f"Error reading GPS data: {e}")
             self.disconnect()
@@ -118,6 +336,10 @@ class GPSReader:
         Returns:
             Optional[Tuple[float, float]]: Tuple of (latitude, longitude) or None if unavailable
         """
+        if self._reader_thread:
+            fix = self.fix
+            return (fix.latitude, fix.longitude) if fix and fix.has_fix else None
+        
         gps_data = self.read_gps_data()
         if gps_data:
             return (gps_data['latitude'], gps_data['longitude'])
@@ -129,14 +351,18 @@ class GPSReader:
         
         Args:
             timeout (float): Maximum time to wait in seconds
-            
+        
         Returns:
             bool: True if fix acquired, False if timeout occurred
         """
+        if self._reader_thread:
+            with self._fix_changed:
+                return self._fix_changed.wait_for(lambda: self.fix is not None and self.fix.has_fix, timeout)
+        
         start_time = time.time()
         while (time.time() - start_time) < timeout:
             gps_data = self.read_gps_data(force=True)
             if gps_data and gps_data['quality'] > 0:
                 return True
-            time.sleep(0.5)
-        return False
\ No newline at end of file
+            time.sleep(0.5)  # connect() fails at once with no receiver attached
+        return False
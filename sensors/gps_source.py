@@ -0,0 +1,309 @@
+import os
+import select
+import threading
+import time
+import tty
+from typing import List, Optional, Tuple
+
+
+class SerialGpsSource:
+    """
+    NMEA from a receiver on a serial port, the default source.
+
+    Lines are split from whatever bytes are waiting rather than with
+    pyserial's readline(), which makes one read call per byte.
+    """
+
+    def __init__(self, port: str = '/dev/ttyUSB0', baud_rate: int = 9600, timeout: float = 1.0):
+        self.port = port
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.conn = None
+        self._buffer = bytearray()
+
+    def open(self):
+        """Open the port, raising serial.SerialException on failure"""
+        import serial
+        self._buffer.clear()
+        self.conn = serial.Serial(port=self.port, baudrate=self.baud_rate, timeout=self.timeout)
+
+    @property
+    def is_open(self) -> bool:
+        return self.conn is not None and self.conn.is_open
+
+    def readline(self) -> bytes:
+        """Next sentence, or b'' if none arrived within the timeout"""
+        while True:
+            newline = self._buffer.find(b'\n')
+            if newline >= 0:
+                line = bytes(self._buffer[:newline + 1])
+                del self._buffer[:newline + 1]
+                return line
+            # Blocks up to the timeout for the first byte, then takes all waiting
+            chunk = self.conn.read(max(1, self.conn.in_waiting))
+            if not chunk:
+                return b''
+            self._buffer += chunk
+
+    def close(self):
+        if self.is_open:
+            self.conn.close()
+
+
+def _epoch_seconds(line: bytes) -> Optional[float]:
+    """UTC time of day carried by a GGA or RMC sentence, in seconds"""
+    if line[3:6] not in (b'GGA', b'RMC'):
+        return None
+    clock = line.split(b',', 2)[1]
+    if len(clock) < 6:
+        return None
+    try:
+        return int(clock[0:2]) * 3600 + int(clock[2:4]) * 60 + float(clock[4:])
+    except ValueError:
+        return None
+
+
+def load_nmea_log(path: str) -> List[Tuple[float, bytes]]:
+    """
+    Read a recorded NMEA log
+
+    Returns:
+        List of (seconds since the first fix time, sentence) pairs. Sentences
+        without a time of their own take the time of the sentence before.
+    """
+    entries = []
+    first = previous = None
+    offset = 0.0
+    with open(path, 'rb') as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith(b'$'):
+                continue
+            seconds = _epoch_seconds(line)
+            if seconds is not None:
+                if first is None:
+                    first = previous = seconds
+                if seconds < previous:
+                    offset += 86400  # Passed midnight UTC
+                previous = seconds
+            relative = 0.0 if first is None else previous + offset - first
+            entries.append((relative, line + b'\r\n'))
+    return entries
+
+
+class ReplayGpsSource:
+    """
+    Replays a recorded NMEA log with its original timing or faster.
+
+    Timing comes from the GGA/RMC fix times in the log, scaled by speed.
+    With speed=0 sentences are returned as fast as they are read.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False, timeout: float = 1.0):
+        """
+        Args:
+            path (str): NMEA log, one sentence per line
+            speed (float): Playback rate, 10 replays a 1 Hz log at 10 Hz
+            loop (bool): Start over at the end instead of going quiet
+            timeout (float): Longest readline() blocks, as for a serial port
+        """
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.timeout = timeout
+        self.entries = load_nmea_log(path)
+        self.finished = threading.Event()
+        self._closed = threading.Event()
+        self._closed.set()
+        self._index = 0
+        self._base = 0.0
+        # time.time() when the last sentence was handed out
+        self.last_emitted = None
+
+    def open(self):
+        if not self.entries:
+            raise OSError(f"No NMEA sentences in {self.path}")
+        self._index = 0
+        self._base = time.monotonic()
+        self.finished.clear()
+        self._closed.clear()
+
+    @property
+    def is_open(self) -> bool:
+        return not self._closed.is_set()
+
+    def readline(self) -> bytes:
+        """Next sentence once it is due, or b'' after the timeout"""
+        if self._index >= len(self.entries):
+            if not self.loop:
+                self.finished.set()
+                self._closed.wait(self.timeout)
+                return b''
+            self._index = 0
+            self._base = time.monotonic()
+
+        relative, line = self.entries[self._index]
+        if self.speed:
+            wait = self._base + relative / self.speed - time.monotonic()
+            if wait > 0:
+                if self._closed.wait(min(wait, self.timeout)) or wait > self.timeout:
+                    return b''
+        self._index += 1
+        self.last_emitted = time.time()
+        return line
+
+    def close(self):
+        self._closed.set()
+
+
+class PtyGpsReplay:
+    """
+    Replays a log into a pseudo-terminal so the serial code path runs unchanged.
+
+    Point GPSReader (or any serial tool) at self.port once start() returns.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0, loop: bool = False):
+        self.replay = ReplayGpsSource(path, speed=speed, loop=loop, timeout=0.2)
+        self.port = None
+        self._master = None
+        self._slave = None
+        self._thread = None
+
+    def start(self) -> str:
+        """Open the pty and start writing sentences to it, returning the port path"""
+        self._master, self._slave = os.openpty()
+        # No echo or newline translation, like a real serial line
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self.replay.open()
+        self._thread = threading.Thread(target=self._write_loop, name="gps-pty-replay", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def _write_loop(self):
+        while self.replay.is_open:
+            line = self.replay.readline()
+            while line and self.replay.is_open:
+                # Wait for room without blocking stop() when nobody is reading
+                _, writable, _ = select.select([], [self._master], [], 0.2)
+                if not writable:
+                    continue
+                try:
+                    written = os.write(self._master, line)
+                except OSError:
+                    return
+                line = line[written:]
+
+    @property
+    def last_emitted(self) -> Optional[float]:
+        return self.replay.last_emitted
+
+    def stop(self):
+        self.replay.close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+
+def write_sample_log(path: str, seconds: int = 60, hz: int = 10):
+    """Write a synthetic multi-constellation log with hz fixes per second"""
+    from sensors.nmea import _sample_log
+
+    epoch = _sample_log(6)
+    with open(path, 'wb') as f:
+        for i in range(seconds * hz):
+            t = 12 * 3600 + i / hz
+            clock = f"{int(t // 3600):02d}{int(t % 3600 // 60):02d}{t % 60:05.2f}"
+            for line in epoch:
+                body = line[1:line.rfind(b'*')].decode()
+                fields = body.split(',')
+                if fields[0][2:] in ('GGA', 'RMC'):
+                    fields[1] = clock
+                body = ','.join(fields)
+                checksum = 0
+                for char in body.encode():
+                    checksum ^= char
+                f.write(f"${body}*{checksum:02X}\r\n".encode())
+
+
+def _benchmark(path: Optional[str] = None, speed: float = 1.0, seconds: float = 5.0, use_pty: bool = True):
+    """
+    Replay a log through GPSReader and report parse throughput, fix update
+    latency and CPU
+
+    Args:
+        path (str, optional): NMEA log, a synthetic 10 Hz log if not given
+        speed (float): Replay rate, 0 for as fast as possible
+        seconds (float): How long to run
+        use_pty (bool): Go through a pty and pyserial instead of reading the log directly
+    """
+    import tempfile
+    from sensors.gps import GPSReader
+
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'sample.nmea')
+        write_sample_log(path)
+
+    pty_replay = None
+    if use_pty:
+        pty_replay = PtyGpsReplay(path, speed=speed, loop=True)
+        reader = GPSReader(port=pty_replay.start(), baud_rate=115200, timeout=0.2)
+        clock = pty_replay
+    else:
+        source = ReplayGpsSource(path, speed=speed, loop=True, timeout=0.2)
+        reader = GPSReader(source=source)
+        clock = source
+
+    latencies = []
+    done = threading.Event()
+
+    def watch():
+        # Time from a sentence being emitted to the fix reflecting it. Only
+        # updates made from the newest emitted sentence can be paired up
+        with reader._fix_changed:
+            while not done.is_set():
+                reader._fix_changed.wait(0.2)
+                emitted, fix = clock.last_emitted, reader.fix
+                if emitted and fix and fix.received >= emitted:
+                    latencies.append(fix.received - emitted)
+
+    watcher = threading.Thread(target=watch, daemon=True)
+    cpu_start = time.process_time()
+    wall_start = time.time()
+    reader.start()
+    watcher.start()
+    time.sleep(seconds)
+    done.set()
+    reader.stop()
+    watcher.join()
+    wall = time.time() - wall_start
+    cpu = time.process_time() - cpu_start
+    if pty_replay:
+        pty_replay.stop()
+
+    sentences = reader.sentence_stats['sentences']
+    latencies.sort()
+    via = "pty + pyserial" if use_pty else "direct replay"
+    rate = f"{speed:g}x" if speed else "full speed"
+    print(f"{via} at {rate}: {sentences / wall:,.0f} sentences/s, "
+          f"{reader.sentence_stats['parse_errors']} parse errors, CPU {100 * cpu / wall:.0f}% of one core")
+    if latencies:
+        print(f"Fix update latency: median {1000 * latencies[len(latencies) // 2]:.2f} ms, "
+              f"p99 {1000 * latencies[int(len(latencies) * 0.99)]:.2f} ms over {len(latencies):,} updates")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay an NMEA log through GPSReader")
+    parser.add_argument("log", nargs="?", help="NMEA log, a synthetic 10 Hz log if omitted")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay rate, 0 for as fast as possible")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--direct", action="store_true", help="skip the pty and pyserial")
+    args = parser.parse_args()
+    _benchmark(args.log, args.speed, args.seconds, use_pty=not args.direct)
@@ -0,0 +1,225 @@
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+
+class ChecksumError(ValueError):
+    pass
+
+
+def checksum_ok(line: bytes) -> Tuple[bool, bytes]:
+    """
+    Validate an NMEA sentence checksum
+
+    Args:
+        line (bytes): Sentence with or without the trailing CR LF
+
+    Returns:
+        Tuple of whether the checksum matched and the body between '$' and '*'
+    """
+    star = line.rfind(b'*')
+    if not line.startswith(b'$') or star < 0:
+        return False, b''
+    body = line[1:star]
+    expected = line[star + 1:star + 3]
+    checksum = 0
+    for byte in body:
+        checksum ^= byte
+    try:
+        return checksum == int(expected, 16), body
+    except ValueError:
+        return False, body
+
+
+def _coordinate(value: bytes, hemisphere: bytes) -> Optional[float]:
+    """Convert ddmm.mmmm / dddmm.mmmm with its hemisphere to signed degrees"""
+    if not value:
+        return None
+    dot = value.find(b'.')
+    if dot < 0:
+        dot = len(value)
+    degrees = int(value[:dot - 2]) + float(value[dot - 2:]) / 60
+    return -degrees if hemisphere in (b'S', b'W') else degrees
+
+
+def _float(value: bytes) -> Optional[float]:
+    return float(value) if value else None
+
+
+def _utc(day: bytes, clock: bytes) -> Optional[datetime]:
+    if len(day) < 6 or len(clock) < 6:
+        return None
+    # Rounded to whole microseconds so 29.487 does not become 29.486999
+    whole, micros = divmod(round(float(clock[4:]) * 1e6), 1_000_000)
+    year = int(day[4:6])
+    return datetime(
+        year + (2000 if year < 80 else 1900), int(day[2:4]), int(day[0:2]),
+        int(clock[0:2]), int(clock[2:4]), whole, micros,
+        tzinfo=timezone.utc,
+    )
+
+
+def _gga(f) -> Dict:
+    quality = int(f[6]) if f[6] else 0
+    updates = {
+        'quality': quality,
+        'satellites': int(f[7]) if f[7] else 0,
+        'hdop': _float(f[8]),
+        'altitude': _float(f[9]),
+    }
+    if quality:
+        updates['latitude'] = _coordinate(f[2], f[3])
+        updates['longitude'] = _coordinate(f[4], f[5])
+    return updates
+
+
+def _rmc(f) -> Dict:
+    if f[2] != b'A':
+        return {}
+    updates = {
+        'latitude': _coordinate(f[3], f[4]),
+        'longitude': _coordinate(f[5], f[6]),
+        'course': _float(f[8]),
+    }
+    if f[7]:
+        updates['speed_kmh'] = float(f[7]) * 1.852
+    fix_time = _utc(f[9], f[1])
+    if fix_time:
+        updates['fix_time'] = fix_time
+    return updates
+
+
+def _vtg(f) -> Dict:
+    return {'speed_kmh': _float(f[7]), 'course': _float(f[1])}
+
+
+def _gsa(f) -> Dict:
+    return {'fix_type': int(f[2]) if f[2] else 1, 'hdop': _float(f[16])}
+
+
+# Sentence type -> (minimum field count, parser)
+PARSERS = {
+    b'GGA': (10, _gga),
+    b'RMC': (10, _rmc),
+    b'VTG': (8, _vtg),
+    b'GSA': (17, _gsa),
+}
+
+
+def parse_fix_updates(line: bytes) -> Optional[Tuple[str, Dict]]:
+    """
+    Parse a GGA, RMC, VTG or GSA sentence straight from bytes
+
+    Only the fields GpsFix needs are converted, and the line is never
+    decoded as a whole.
+
+    Args:
+        line (bytes): Raw sentence as read from the receiver
+
+    Returns:
+        Sentence type and the GpsFix fields it carries, or None for other
+        sentence types, which are left to pynmea2
+
+    Raises:
+        ChecksumError: If the checksum is missing or wrong
+        ValueError: If a supported sentence has malformed fields
+    """
+    ok, body = checksum_ok(line.strip())
+    if not ok:
+        raise ChecksumError(f"Bad NMEA checksum: {line[:20]!r}")
+    fields = body.split(b',')
+    sentence_type = fields[0][2:]  # Drop the talker ID, GP, GN, GL...
+    parser = PARSERS.get(sentence_type)
+    if parser is None:
+        return None
+    min_fields, parse = parser
+    if len(fields) < min_fields:
+        raise ValueError(f"Truncated {sentence_type.decode()} sentence")
+    return sentence_type.decode(), parse(fields)
+
+
+def _sample_log(lines: int) -> list:
+    """A synthetic 10 Hz multi-constellation log for when no recording is given"""
+    def sentence(body: str) -> bytes:
+        checksum = 0
+        for char in body.encode():
+            checksum ^= char
+        return f"${body}*{checksum:02X}\r\n".encode()
+
+    epoch = [
+        sentence("GNGGA,123519.00,4807.03812,N,01131.00045,E,1,12,0.9,545.4,M,46.9,M,,"),
+        sentence("GNRMC,123519.00,A,4807.03812,N,01131.00045,E,022.4,084.4,230394,003.1,W,A"),
+        sentence("GNVTG,084.4,T,034.4,M,022.4,N,041.5,K,A"),
+        sentence("GNGSA,A,3,04,05,09,12,24,25,29,31,,,,,1.8,0.9,1.5,1"),
+        sentence("GPGSV,3,1,11,04,45,123,42,05,30,045,38,09,60,270,44,12,15,310,30"),
+        sentence("GLGSV,2,1,07,65,40,100,35,66,20,180,28,72,55,250,40,73,10,320,22"),
+    ]
+    return [epoch[i % len(epoch)] for i in range(lines)]
+
+
+def _benchmark(path: Optional[str] = None, lines: int = 60_000):
+    """Replay an NMEA log through both parsers, reporting lines/s and allocations"""
+    import tracemalloc
+    import pynmea2
+    from sensors.gps import _fix_updates
+
+    if path:
+        with open(path, 'rb') as f:
+            log = [line for line in f if line.startswith(b'$')]
+    else:
+        log = _sample_log(lines)
+    print(f"{len(log):,} sentences from {path or 'a synthetic 10 Hz log'}")
+
+    def run_fast():
+        applied = 0
+        for line in log:
+            try:
+                if parse_fix_updates(line):
+                    applied += 1
+            except ValueError:
+                pass
+        return applied
+
+    def run_pynmea2():
+        # What GPSReader did before: decode every line and parse it fully
+        applied = 0
+        for line in log:
+            try:
+                msg = pynmea2.parse(line.decode('ascii', errors='replace').strip())
+            except pynmea2.ParseError:
+                continue
+            if _fix_updates(msg) is not None:
+                applied += 1
+        return applied
+
+    def run_one(name, line):
+        try:
+            if name == "fast parser":
+                parse_fix_updates(line)
+            else:
+                _fix_updates(pynmea2.parse(line.decode('ascii', errors='replace').strip()))
+        except (ValueError, pynmea2.ParseError):
+            pass
+
+    for name, run in (("fast parser", run_fast), ("pynmea2", run_pynmea2)):
+        start = time.perf_counter()
+        applied = run()
+        elapsed = time.perf_counter() - start
+
+        # Allocations made while parsing one line, averaged over a sample
+        sample = log[:1000]
+        tracemalloc.start()
+        allocated = 0
+        for line in sample:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            run_one(name, line)
+            allocated += tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        print(f"{name}: {len(log) / elapsed:,.0f} lines/s, {applied:,} fix updates, "
+              f"{allocated / len(sample):,.0f} bytes allocated per line at peak")
+
+
+if __name__ == "__main__":
+    _benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -1,33 +1,166 @@
 import time
-import adafruit_dht
-import board
+import threading
+import statistics
+from collections import deque
+from typing import NamedTuple, Optional
+
+
+class Reading(NamedTuple):
+    temperature: float
+    humidity: float
+    timestamp: float  # time.time() of the newest sample in the filter window
+
+    @property
+    def age(self):
+        """Seconds since the reading was taken"""
+        return time.time() - self.timestamp
+
 
 class DHT11Sensor:
     """
     A class to handle DHT11 temperature and humidity sensor readings using Adafruit library
     """
     
-    def __init__(self, pin=board.D27):  # Default to GPIO 27
+    # Plausible values, anything outside is a corrupted read
+    TEMPERATURE_RANGE = (-20, 60)
+    HUMIDITY_RANGE = (0, 100)
+    
+    def __init__(self, pin=None, history=None, sensor=None):
         """
         Initialize the DHT11 sensor
         
         Args:
-            pin: GPIO pin number where the sensor is connected (default: 4)
+            pin: GPIO pin where the sensor is connected (default: board.D27)
+            history: Optional TimeSeriesStore with temperature and humidity
+                columns that background readings are appended to
+            sensor: Object with adafruit_dht.DHT11's temperature, humidity
+                and exit() interface, a DHT11 on pin by default
         """
+        if sensor is None:
+            # Imported here so other sensors work without the Blinka stack
+            import adafruit_dht
+            import board
+            pin = pin or board.D27
+            sensor = adafruit_dht.DHT11(pin, use_pulseio=False)
         self.pin = pin
-        self.sensor = adafruit_dht.DHT11(self.pin,use_pulseio=False)
+        self.history = history
+        self.sensor = sensor
         self.temperature = None
         self.humidity = None
         self.last_reading_time = 0
         self.min_interval = 2  # Minimum time (seconds) between readings
         
+        # Background sampling state
+        self.latest: Optional[Reading] = None
+        self.max_age = 3 * self.min_interval  # Seconds before latest counts as unavailable
+        self._window = deque(maxlen=5)
+        self._lock = threading.Lock()
+        self._background_thread = None
+        self._background_stop = threading.Event()
+        self.sample_stats = {'samples': 0, 'failures': 0, 'rejected': 0}
+        
+    def start_background(self, interval=None, window=5, retries=3):
+        """
+        Sample the sensor on a background thread so reads never block
+        
+        Good samples go into a rolling window and the median of the window
+        becomes the reading, which drops the odd corrupted sample. While this
+        runs, read_sensor() returns the latest filtered reading at once. A
+        reading older than three sampling intervals, plus the time one round
+        of retries takes, means the sensor stopped answering and is treated
+        as unavailable.
+        
+        Args:
+            interval: Seconds between samples, at least the sensor's min_interval
+            window: Number of samples the median is taken over
+            retries: Extra attempts after a failed sample, min_interval apart
+        """
+        if self._background_thread:
+            return
+        interval = max(interval or self.min_interval, self.min_interval)
+        self.max_age = 3 * interval + retries * self.min_interval
+        self._window = deque(maxlen=window)
+        self._background_stop.clear()
+        self._background_thread = threading.Thread(
+            target=self._background_loop,
+            args=(interval, retries),
+            daemon=True
+        )
+        self._background_thread.start()
+    
+    def stop_background(self):
+        """Stop the background sampling thread"""
+        if not self._background_thread:
+            return
+        self._background_stop.set()
+        self._background_thread.join()
+        self._background_thread = None
+    
+    def fresh_reading(self) -> Optional[Reading]:
+        """Return latest, or None if there is none or it is older than max_age"""
+        with self._lock:
+            reading = self.latest
+        if reading is None or reading.age > self.max_age:
+            return None
+        return reading
+    
+    def _sample(self):
+        """Read the sensor once, returning (temperature, humidity) or None"""
+        try:
+            temperature = self.sensor.temperature
+            humidity = self.sensor.humidity
+        except Exception:
+            # Checksum and timing errors are routine with the DHT11
+            self.sample_stats['failures'] += 1
+            return None
+        if temperature is None or humidity is None:
+            self.sample_stats['failures'] += 1
+            return None
+        if not (self.TEMPERATURE_RANGE[0] <= temperature <= self.TEMPERATURE_RANGE[1]
+                and self.HUMIDITY_RANGE[0] <= humidity <= self.HUMIDITY_RANGE[1]):
+            self.sample_stats['rejected'] += 1
+            return None
+        return temperature, humidity
+    
+    def _background_loop(self, interval, retries):
+        """Internal loop that keeps self.latest up to date"""
+        while not self._background_stop.is_set():
+            sample = None
+            for attempt in range(retries + 1):
+                sample = self._sample()
+                if sample or self._background_stop.wait(self.min_interval):
+                    break
+            if sample:
+                now = time.time()
+                self._window.append(sample)
+                self.sample_stats['samples'] += 1
+                temperature = statistics.median(t for t, _ in self._window)
+                humidity = statistics.median(h for _, h in self._window)
+                with self._lock:
+                    self.latest = Reading(temperature, humidity, now)
+                    self.temperature, self.humidity = temperature, humidity
+                    self.last_reading_time = now
+                if self.history is not None:
+                    self.history.append(now, temperature, humidity)
+            self._background_stop.wait(interval)
+        
     def read_sensor(self):
         """
         Read temperature and humidity from the sensor
         
+        With background sampling running this returns the latest filtered
+        reading without touching the sensor, or (None, None) once it is older
+        than max_age.
+        
         Returns:
             tuple: (temperature, humidity) if successful, (None, None) if failed
         """
+        if self._background_thread:
+            reading = self.fresh_reading()
+            if reading is None:
+                return None, None
+            return reading.temperature, reading.humidity
+        
         # Check if enough time has passed since last reading
         current_time = time.time()
         if current_time - self.last_reading_time < self.min_interval:
@@ -73,4 +206,9 @@ class DHT11Sensor:
         temp = self.get_temperature()
         if temp is not None:
             return (temp * 9/5) + 32
-        return None
\ No newline at end of file
+        return None
+    
+    def close(self):
+        """Release the GPIO pin used by the sensor"""
+        self.stop_background()
+        self.sensor.exit()
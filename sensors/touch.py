@@ -1,41 +1,42 @@
-import RPi.GPIO as GPIO
-import time
-from enum import Enum
-from threading import Timer
-
-class TouchType(Enum):
-    SINGLE = "single"
-    DOUBLE = "double"
-    LONG = "long"
+from threading import Event
+from sensors.gpio_backend import default_backend
+from sensors.gesture import GestureRecognizer, TouchType
 
 class TouchSensor:
-    def __init__(self, pin, callback=None, bounce_time=200):
+    def __init__(self, pin, callback=None, bounce_time=20, press_callback=None, backend=None,
+                 max_taps=2):
         """
         Initialize the touch sensor
         
         Args:
             pin (int): GPIO pin number (BCM numbering)
             callback (function, optional): Function to call when touch is detected
-            bounce_time (int, optional): Debounce time in milliseconds
+            bounce_time (int, optional): Debounce time in milliseconds. Edges
+                inside it are dropped, so it must stay well below the shortest
+                tap: 200 would swallow the release of a quick tap
+            press_callback (function, optional): Function to call as soon as a
+                touch starts, before the gesture is known
+            backend (optional): Edge source, see sensors.gpio_backend. Defaults
+                to the GPIO character device, or RPi.GPIO if gpiod is missing
+            max_taps (int, optional): 3 to recognise triple taps, at the cost of
+                waiting for a possible third tap before DOUBLE fires
         """
         self.pin = pin
-        self.callback = callback
         self.bounce_time = bounce_time
         
-        # Touch detection configuration
-        self.long_press_time = 1.0  # seconds
-        self.double_click_time = 0.5  # seconds
-        
-        # State variables
-        self.last_touch_time = 0
-        self.touch_count = 0
+        # Gesture state machine, runs on its own scheduler thread
+        self.gestures = GestureRecognizer(
+            callback,
+            press_callback,
+            long_press_time=1.0,  # seconds
+            double_click_time=0.5,  # seconds
+            max_taps=max_taps,
+        )
         self.is_touching = False
-        self.long_press_timer = None
-        self.double_click_timer = None
         
-        # Setup GPIO
-        GPIO.setmode(GPIO.BCM)  # Use BCM pin numbering
-        GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
+        # Edge source, started by wait_listener()
+        self.backend = backend or default_backend()
+        self._stop_event = Event()
         
     def on_touch(self, callback):
         """
@@ -45,62 +46,28 @@ class TouchSensor:
             callback (callable): Function to call when touch is detected.
                                Should accept TouchType as parameter
         """
-        self.callback = callback
+        self.gestures.callback = callback
     
-    def _handle_touch(self, channel):
-        """Internal callback handler"""
-        current_time = time.time()
+    def on_press(self, callback):
+        """
+        Register callback for the start of every touch
         
-        if not self.is_touching:  # Touch started
-            self.is_touching = True
-            
-            # Start long press timer
-            self.long_press_timer = Timer(self.long_press_time, self._handle_long_press)
-            self.long_press_timer.start()
-            
-            # Handle potential double click
-            if current_time - self.last_touch_time < self.double_click_time:
-                self.touch_count += 1
-                if self.touch_count == 2:
-                    self._handle_double_click()
-            else:
-                self.touch_count = 1
-                
-            self.last_touch_time = current_time
-            
-        else:  # Touch ended
-            self.is_touching = False
-            
-            # Cancel long press timer if it's running
-            if self.long_press_timer:
-                self.long_press_timer.cancel()
-                
-            # Start timer for potential double click
-            if self.touch_count == 1:
-                if self.double_click_timer:
-                    self.double_click_timer.cancel()
-                self.double_click_timer = Timer(self.double_click_time, self._handle_single_click)
-                self.double_click_timer.start()
+        Args:
+            callback (callable): Function called with no arguments on touch-down,
+                before single/double/long press is decided
+        """
+        self.gestures.press_callback = callback
     
-    def _handle_single_click(self):
-        """Handle single click event"""
-        if self.callback and self.touch_count == 1:
-            self.callback(TouchType.SINGLE)
-        self.touch_count = 0
+    def _handle_edge(self, pressed, timestamp):
+        """
+        Internal edge handler
         
-    def _handle_double_click(self):
-        """Handle double click event"""
-        if self.callback:
-            self.callback(TouchType.DOUBLE)
-        self.touch_count = 0
-        if self.double_click_timer:
-            self.double_click_timer.cancel()
-            
-    def _handle_long_press(self):
-        """Handle long press event"""
-        if self.callback and self.is_touching:
-            self.callback(TouchType.LONG)
-        self.touch_count = 0
+        Args:
+            pressed (bool): Level after the edge
+            timestamp (float): Edge time in seconds on the monotonic clock
+        """
+        self.is_touching = pressed
+        self.gestures.post_edge(pressed, timestamp)
         
     def is_touched(self):
         """
@@ -109,20 +76,28 @@ class TouchSensor:
         Returns:
             bool: True if touched, False otherwise
         """
-        return GPIO.input(self.pin) == GPIO.HIGH
+        return self.backend.read(self.pin)
+    
+    def start(self):
+        """Start delivering edge events without blocking"""
+        self._stop_event.clear()
+        self.backend.start(self.pin, self._handle_edge, self.bounce_time)
     
     def wait_listener(self):
-        """Main loop to monitor touch events"""
-        while True:
-            current_state = self.is_touched()
-            if current_state != self.is_touching:
-                self._handle_touch(self.pin)
-            time.sleep(0.01)
+        """Monitor touch events until stop() is called
+        
+        Edges arrive as interrupts from the backend, so this thread only sleeps.
+        """
+        self.start()
+        # Wake up periodically so KeyboardInterrupt is delivered promptly
+        while not self._stop_event.wait(1.0):
+            pass
+    
+    def stop(self):
+        """Make wait_listener() return"""
+        self._stop_event.set()
     
     def cleanup(self):
         """Clean up GPIO resources"""
-        if self.long_press_timer:
-            self.long_press_timer.cancel()
-        if self.double_click_timer:
-            self.double_click_timer.cancel()
-        GPIO.cleanup(self.pin)
\ No newline at end of file
+        self.backend.stop()
+        self.gestures.stop()
\ No newline at end of file
@@ -0,0 +1,106 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+import aiohttp
+
+from services.http_pool import HttpPool
+
+
+class AsyncRunner:
+    """
+    One asyncio event loop running on a background thread.
+
+    Async clients share this loop so uploads, model streaming and TTS
+    fetches overlap. Synchronous code calls into it with run() or
+    iterate(), which block the calling thread only.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.http = HttpPool()
+        self._thread = threading.Thread(target=self._run_loop, name="asyncio-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable) -> Future:
+        """Schedule a coroutine on the loop from any thread"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result
+
+        Args:
+            coro: Coroutine to run
+            timeout (float, optional): Seconds to wait before cancelling it
+
+        Raises:
+            TimeoutError: If the timeout expires; the coroutine is cancelled
+            RuntimeError: If called from the loop thread, which would deadlock
+        """
+        if threading.current_thread() is self._thread:
+            if asyncio.iscoroutine(coro):
+                coro.close()  # Never scheduled, close it so it is not reported as unawaited
+            raise RuntimeError("AsyncRunner.run() called from the event loop thread")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator) -> Iterator:
+        """Consume an async generator on the loop as a normal iterator"""
+        items = queue.Queue()
+        done = object()
+
+        async def _pump():
+            try:
+                async for item in agen:
+                    items.put((item, None))
+            except Exception as e:
+                items.put((None, e))
+            finally:
+                items.put((done, None))
+
+        future = self.submit(_pump())
+        try:
+            while True:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is done:
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Shared pooled HTTP session, see HttpPool"""
+        return await self.http.session()
+
+    def close(self):
+        """Close the HTTP sessions and stop the loop"""
+        if self.loop.is_running():
+            self.run(self.http.close(), timeout=5)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join()
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> AsyncRunner:
+    """Return the process-wide event loop, starting it on first use"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncRunner()
+        return _runner
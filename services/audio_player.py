@@ -0,0 +1,192 @@
+import pyaudio
+import pygame
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import NamedTuple, Optional
+
+
+class PlaybackResult(NamedTuple):
+    completed: bool  # False if the chunk was stopped or dropped
+    started: Optional[float]
+    ended: float
+
+
+class PcmPlayer:
+    """
+    Gapless playback of decoded audio through one PyAudio output stream.
+
+    Chunks are decoded to PCM before they are queued, and a single writer
+    thread feeds them to the stream back to back in short blocks, so there
+    is no load or decode gap between sentences. Each queued chunk gets a
+    Future that resolves when it has been played or dropped.
+
+    stop() silences playback within about one block: the writer checks for
+    it between blocks, and chunks queued before the stop are dropped.
+
+    The stream is opened while pygame's mixer holds the output device for
+    cues, so the device must accept more than one client: PipeWire,
+    PulseAudio or an ALSA dmix device do. On a bare hw: device opening the
+    stream fails or blocks the mixer.
+    """
+
+    def __init__(self, block_ms: int = 20, audio: Optional[pyaudio.PyAudio] = None):
+        """
+        Args:
+            block_ms (int): Size of each stream write, bounds the stop latency
+            audio (PyAudio, optional): Shared PyAudio instance
+        """
+        if not pygame.mixer.get_init():
+            pygame.mixer.init()
+        # Decoded chunks come out in the mixer's format
+        self.rate, size, self.channels = pygame.mixer.get_init()
+        self.sample_bytes = abs(size) // 8
+        self.frame_bytes = self.sample_bytes * self.channels
+        self.block_bytes = int(self.rate * block_ms / 1000) * self.frame_bytes
+
+        self.audio = audio or pyaudio.PyAudio()
+        self._owns_audio = audio is None
+        try:
+            self.stream = self.audio.open(
+                format=self.audio.get_format_from_width(self.sample_bytes),
+                channels=self.channels,
+                rate=self.rate,
+                output=True,
+                frames_per_buffer=self.block_bytes // self.frame_bytes,
+            )
+        except OSError as e:
+            print(f"Error opening the speech output stream, the output device must "
+                  f"allow mixing with pygame (PipeWire, PulseAudio or ALSA dmix): {e}")
+            if self._owns_audio:
+                self.audio.terminate()
+            raise
+
+        # Bumped by every stop(), chunks queued for an older one are dropped
+        self.generation = 0
+        self._stop_requested_at = None
+        self._queue = queue.Queue()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._lock = threading.Lock()
+
+        self.stop_latencies = deque(maxlen=256)  # Most recent stops only
+        self.blocks_written = 0
+        self._writer = threading.Thread(target=self._write_loop, name="pcm-player", daemon=True)
+        self._writer.start()
+
+    def decode(self, path: str) -> bytes:
+        """Decode an audio file (MP3, WAV, OGG) into PCM in the stream's format"""
+        return pygame.mixer.Sound(path).get_raw()
+
+    def enqueue(self, pcm: bytes, generation: Optional[int] = None) -> Future:
+        """
+        Queue PCM to play after everything already queued
+
+        Args:
+            pcm (bytes): Audio in the stream's format, see decode()
+            generation (int, optional): Value of self.generation when the
+                caller started; the chunk is dropped if stop() ran since
+
+        Returns:
+            Future: Resolves to a PlaybackResult once the chunk ends
+        """
+        future = Future()
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                future.set_result(PlaybackResult(False, None, time.time()))
+                return future
+            self._idle.clear()
+            self._queue.put((self.generation, pcm, future))
+        return future
+
+    def enqueue_file(self, path: str, generation: Optional[int] = None) -> Future:
+        return self.enqueue(self.decode(path), generation)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued has played, True unless timed out"""
+        return self._idle.wait(timeout)
+
+    def stop(self) -> int:
+        """
+        Barge-in: stop the current chunk and drop everything queued
+
+        Returns immediately; the writer records the stop latency once it has
+        stopped writing.
+
+        Returns:
+            int: The new generation, for chunks that should still play
+        """
+        with self._lock:
+            self.generation += 1
+            if not self._idle.is_set():
+                self._stop_requested_at = time.time()
+            self._drop_queued()
+            return self.generation
+
+    def _drop_queued(self):
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # Keep the shutdown sentinel
+                break
+            item[2].set_result(PlaybackResult(False, None, time.time()))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            generation, pcm, future = item
+            started = time.time()
+            completed = True
+            view = memoryview(pcm)
+            for offset in range(0, len(view), self.block_bytes):
+                if generation != self.generation:
+                    completed = False
+                    break
+                try:
+                    self.stream.write(view[offset:offset + self.block_bytes].tobytes())
+                except Exception as e:
+                    print(f"Playback error: {str(e)}")
+                    completed = False
+                    break
+                self.blocks_written += 1
+            ended = time.time()
+            future.set_result(PlaybackResult(completed, started, ended))
+
+            with self._lock:
+                if not completed and self._stop_requested_at is not None:
+                    self.stop_latencies.append(ended - self._stop_requested_at)
+                    self._stop_requested_at = None
+                if self._queue.empty():
+                    self._idle.set()
+                    self._stop_requested_at = None
+
+    def stats(self) -> dict:
+        """
+        Get playback counters
+
+        Returns:
+            dict: blocks written, block length, and last/max stop latency in seconds
+        """
+        latencies = self.stop_latencies
+        return {
+            'blocks_written': self.blocks_written,
+            'block_ms': 1000 * self.block_bytes / self.frame_bytes / self.rate,
+            'last_stop_latency': latencies[-1] if latencies else None,
+            'max_stop_latency': max(latencies) if latencies else None,
+        }
+
+    def close(self):
+        self.stop()
+        self._queue.put(None)
+        self._writer.join()
+        self.stream.stop_stream()
+        self.stream.close()
+        if self._owns_audio:
+            self.audio.terminate()
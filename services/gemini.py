@@ -6,17 +6,27 @@ from PIL import Image
 import time
 import tempfile
 import re
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from services.aio import get_runner
+from services.audio_player import PcmPlayer
 
  
 
 class GeminiHandler:
-    def __init__(self, api_key, language='en'):
+    def __init__(self, api_key, language='en', tts_workers=2, queue_size=4, tts_cache=None, player=None, sound_bank=None):
         """
         Initialize Gemini handler with gTTS capabilities
         
         Args:
             api_key: Your Google API key for Gemini
             language: Language code for TTS (default: 'en')
+            tts_workers: Number of threads synthesizing sentences ahead of playback
+            queue_size: Maximum sentences buffered between pipeline stages
+            tts_cache: Optional TTSCache shared with other speech call sites
+            player: Optional PcmPlayer, one is opened if not given
+            sound_bank: Optional SoundBank that loops its 'loading' cue while
+                waiting for the model's first sentence
         """
         # Configure Gemini
         genai.configure(api_key=api_key)
@@ -25,9 +35,24 @@ class GeminiHandler:
         
         # TTS settings
         self.language = language
+        self.tts_workers = tts_workers
+        self.queue_size = queue_size
+        self.tts_cache = tts_cache
         
-        # Initialize pygame for audio playback
+        # Timings of the last generate_with_tts call
+        self.metrics = {}
+        
+        # Speech runs on the shared event loop, TTS calls on worker threads
+        self._runner = get_runner()
+        self._tts_executor = ThreadPoolExecutor(max_workers=tts_workers, thread_name_prefix="tts")
+        # One narration at a time, the instance is shared between handlers.
+        # Created on first use so it belongs to the runner's loop
+        self._speech_lock = None
+        
+        # Initialize pygame for decoding, speech plays through one PCM stream
         pygame.mixer.init()
+        self.player = player or PcmPlayer()
+        self.sound_bank = sound_bank
         
         # Create temp directory for audio chunks
         self.temp_dir = tempfile.mkdtemp()
@@ -59,9 +84,16 @@ class GeminiHandler:
         return cleaned_sentences
 
     def _text_to_speech_chunk(self, text, chunk_index):
-        """Convert text chunk to speech using gTTS and save as MP3"""
+        """Convert text chunk to speech using gTTS (or the TTS cache) and save as MP3"""
         if not text.strip():
             return None
+        
+        if self.tts_cache:
+            try:
+                return self.tts_cache.get_or_synthesize(text, lang=self.language, slow=False)
+            except Exception as e:
+                print(f"TTS error: {str(e)}")
+                return None
             
         chunk_path = os.path.join(self.temp_dir, f"chunk_{chunk_index}.mp3")
         try:
@@ -72,16 +104,29 @@ class GeminiHandler:
             print(f"TTS error: {str(e)}")
             return None
 
-    def _play_audio_chunk(self, chunk_path):
-        """Play an audio chunk using pygame"""
-        if chunk_path and os.path.exists(chunk_path):
+    async def _text_to_speech_chunk_async(self, text, chunk_index):
+        """Fetch speech for a text chunk without blocking the event loop"""
+        if self.tts_cache:
             try:
-                pygame.mixer.music.load(chunk_path)
-                pygame.mixer.music.play()
-                while pygame.mixer.music.get_busy():
-                    time.sleep(0.1)
+                return await self.tts_cache.get_or_synthesize_async(
+                    text, lang=self.language, slow=False, executor=self._tts_executor)
             except Exception as e:
-                print(f"Playback error: {str(e)}")
+                print(f"TTS error: {str(e)}")
+                return None
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._tts_executor, self._text_to_speech_chunk, text, chunk_index)
+
+    async def _prepare_chunk(self, text, chunk_index):
+        """Synthesize a sentence and decode it to PCM, off the event loop"""
+        chunk_path = await self._text_to_speech_chunk_async(text, chunk_index)
+        if not chunk_path:
+            return None
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._tts_executor, self.player.decode, chunk_path)
+        except Exception as e:
+            print(f"Decode error: {str(e)}")
+            return None
 
     def _cleanup_chunks(self):
         """Remove temporary audio files"""
@@ -92,62 +137,251 @@ class GeminiHandler:
                 except Exception:
                     pass
 
-    def generate_with_tts(self, prompt, image_path=None):
+    async def stream_text_async(self, prompt, image_path=None, image=None, image_mime='image/jpeg'):
         """
-        Generate response from Gemini and stream it with real-time TTS
+        Stream the text of a Gemini response as it is generated
         
         Args:
             prompt: Text prompt for Gemini
             image_path: Optional path to image file
+            image: Optional in-memory JPEG bytes, used instead of image_path
+            image_mime: MIME type of image, e.g. 'image/png' for text crops
+            
+        Yields:
+            str: Text chunks in order
+        """
+        if image is not None:
+            self.metrics['image_bytes'] = len(image)
+            blob = {'mime_type': image_mime, 'data': image}
+            response = await self.vision_model.generate_content_async([prompt, blob], stream=True)
+        elif image_path:
+            img = Image.open(image_path)
+            response = await self.vision_model.generate_content_async([prompt, img], stream=True)
+        else:
+            response = await self.model.generate_content_async(prompt, stream=True)
+        
+        async for chunk in response:
+            if hasattr(chunk, 'text'):
+                yield chunk.text
+
+    async def _read_sentences(self, text_chunks, sentence_queue, spoken):
         """
+        Stage 1: read the text stream and queue complete sentences
+
+        Returns:
+            bool: True if the stream ended normally, False if it failed part way
+        """
+        buffer = ""
         try:
-            # Handle image if provided
-            if image_path:
-                img = Image.open(image_path)
-                response = self.vision_model.generate_content([prompt, img],stream=True)
-            else:
-                response = self.model.generate_content(prompt,stream=True)
-            
-            chunk_index = 0
-            buffer = ""
-            
-            for chunk in response:
-                if hasattr(chunk, 'text'):
-                    buffer += chunk.text
-                    
-                    # Once we have enough text, process it into natural sentences
-                    if len(buffer) >= 150 or chunk.text.endswith(('.', '!', '?')):
-                        sentences = self._clean_and_split_text(buffer)
-                        
-                        for sentence in sentences:
-                            if sentence.strip():
-                                print(sentence)  # Print the clean sentence
-                                chunk_path = self._text_to_speech_chunk(sentence, chunk_index)
-                                self._play_audio_chunk(chunk_path)
-                                chunk_index += 1
-                        
-                        buffer = ""  # Clear the buffer after processing
+            async for text in text_chunks:
+                spoken.append(text)
+                buffer += text
+                
+                # Once we have enough text, process it into natural sentences
+                if len(buffer) >= 150 or text.endswith(('.', '!', '?')):
+                    for sentence in self._clean_and_split_text(buffer):
+                        await sentence_queue.put(sentence)
+                    buffer = ""  # Clear the buffer after processing
             
             # Process any remaining text in the buffer
             if buffer.strip():
-                sentences = self._clean_and_split_text(buffer)
-                for sentence in sentences:
-                    if sentence.strip():
-                        print(sentence)
-                        chunk_path = self._text_to_speech_chunk(sentence, chunk_index)
-                        self._play_audio_chunk(chunk_path)
-                        chunk_index += 1
-            
+                for sentence in self._clean_and_split_text(buffer):
+                    await sentence_queue.put(sentence)
+            return True
         except Exception as e:
-            print(f"An error occurred: {str(e)}")
+            print(f"Gemini stream error: {str(e)}")
+            return False
+        finally:
+            await sentence_queue.put(None)
+
+    async def _synthesize_sentences(self, sentence_queue, audio_queue):
+        """Stage 2: start TTS for each sentence, keeping their order"""
+        chunk_index = 0
+        while True:
+            sentence = await sentence_queue.get()
+            if sentence is None:
+                break
+            if not sentence.strip():
+                continue
+            task = asyncio.ensure_future(self._prepare_chunk(sentence, chunk_index))
+            # Blocks once queue_size sentences are waiting to be played
+            await audio_queue.put((sentence, task))
+            chunk_index += 1
+        await audio_queue.put(None)
+
+    async def _play_sentences(self, audio_queue, start_time, generation, on_first_audio=None):
+        """Stage 3: queue decoded sentences on the player in order and record timings"""
+        playing = []
+        results = []
+        while True:
+            item = await audio_queue.get()
+            if item is None:
+                break
+            sentence, task = item
+            pcm = await task
+            print(sentence)  # Print the clean sentence
+            if not pcm:
+                continue
+            if on_first_audio and not results and not playing:
+                on_first_audio()
+            playing.append(asyncio.wrap_future(self.player.enqueue(pcm, generation)))
+            # Keep a few sentences ahead of the speaker so playback is gapless
+            while len(playing) >= self.queue_size or (playing and playing[0].done()):
+                results.append(await playing.pop(0))
+                if not results[-1].completed:
+                    break
+            if results and not results[-1].completed:
+                break
+        results.extend(await asyncio.gather(*playing))
+        
+        played = [r for r in results if r.completed]
+        if played:
+            self.metrics['time_to_first_audio'] = played[0].started - start_time
+        gaps = [b.started - a.ended for a, b in zip(played, played[1:])]
+        self.metrics['inter_sentence_gaps'] = gaps
+        self.metrics['max_inter_sentence_gap'] = max(gaps) if gaps else 0.0
+        self.metrics['interrupted'] = len(played) < len(results)
+
+    async def _speak_stream(self, text_chunks, start_time, on_first_audio=None):
+        """
+        Run the synthesis and playback pipeline over an async stream of text
+
+        Sets self.metrics['complete'] only when the whole stream was read and
+        played without interruption, so partial answers are not reused.
+        """
+        sentence_queue = asyncio.Queue(maxsize=self.queue_size)
+        audio_queue = asyncio.Queue(maxsize=self.queue_size)
+        spoken = []
+        generation = self.player.generation
+        
+        stages = [
+            asyncio.ensure_future(self._read_sentences(text_chunks, sentence_queue, spoken)),
+            asyncio.ensure_future(self._synthesize_sentences(sentence_queue, audio_queue)),
+        ]
+        try:
+            await self._play_sentences(audio_queue, start_time, generation, on_first_audio)
+        except asyncio.CancelledError:
+            self.player.stop()
+            raise
         finally:
-            self._cleanup_chunks()
+            # Only still running if playback failed or was cancelled
+            for stage in stages:
+                stage.cancel()
+            outcomes = await asyncio.gather(*stages, return_exceptions=True)
+            while not audio_queue.empty():
+                item = audio_queue.get_nowait()
+                if item is not None:
+                    item[1].cancel()
+        self.metrics['total_time'] = time.time() - start_time
+        # The reader returns True only if its stream ended normally
+        self.metrics['complete'] = outcomes[0] is True and not self.metrics.get('interrupted')
+        return "".join(spoken)
+
+    def _working_cue(self):
+        """Start the loading loop and return a function that stops it once"""
+        if not self.sound_bank:
+            return lambda: None
+        self.sound_bank.start_loop('loading')
+        stopped = []
+        
+        def stop():
+            if not stopped:
+                stopped.append(True)
+                self.sound_bank.stop_loop()
+        return stop
+
+    def _lock(self):
+        if self._speech_lock is None:
+            self._speech_lock = asyncio.Lock()
+        return self._speech_lock
+
+    async def generate_with_tts_async(self, prompt, image_path=None, image=None, timeout=None,
+                                      image_mime='image/jpeg'):
+        """
+        Generate response from Gemini and stream it with real-time TTS.
+        
+        Reading the stream, synthesizing speech and playback run as three
+        pipeline stages on the event loop connected by bounded queues, so the
+        next sentence is synthesized while the current one plays. Timings are
+        left in self.metrics (time_to_first_audio, inter_sentence_gaps).
+        Cancelling the task stops playback.
+        
+        Args:
+            prompt: Text prompt for Gemini
+            image_path: Optional path to image file
+            image: Optional in-memory JPEG bytes, used instead of image_path
+            timeout: Optional seconds before the whole narration is abandoned
+            image_mime: MIME type of image
+            
+        Returns:
+            str: The response text, empty if the request failed. It may be
+            partial if the stream broke off or playback was interrupted, in
+            which case self.metrics['complete'] is False
+        """
+        async with self._lock():
+            start_time = time.time()
+            self.metrics = {'time_to_first_audio': None, 'inter_sentence_gaps': [], 'complete': False}
+            stop_cue = self._working_cue()
+            try:
+                return await asyncio.wait_for(
+                    self._speak_stream(self.stream_text_async(prompt, image_path, image, image_mime), start_time, stop_cue),
+                    timeout
+                )
+            except asyncio.TimeoutError:
+                print(f"Gemini response timed out after {timeout}s")
+                return ""
+            except Exception as e:
+                print(f"An error occurred: {str(e)}")
+                return ""
+            finally:
+                stop_cue()
+                self._cleanup_chunks()
+
+    async def speak_async(self, text, timeout=None):
+        """
+        Speak text through the same TTS pipeline, without calling Gemini
+        
+        Args:
+            text: Text to speak, e.g. an earlier cached answer
+            timeout: Optional seconds before speech is abandoned
+        """
+        async def _text():
+            yield text
+        
+        async with self._lock():
+            start_time = time.time()
+            self.metrics = {'time_to_first_audio': None, 'inter_sentence_gaps': [], 'complete': False}
+            try:
+                return await asyncio.wait_for(self._speak_stream(_text(), start_time), timeout)
+            except asyncio.TimeoutError:
+                print(f"Speech timed out after {timeout}s")
+                return ""
+            finally:
+                self._cleanup_chunks()
+
+    def generate_with_tts(self, prompt, image_path=None, image=None, timeout=None, image_mime='image/jpeg'):
+        """Blocking wrapper around generate_with_tts_async, see its arguments"""
+        return self._runner.run(self.generate_with_tts_async(prompt, image_path, image, timeout, image_mime))
+
+    def speak(self, text, timeout=None):
+        """Blocking wrapper around speak_async, see its arguments"""
+        return self._runner.run(self.speak_async(text, timeout))
+
+    def stop_speaking(self):
+        """
+        Barge-in: silence the current narration within one playback block
+
+        Safe to call from any thread. The narration returns early with
+        metrics['interrupted'] set.
+        """
+        self.player.stop()
 
     def close(self):
         """Cleanup and close resources"""
-        pygame.mixer.quit()
+        self.player.close()
+        self._tts_executor.shutdown(wait=False)
         self._cleanup_chunks()
         try:
             os.rmdir(self.temp_dir)
         except Exception:
-            pass
\ No newline at end of file
+            pass
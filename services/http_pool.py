@@ -0,0 +1,481 @@
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict
+from urllib.parse import urlsplit
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Host gTTS fetches speech from
+TTS_URL = 'https://translate.google.com/'
+
+
+def _host_key(url) -> str:
+    """host:port a connection is pooled under"""
+    parts = urlsplit(str(url))
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    return f"{parts.hostname}:{port}"
+
+
+def _origin(url) -> str:
+    parts = urlsplit(str(url))
+    return f"{parts.scheme}://{parts.netloc}/"
+
+
+# gTTS releases whose stream() sends its prepared requests with
+# requests.Session().send(), the call _GttsRequests stands in for
+GTTS_SUPPORTED = ((2, 2), (3, 0))
+
+
+class _BorrowedSession:
+    """
+    Context manager lending out the shared session without closing it.
+
+    send() uses the pool's verify setting instead of the caller's: gTTS
+    passes verify=False, and urllib3 keeps connections made with different
+    certificate checks in separate pools, so gTTS would never reuse the
+    connections warm_requests() opened.
+    """
+
+    def __init__(self, session: requests.Session, verify):
+        self._session = session
+        self._verify = verify
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def send(self, request, **kwargs):
+        kwargs['verify'] = self._verify
+        return self._session.send(request, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class _GttsRequests:
+    """
+    Stands in for the requests module inside gtts.tts, which opens a new
+    Session (and so a new TLS connection) for every sentence
+    """
+
+    def __init__(self, pool: 'HttpPool'):
+        self._pool = pool
+
+    def Session(self):
+        return _BorrowedSession(self._pool.requests_session(), self._pool.verify)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+def _gtts_supported(version: str) -> bool:
+    try:
+        release = tuple(int(part) for part in version.split('.')[:2])
+    except ValueError:
+        return False
+    low, high = GTTS_SUPPORTED
+    return low <= release < high
+
+
+class _CountingAdapter(HTTPAdapter):
+    """Requests adapter whose connections report their handshakes to the pool"""
+
+    def __init__(self, pool: 'HttpPool', **kwargs):
+        self._pool = pool
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self._pool._urllib3_pool_classes()
+
+    def send(self, request, **kwargs):
+        local = self._pool._local
+        local.handshake = False
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            if not getattr(local, 'warming', False):
+                self._pool._record_request(_host_key(request.url), reused=not local.handshake)
+
+
+class HttpPool:
+    """
+    Keep-alive HTTP connections shared by every client in the process.
+
+    Async clients use one aiohttp session and threaded ones (gTTS) one
+    requests session, both with a bounded number of connections per host.
+    Hosts registered with keep_warm() are pinged while in use so their
+    idle connections are not dropped, and warm() opens a connection ahead
+    of a request. Connection setups and reuse are counted per host.
+    """
+
+    def __init__(self, limit_per_host: int = 4, keepalive_timeout: float = 60.0,
+                 ping_interval: float = 25.0, keep_warm_for: float = 300.0, ssl=None, verify=True):
+        """
+        Args:
+            limit_per_host (int): Most open connections to one host
+            keepalive_timeout (float): Seconds an idle connection is kept open
+            ping_interval (float): Seconds between pings of idle warm hosts,
+                below keepalive_timeout and the servers' idle timeouts
+            keep_warm_for (float): Stop pinging a host this long after its last real request
+            ssl: SSLContext for aiohttp connections, e.g. to trust a test certificate
+            verify: requests' verify setting, True, False or a CA bundle path
+        """
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ping_interval = ping_interval
+        self.keep_warm_for = keep_warm_for
+        self.ssl = ssl
+        self.verify = verify
+
+        self._session = None
+        self._requests_session = None
+        self._pinger = None
+        self._keep_warm = {}  # origin -> 'aiohttp' or 'requests'
+        self._last_used = {}  # host:port -> time of the last real request
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _host_stats(self, host: str) -> Dict:
+        return self._stats.setdefault(host, {
+            'requests': 0, 'reused': 0, 'handshakes': 0, 'handshake_seconds': 0.0, 'warmups': 0,
+        })
+
+    def _record_request(self, host: str, reused: bool):
+        with self._lock:
+            stats = self._host_stats(host)
+            stats['requests'] += 1
+            stats['reused'] += int(reused)
+            self._last_used[host] = time.time()
+
+    def _record_handshake(self, host: str, seconds: float):
+        with self._lock:
+            stats = self._host_stats(host)
+            stats['handshakes'] += 1
+            stats['handshake_seconds'] += seconds
+
+    def _record_warmup(self, host: str):
+        with self._lock:
+            self._host_stats(host)['warmups'] += 1
+
+    # aiohttp trace callbacks. The context is per request, so it carries the
+    # host from the request to the connection events
+    async def _on_request_start(self, session, ctx, params):
+        ctx.host = _host_key(params.url)
+        ctx.warm = bool(ctx.trace_request_ctx and ctx.trace_request_ctx.get('warm'))
+        if not ctx.warm:
+            self._record_request(ctx.host, reused=False)
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        if not ctx.warm:
+            with self._lock:
+                self._host_stats(ctx.host)['reused'] += 1
+
+    async def _on_connection_create_start(self, session, ctx, params):
+        ctx.create_started = time.perf_counter()
+
+    async def _on_connection_create_end(self, session, ctx, params):
+        # DNS, TCP and TLS setup together
+        self._record_handshake(ctx.host, time.perf_counter() - ctx.create_started)
+
+    def _urllib3_pool_classes(self):
+        pool = self
+
+        def timed(connection_class):
+            class TimedConnection(connection_class):
+                def connect(self):
+                    start = time.perf_counter()
+                    super().connect()
+                    pool._local.handshake = True
+                    pool._record_handshake(f"{self.host}:{self.port}", time.perf_counter() - start)
+            return TimedConnection
+
+        class TimedHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = timed(HTTPConnection)
+
+        class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = timed(HTTPSConnection)
+
+        return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session, created on first use inside the event loop"""
+        if self._session is None or self._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_request_start.append(self._on_request_start)
+            trace.on_connection_reuseconn.append(self._on_connection_reuse)
+            trace.on_connection_create_start.append(self._on_connection_create_start)
+            trace.on_connection_create_end.append(self._on_connection_create_end)
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300,
+                ssl=self.ssl if self.ssl is not None else True,
+            )
+            self._session = aiohttp.ClientSession(connector=connector, trace_configs=[trace])
+            if self._pinger is None:
+                self._pinger = asyncio.ensure_future(self._ping_loop())
+        return self._session
+
+    def requests_session(self) -> requests.Session:
+        """Shared requests session for blocking clients, safe to use from several threads"""
+        with self._lock:
+            if self._requests_session is None:
+                session = requests.Session()
+                session.verify = self.verify
+                adapter = _CountingAdapter(self, pool_connections=8, pool_maxsize=self.limit_per_host)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                self._requests_session = session
+            return self._requests_session
+
+    def install_gtts(self) -> bool:
+        """
+        Make gTTS send its requests through the shared requests session
+
+        Returns:
+            bool: False, leaving gTTS untouched, if its version is not one
+            known to use requests.Session().send() internally
+        """
+        import gtts
+        import gtts.tts
+        version = getattr(gtts, '__version__', '')
+        if not _gtts_supported(version) or not hasattr(gtts.tts, 'requests'):
+            print(f"gTTS {version or '(unknown version)'} not supported by the connection pool, "
+                  f"it will open its own connections")
+            return False
+        if not isinstance(gtts.tts.requests, _GttsRequests):
+            gtts.tts.requests = _GttsRequests(self)
+        self.keep_warm(TTS_URL, via='requests')
+        return True
+
+    def keep_warm(self, url: str, via: str = 'aiohttp'):
+        """
+        Keep connections to a URL's host open while it is in use
+
+        Args:
+            url (str): Any URL on the host
+            via (str): 'aiohttp' or 'requests', the session the host is used from
+        """
+        self._keep_warm[_origin(url)] = via
+
+    async def warm(self, url: str):
+        """Open a connection to a URL's host now so the next request skips the handshake"""
+        host = _host_key(url)
+        self._record_warmup(host)
+        try:
+            session = await self.session()
+            async with session.head(_origin(url), trace_request_ctx={'warm': True},
+                                    timeout=aiohttp.ClientTimeout(total=10)):
+                pass
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error warming connection to {host}: {e}")
+
+    def warm_requests(self, url: str):
+        """warm() for the requests session, blocking"""
+        host = _host_key(url)
+        self._record_warmup(host)
+        self._local.warming = True
+        try:
+            # Passed per request as REQUESTS_CA_BUNDLE would override the session's
+            self.requests_session().head(_origin(url), timeout=10, verify=self.verify)
+        except requests.RequestException as e:
+            print(f"Error warming connection to {host}: {e}")
+        finally:
+            self._local.warming = False
+
+    async def _ping_loop(self):
+        """Ping kept-warm hosts that were used recently and have gone quiet"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            now = time.time()
+            for origin, via in list(self._keep_warm.items()):
+                last_used = self._last_used.get(_host_key(origin))
+                if last_used is None or not self.ping_interval <= now - last_used <= self.keep_warm_for:
+                    continue
+                if via == 'requests':
+                    await loop.run_in_executor(None, self.warm_requests, origin)
+                else:
+                    await self.warm(origin)
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        Connection reuse per host
+
+        Returns:
+            dict: host -> requests, reused, reuse_rate, handshakes, mean
+            handshake_ms, saved_ms (handshake time avoided by reused
+            connections) and warmups
+        """
+        with self._lock:
+            report = {}
+            for host, stats in self._stats.items():
+                mean = stats['handshake_seconds'] / stats['handshakes'] if stats['handshakes'] else 0.0
+                report[host] = {
+                    'requests': stats['requests'],
+                    'reused': stats['reused'],
+                    'reuse_rate': stats['reused'] / stats['requests'] if stats['requests'] else 0.0,
+                    'handshakes': stats['handshakes'],
+                    'mean_handshake_ms': mean * 1000,
+                    'saved_ms': stats['reused'] * mean * 1000,
+                    'warmups': stats['warmups'],
+                }
+            return report
+
+    async def close(self):
+        if self._pinger is not None:
+            self._pinger.cancel()
+            self._pinger = None
+        if self._session is not None:
+            await self._session.close()
+        if self._requests_session is not None:
+            self._requests_session.close()
+
+
+class _HandshakeCountingServer:
+    """Local HTTPS stand-in that counts TLS handshakes, for _benchmark()"""
+
+    def __init__(self, cert_dir: str, delay: float = 0.0):
+        import ssl
+        from aiohttp import web
+
+        cert = os.path.join(cert_dir, 'cert.pem')
+        key = os.path.join(cert_dir, 'key.pem')
+        subprocess.run(
+            ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+             '-subj', '/CN=localhost', '-addext', 'subjectAltName=DNS:localhost',
+             '-keyout', key, '-out', cert],
+            check=True, capture_output=True,
+        )
+        self.cert = cert
+        self.handshakes = 0
+        self.delay = delay
+        self.context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        self.context.load_cert_chain(cert, key)
+        # Called once per handshake with the client's SNI
+        self.context.sni_callback = self._count
+        self.app = web.Application()
+        self.app.router.add_route('*', '/{tail:.*}', self._handle)
+        self.runner = None
+        self.port = None
+
+    def _count(self, *args):
+        self.handshakes += 1
+
+    async def _handle(self, request):
+        from aiohttp import web
+        await request.read()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return web.Response(text='{}', content_type='application/json')
+
+    async def start(self) -> str:
+        from aiohttp import web
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, 'localhost', 0, ssl_context=self.context)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"https://localhost:{self.port}/speech"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def _benchmark(requests_per_run: int = 20, rtt: float = 0.05):
+    """
+    Count handshakes against a local TLS server for fresh connections per
+    request versus the shared pool, through both aiohttp and requests
+
+    Args:
+        requests_per_run (int): Requests made in each run
+        rtt (float): Seconds added to every TCP round trip, a cellular hotspot is ~0.05-0.15
+    """
+    import ssl
+    import tempfile
+    from services.aio import get_runner
+
+    runner = get_runner()
+    server = _HandshakeCountingServer(tempfile.mkdtemp())
+    url = runner.run(server.start())
+    client_ssl = ssl.create_default_context(cafile=server.cert)
+
+    # A loopback connection has no latency to save, so model a slow link by
+    # delaying each round trip of connection setup: TCP takes one, TLS 1.3 one more
+    original_create = aiohttp.TCPConnector._wrap_create_connection
+
+    async def slow_create(self, *args, **kwargs):
+        await asyncio.sleep(2 * rtt)
+        return await original_create(self, *args, **kwargs)
+
+    original_connect = HTTPSConnection.connect
+
+    def slow_connect(self):
+        time.sleep(2 * rtt)
+        original_connect(self)
+
+    pool = HttpPool(ssl=client_ssl, verify=server.cert)
+    aiohttp.TCPConnector._wrap_create_connection = slow_create
+    HTTPSConnection.connect = slow_connect
+    try:
+        async def fresh_aiohttp():
+            for _ in range(requests_per_run):
+                async with aiohttp.ClientSession() as session:
+                    async with session.post(url, data=b'x' * 1024, ssl=client_ssl) as resp:
+                        await resp.read()
+
+        def fresh_requests():
+            for _ in range(requests_per_run):
+                with requests.Session() as session:
+                    session.post(url, data=b'x' * 1024, verify=server.cert)
+
+
+        async def pooled_aiohttp():
+            await pool.warm(url)
+            session = await pool.session()
+            for _ in range(requests_per_run):
+                async with session.post(url, data=b'x' * 1024) as resp:
+                    await resp.read()
+
+        def pooled_requests():
+            pool.warm_requests(url)
+            session = pool.requests_session()
+            for _ in range(requests_per_run):
+                session.post(url, data=b'x' * 1024, verify=server.cert)
+
+        for label, run in (
+            ("aiohttp, session per request", lambda: runner.run(fresh_aiohttp())),
+            ("aiohttp, shared pool", lambda: runner.run(pooled_aiohttp())),
+            ("requests, session per request (gTTS)", fresh_requests),
+            ("requests, shared pool", pooled_requests),
+        ):
+            before = server.handshakes
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            print(f"{label}: {server.handshakes - before} TLS handshakes for {requests_per_run} requests, "
+                  f"{elapsed * 1000 / requests_per_run:.1f} ms per request")
+        for host, stats in pool.stats().items():
+            print(f"Pool stats for {host}: {stats}")
+    finally:
+        runner.run(pool.close())
+        aiohttp.TCPConnector._wrap_create_connection = original_create
+        HTTPSConnection.connect = original_connect
+        runner.run(server.stop())
+        runner.close()
+
+
+if __name__ == "__main__":
+    _benchmark(rtt=float(sys.argv[1]) if len(sys.argv) > 1 else 0.05)
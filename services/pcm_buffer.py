@@ -0,0 +1,164 @@
+from typing import Optional
+import time
+
+
+class PcmBuffer:
+    """
+    Fixed-capacity, preallocated buffer for recorded PCM.
+
+    Audio is read straight into one bytearray allocated up front. Consumers
+    (WAV writer, streaming uploader, VAD) get memoryview slices of it, so
+    recorded audio is never copied again after it is read. The buffer is
+    linear rather than wrapping, because every consumer needs the start of
+    the utterance and a contiguous view of it. When it is full, further
+    frames are dropped and counted.
+    """
+
+    def __init__(self, capacity_bytes: int, frame_bytes: int = 2):
+        """
+        Allocate the buffer
+
+        Args:
+            capacity_bytes (int): Size of the buffer in bytes
+            frame_bytes (int): Bytes per frame (sample width times channels)
+        """
+        self.frame_bytes = frame_bytes
+        self._buffer = bytearray(capacity_bytes - capacity_bytes % frame_bytes)
+        self._view = memoryview(self._buffer)
+        self._scratch = bytearray()
+        self.reset()
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buffer)
+
+    def reset(self):
+        """Forget the recorded audio and counters, keeping the allocation"""
+        self.length = 0
+        self.overflows = 0
+        self.dropped_frames = 0
+        self.bytes_moved = 0
+
+    def __len__(self) -> int:
+        return self.length
+
+    def view(self) -> memoryview:
+        """Zero-copy view of everything recorded so far"""
+        return self._view[:self.length]
+
+    def read_from(self, stream, num_frames: int) -> Optional[memoryview]:
+        """
+        Read the next chunk from an audio stream into the buffer
+
+        Uses stream.readinto() when the backend has it, otherwise copies the
+        result of stream.read() into place.
+
+        Args:
+            stream: PyAudio-style input stream
+            num_frames (int): Frames to read
+
+        Returns:
+            memoryview: View of the new chunk, or None if the buffer is full
+                and the chunk was dropped
+        """
+        size = num_frames * self.frame_bytes
+        if self.length + size > self.capacity:
+            # Drain the device anyway so it does not overflow
+            if len(self._scratch) < size:
+                self._scratch = bytearray(size)
+            self._read_into(stream, memoryview(self._scratch)[:size], num_frames)
+            self.overflows += 1
+            self.dropped_frames += num_frames
+            return None
+
+        slot = self._view[self.length:self.length + size]
+        read = self._read_into(stream, slot, num_frames)
+        chunk = self._view[self.length:self.length + read]
+        self.length += read
+        return chunk
+
+    @staticmethod
+    def _read_into(stream, slot: memoryview, num_frames: int) -> int:
+        if hasattr(stream, 'readinto'):
+            return stream.readinto(slot, num_frames)
+        data = stream.read(num_frames, exception_on_overflow=False)
+        read = min(len(data), len(slot))
+        slot[:read] = data[:read]
+        return read
+
+    def keep_tail(self, nbytes: int):
+        """
+        Keep only the last nbytes, moved to the start of the buffer
+
+        Used to hold a short pre-roll while waiting for speech to start.
+        """
+        nbytes -= nbytes % self.frame_bytes
+        if self.length <= nbytes:
+            return
+        if nbytes:
+            self._view[:nbytes] = self._view[self.length - nbytes:self.length]
+            self.bytes_moved += nbytes
+        self.length = nbytes
+
+    def stats(self) -> dict:
+        """
+        Get buffer counters
+
+        Returns:
+            dict: capacity, used bytes, overflows, dropped_frames and bytes_moved
+        """
+        return {
+            'capacity': self.capacity,
+            'used': self.length,
+            'overflows': self.overflows,
+            'dropped_frames': self.dropped_frames,
+            'bytes_moved': self.bytes_moved,
+        }
+
+
+def _benchmark(seconds: float = 30.0, rate: int = 16000, chunk: int = 1024):
+    """Compare list-of-bytes recording with PcmBuffer for memory and copy cost"""
+    import tracemalloc
+
+    class _Silence:
+        def __init__(self):
+            self.data = b'\x00' * chunk * 2
+
+        def read(self, num_frames, exception_on_overflow=True):
+            # Real backends return a new bytes object for every read
+            return bytes(bytearray(self.data[:num_frames * 2]))
+
+    reads = int(seconds * rate / chunk)
+    stream = _Silence()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    frames = []
+    for _ in range(reads):
+        frames.append(stream.read(chunk, exception_on_overflow=False))
+    audio = b''.join(frames)
+    list_time = time.perf_counter() - start
+    _, list_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del frames, audio
+
+    buffer = PcmBuffer(int(seconds * rate) * 2 + chunk * 2)
+    tracemalloc.start()
+    start = time.perf_counter()
+    buffer.reset()
+    for _ in range(reads):
+        buffer.read_from(stream, chunk)
+    audio = buffer.view()
+    buffer_time = time.perf_counter() - start
+    _, buffer_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    recorded = reads * chunk * 2
+    print(f"Recording {seconds:.0f} s ({recorded} bytes) in {reads} reads")
+    print(f"list + join: {list_time * 1000:.2f} ms, peak {list_peak / 1024:.0f} KiB")
+    print(f"PcmBuffer:   {buffer_time * 1000:.2f} ms, peak {buffer_peak / 1024:.0f} KiB "
+          f"(+{buffer.capacity / 1024:.0f} KiB preallocated), {len(audio)} bytes viewed without copying")
+
+
+if __name__ == "__main__":
+    _benchmark()
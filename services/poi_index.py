@@ -0,0 +1,287 @@
+import json
+import math
+import mmap
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS = 6371000.0
+
+# OSM tags that make a named node worth announcing
+POI_KEYS = ('amenity', 'shop', 'tourism', 'leisure', 'healthcare', 'public_transport', 'railway', 'office')
+
+POINT_DTYPE = np.dtype([
+    ('cell', '<i8'),  # Grid cell of the point projected around the index origin
+    ('lat', '<f8'),
+    ('lon', '<f8'),
+    ('category', '<u2'),
+    ('name_offset', '<u4'),
+    ('name_length', '<u2'),
+])
+
+
+class Poi(NamedTuple):
+    name: str
+    category: str
+    latitude: float
+    longitude: float
+    distance: float  # Metres from the query point
+    bearing: float  # Degrees clockwise from north, from the query point
+
+
+def iter_osm_pois(path: str) -> Iterator[Tuple[str, str, float, float]]:
+    """
+    Stream named points of interest from an OSM XML extract
+
+    Yields:
+        (name, category, latitude, longitude) for each named node with one of POI_KEYS
+    """
+    context = ET.iterparse(path, events=('start', 'end'))
+    _, root = next(context)
+    for event, element in context:
+        if event != 'end':
+            continue
+        if element.tag == 'node':
+            tags = {tag.get('k'): tag.get('v') for tag in element.iter('tag')}
+            name = tags.get('name')
+            if name:
+                category = next((tags[key] for key in POI_KEYS if key in tags), None)
+                if category:
+                    yield name, category.replace('_', ' '), float(element.get('lat')), float(element.get('lon'))
+        if element.tag in ('node', 'way', 'relation'):
+            # Drop finished elements from the root too, or a country-sized
+            # extract keeps every cleared element in memory
+            root.clear()
+
+
+def _haversine(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(a))
+
+
+def _bearing(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    y = np.sin(lons - lon) * np.cos(lats)
+    x = np.cos(lat) * np.sin(lats) - np.sin(lat) * np.cos(lats) * np.cos(lons - lon)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+
+class PoiIndex:
+    """
+    Grid-bucketed spatial index over points of interest.
+
+    Points are projected to metres around the index origin and sorted by
+    grid cell, so the points of a run of cells along one column are a
+    contiguous slice found with a binary search. Saved indexes are
+    memory-mapped on load: opening costs nothing and only the pages a
+    query touches are read.
+    """
+
+    def __init__(self, points: np.ndarray, names, categories: List[str],
+                 origin: Tuple[float, float], cell_size: float):
+        self.points = points
+        self._names = names
+        self.categories = categories
+        self.origin = origin
+        self.cell_size = cell_size
+        self._cos_origin = math.cos(math.radians(origin[0]))
+
+    def __len__(self):
+        return len(self.points)
+
+    def _project(self, lat, lon):
+        x = np.radians(np.asarray(lon) - self.origin[1]) * EARTH_RADIUS * self._cos_origin
+        y = np.radians(np.asarray(lat) - self.origin[0]) * EARTH_RADIUS
+        return x, y
+
+    @staticmethod
+    def _cell_key(cx, cy):
+        # Column in the high bits so each column's cells are contiguous
+        return (np.asarray(cx, dtype=np.int64) + 2 ** 31) << 32 | (np.asarray(cy, dtype=np.int64) + 2 ** 31)
+
+    @classmethod
+    def build(cls, pois: Iterable[Tuple[str, str, float, float]], cell_size: float = 250.0) -> 'PoiIndex':
+        """
+        Build an index in memory
+
+        Args:
+            pois: (name, category, latitude, longitude) tuples, e.g. from iter_osm_pois()
+            cell_size (float): Grid cell size in metres
+        """
+        names, categories, lats, lons = [], [], [], []
+        for name, category, lat, lon in pois:
+            names.append(name.encode())
+            categories.append(category)
+            lats.append(lat)
+            lons.append(lon)
+        if not names:
+            raise ValueError("No points of interest to index")
+        lats = np.array(lats)
+        lons = np.array(lons)
+        labels, category_ids = np.unique(categories, return_inverse=True)
+
+        index = cls(np.empty(0, POINT_DTYPE), b'', list(labels),
+                    (float(lats.mean()), float(lons.mean())), cell_size)
+        x, y = index._project(lats, lons)
+        points = np.empty(len(names), POINT_DTYPE)
+        points['cell'] = cls._cell_key(np.floor(x / cell_size), np.floor(y / cell_size))
+        points['lat'] = lats
+        points['lon'] = lons
+        points['category'] = category_ids
+        lengths = np.fromiter((len(n) for n in names), dtype=np.int64, count=len(names))
+        points['name_length'] = lengths
+        points['name_offset'] = np.cumsum(lengths) - lengths
+
+        order = np.argsort(points['cell'], kind='stable')
+        index.points = points[order]
+        index._names = b''.join(names)
+        return index
+
+    def save(self, directory: str):
+        """Write the index as points.npy, names.bin and meta.json"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'points.npy'), self.points)
+        with open(os.path.join(directory, 'names.bin'), 'wb') as f:
+            f.write(self._names)
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump({
+                'origin': self.origin,
+                'cell_size': self.cell_size,
+                'categories': self.categories,
+                'count': len(self.points),
+            }, f)
+
+    @classmethod
+    def load(cls, directory: str) -> 'PoiIndex':
+        """Memory-map an index written by save()"""
+        with open(os.path.join(directory, 'meta.json')) as f:
+            meta = json.load(f)
+        points = np.load(os.path.join(directory, 'points.npy'), mmap_mode='r')
+        with open(os.path.join(directory, 'names.bin'), 'rb') as f:
+            names = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        return cls(points, names, meta['categories'], tuple(meta['origin']), meta['cell_size'])
+
+    def _candidates(self, x: float, y: float, x_radius: float, y_radius: float) -> np.ndarray:
+        """Indices of points in the cells overlapping a rectangle around (x, y)"""
+        cell = self.cell_size
+        cy_low, cy_high = math.floor((y - y_radius) / cell), math.floor((y + y_radius) / cell)
+        columns = np.arange(math.floor((x - x_radius) / cell), math.floor((x + x_radius) / cell) + 1)
+        keys = self.points['cell']
+        starts = np.searchsorted(keys, self._cell_key(columns, cy_low), side='left')
+        ends = np.searchsorted(keys, self._cell_key(columns, cy_high), side='right')
+        slices = [np.arange(s, e) for s, e in zip(starts, ends) if e > s]
+        return np.concatenate(slices) if slices else np.empty(0, dtype=np.int64)
+
+    def _results(self, lat, lon, indices, distances) -> List[Poi]:
+        rows = self.points[indices]
+        bearings = _bearing(lat, lon, rows['lat'], rows['lon'])
+        results = []
+        for row, distance, bearing in zip(rows, distances, bearings):
+            start = int(row['name_offset'])
+            name = bytes(self._names[start:start + int(row['name_length'])]).decode()
+            results.append(Poi(name, self.categories[row['category']], float(row['lat']),
+                               float(row['lon']), float(distance), float(bearing)))
+        return results
+
+    def _within(self, lat, lon, radius):
+        x, y = self._project(lat, lon)
+        # The projection scales east-west distances by cos(origin latitude)
+        # everywhere, so away from the origin a metre on the ground spans
+        # cos(origin) / cos(latitude) projected metres. Widen the search by
+        # that ratio at the most poleward latitude the circle reaches
+        edge_lat = min(abs(lat) + math.degrees(radius / EARTH_RADIUS), 89.0)
+        stretch = self._cos_origin / math.cos(math.radians(edge_lat))
+        indices = self._candidates(float(x), float(y),
+                                   radius * max(stretch, 1.0) * 1.01 + 1, radius * 1.01 + 1)
+        rows = self.points[indices]
+        distances = _haversine(lat, lon, rows['lat'], rows['lon'])
+        keep = distances <= radius
+        indices, distances = indices[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return indices[order], distances[order]
+
+    def within(self, lat: float, lon: float, radius: float, limit: Optional[int] = None) -> List[Poi]:
+        """
+        Points within radius metres, nearest first
+
+        Args:
+            limit (int, optional): Return at most this many
+        """
+        indices, distances = self._within(lat, lon, radius)
+        return self._results(lat, lon, indices[:limit], distances[:limit])
+
+    def nearest(self, lat: float, lon: float, k: int = 5, max_distance: float = 2000.0) -> List[Poi]:
+        """
+        The k nearest points no further than max_distance metres
+
+        The search square grows from one cell until it holds k points that
+        are no further than its half-width, which guarantees nothing closer
+        lies outside it.
+        """
+        radius = self.cell_size
+        while True:
+            radius = min(radius, max_distance)
+            indices, distances = self._within(lat, lon, radius)
+            if len(indices) >= k or radius >= max_distance:
+                return self._results(lat, lon, indices[:k], distances[:k])
+            radius *= 2
+
+
+def _synthetic_city(count: int, seed: int = 1):
+    """Random POIs over a 20 x 20 km city with dense and sparse areas"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal([51.5, -0.12], 0.05, size=(20, 2))
+    which = rng.integers(0, len(centres), count)
+    lats = centres[which, 0] + rng.normal(0, 0.01, count)
+    lons = centres[which, 1] + rng.normal(0, 0.015, count)
+    kinds = ['cafe', 'restaurant', 'pharmacy', 'bus stop', 'supermarket', 'bank', 'school', 'park']
+    for i in range(count):
+        yield f"Place {i}", kinds[i % len(kinds)], float(lats[i]), float(lons[i])
+
+
+def _benchmark(count: int = 250_000, queries: int = 1000):
+    """Build, size and query latency of a city-scale index"""
+    import tempfile
+
+    start = time.perf_counter()
+    index = PoiIndex.build(_synthetic_city(count))
+    build_s = time.perf_counter() - start
+
+    directory = tempfile.mkdtemp()
+    index.save(directory)
+    size = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    start = time.perf_counter()
+    index = PoiIndex.load(directory)
+    load_ms = (time.perf_counter() - start) * 1000
+    print(f"{count:,} POIs: build {build_s:.2f}s, {size / 1e6:.1f} MB on disk, load {load_ms:.2f} ms")
+
+    rng = np.random.default_rng(2)
+    points = rng.normal([51.5, -0.12], [0.05, 0.07], size=(queries, 2))
+    for label, query in (
+        ("nearest 5", lambda lat, lon: index.nearest(lat, lon, k=5)),
+        ("within 300 m", lambda lat, lon: index.within(lat, lon, 300)),
+    ):
+        timings = []
+        found = 0
+        for lat, lon in points:
+            start = time.perf_counter()
+            found += len(query(lat, lon))
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"{label}: median {timings[len(timings) // 2] * 1000:.2f} ms, "
+              f"p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} ms, {found / queries:.1f} results per query")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "build":
+        built = PoiIndex.build(iter_osm_pois(sys.argv[2]))
+        built.save(sys.argv[3])
+        print(f"Indexed {len(built):,} points of interest into {sys.argv[3]}")
+    else:
+        print("Usage: python -m services.poi_index build <extract.osm> <index dir>, benchmarking instead")
+        _benchmark()
@@ -0,0 +1,119 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+
+class ResourceRegistry:
+    """
+    Builds long-lived service instances once and hands the same instance to
+    every caller.
+
+    Resources are registered with a factory and an optional close function.
+    They are built lazily on first get(), or ahead of time by warm() on a
+    background thread, and closed in reverse build order by shutdown().
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._closers: Dict[str, Optional[Callable[[Any], None]]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._build_order = []
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+        self._warm_thread = None
+        self._closed = False
+
+        # Seconds spent building each resource
+        self.build_times: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], Any], close: Optional[Callable[[Any], None]] = None):
+        """
+        Register a resource
+
+        Args:
+            name (str): Name used with get()
+            factory (callable): Builds the instance, called at most once
+            close (callable, optional): Releases the instance on shutdown
+        """
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._closers[name] = close
+            self._locks[name] = threading.Lock()
+
+    def peek(self, name: str) -> Optional[Any]:
+        """
+        Get the shared instance only if it is already built
+
+        Never builds or waits, for callers on threads that must not stall.
+        """
+        return self._instances.get(name)
+
+    def get(self, name: str) -> Any:
+        """
+        Get the shared instance, building it if needed
+
+        If the resource is being warmed on another thread this waits for it
+        instead of building a second instance.
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if self._closed:
+            raise RuntimeError(f"Registry is shut down, cannot build {name}")
+        if name not in self._factories:
+            raise KeyError(f"Unknown resource: {name}")
+
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.time()
+                instance = self._factories[name]()
+                self.build_times[name] = time.time() - start
+                with self._registry_lock:
+                    self._instances[name] = instance
+                    self._build_order.append(name)
+            return self._instances[name]
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> threading.Thread:
+        """
+        Build resources on a background thread
+
+        Args:
+            names (iterable, optional): Resources to build, all if omitted
+
+        Returns:
+            threading.Thread: The warming thread
+        """
+        names = list(names) if names is not None else list(self._factories)
+
+        def _warm():
+            for name in names:
+                try:
+                    self.get(name)
+                    print(f"Warmed {name} in {self.build_times[name]:.2f}s")
+                except Exception as e:
+                    print(f"Error warming {name}: {str(e)}")
+
+        self._warm_thread = threading.Thread(target=_warm, daemon=True)
+        self._warm_thread.start()
+        return self._warm_thread
+
+    def shutdown(self):
+        """Close every built resource, most recently built first"""
+        self._closed = True
+        if self._warm_thread:
+            self._warm_thread.join(timeout=5)
+
+        with self._registry_lock:
+            order = list(reversed(self._build_order))
+            self._build_order = []
+
+        for name in order:
+            instance = self._instances.pop(name)
+            close = self._closers.get(name)
+            if close is None:
+                continue
+            try:
+                close(instance)
+            except Exception as e:
+                print(f"Error closing {name}: {str(e)}")
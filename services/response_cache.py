@@ -0,0 +1,231 @@
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+import bisect
+import json
+import os
+import re
+import threading
+import time
+
+WAKE_PHRASES = ('hey visio', 'ask visio')
+
+# (pattern, ttl in seconds) checked in order against the normalized prompt.
+# A ttl of None means the answer is never cached
+DEFAULT_POLICY = (
+    # Answers that depend on when or where they are asked
+    (r'\b(time|date|day|today|tonight|tomorrow|yesterday|now|weather|forecast|temperature'
+     r'|news|latest|current|score|price|open|nearby|near me)\b', None),
+    # A repeat is fine, but not the same joke all week
+    (r'\b(joke|story|poem|riddle|fun fact)\b', 3600),
+)
+
+DEFAULT_TTL = 7 * 24 * 3600
+
+# Upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+
+
+def normalize_prompt(transcript: str, wake_phrases: Sequence[str] = WAKE_PHRASES) -> str:
+    """
+    Reduce a transcript to the form repeated questions share
+
+    Lower-cases it, strips wake phrases and drops punctuation, so
+    "Hey Visio, what can you do?" and "what can you do" match.
+    """
+    text = transcript.lower()
+    for phrase in wake_phrases:
+        text = text.replace(phrase, ' ')
+    text = re.sub(r"[^\w\s]", '', text)
+    return ' '.join(text.split())
+
+
+class LatencyHistogram:
+    """Counts of latencies per bucket, with a running sum for the mean"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last bucket is everything slower
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def as_dict(self) -> Dict:
+        labels = [f"<={bound:g}s" for bound in self.buckets] + [f">{self.buckets[-1]:g}s"]
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class CachedResponse(NamedTuple):
+    prompt: str  # Normalized prompt
+    text: str
+    created: float
+    expires: float
+    latency: float  # Seconds the model call took, counted as saved on a hit
+
+
+class ResponseCache:
+    """
+    Cache of GPT intent answers keyed by the normalized transcript.
+
+    Each answer lives for the TTL its prompt gets from the policy, and
+    prompts the policy marks as time-sensitive are never cached. The least
+    recently used entry is dropped past max_entries. Entries are saved to a
+    JSON file so repeated questions stay cached across restarts.
+    """
+
+    def __init__(self, path: str = os.path.expanduser("~/.cache/visio/responses.json"),
+                 max_entries: int = 256, default_ttl: float = DEFAULT_TTL,
+                 policy: Sequence[Tuple[str, Optional[float]]] = DEFAULT_POLICY):
+        """
+        Initialize the cache and load the entries saved on disk
+
+        Args:
+            path (str): JSON file the entries are saved to
+            max_entries (int): Entries kept before the least recently used is dropped
+            default_ttl (float): Seconds an answer stays valid when no policy rule matches
+            policy: (regex, ttl) rules, the first match decides; ttl None means do not cache
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.policy = [(re.compile(pattern), ttl) for pattern, ttl in policy]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.saved_seconds = 0.0
+        self.latency = {'hit': LatencyHistogram(), 'miss': LatencyHistogram()}
+        self._load()
+
+    def _load(self):
+        """Read saved entries, least recently used first, skipping expired ones"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable response cache {self.path}: {e}")
+            return
+        if not isinstance(saved, list):
+            print(f"Ignoring response cache {self.path}: not a list of entries")
+            return
+        now = time.time()
+        skipped = 0
+        for item in saved:
+            try:
+                entry = CachedResponse(**item)
+                if entry.expires > now:
+                    self._entries[entry.prompt] = entry
+            except (TypeError, KeyError, AttributeError):
+                # Written by an older version or damaged, drop just this entry
+                skipped += 1
+        if skipped:
+            print(f"Skipped {skipped} unreadable entries in response cache {self.path}")
+
+    def save(self):
+        """Write the entries to disk, replacing the old file in one step"""
+        with self._lock:
+            entries = [entry._asdict() for entry in self._entries.values()]
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(temp_path, self.path)
+
+    def ttl_for(self, prompt: str) -> Optional[float]:
+        """Seconds a normalized prompt's answer may be cached, None if it may not"""
+        for pattern, ttl in self.policy:
+            if pattern.search(prompt):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, transcript: str) -> Optional[CachedResponse]:
+        """
+        Find a live answer for a transcript
+
+        Returns:
+            CachedResponse, or None on a miss or for a prompt the policy excludes
+        """
+        prompt = normalize_prompt(transcript)
+        if not prompt or self.ttl_for(prompt) is None:
+            with self._lock:
+                self.bypassed += 1
+            return None
+        with self._lock:
+            entry = self._entries.get(prompt)
+            if entry is not None and entry.expires <= time.time():
+                del self._entries[prompt]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(prompt)
+            self.hits += 1
+            self.saved_seconds += entry.latency
+            return entry
+
+    def store(self, transcript: str, text: str, latency: float):
+        """
+        Remember the answer to a transcript, if the policy allows it
+
+        Args:
+            transcript (str): What the user said
+            text (str): Model answer
+            latency (float): Seconds the model call took
+        """
+        prompt = normalize_prompt(transcript)
+        ttl = self.ttl_for(prompt) if prompt else None
+        if ttl is None or not text.strip():
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[prompt] = CachedResponse(prompt, text, now, now + ttl, latency)
+            self._entries.move_to_end(prompt)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        try:
+            self.save()
+        except OSError as e:
+            print(f"Error saving response cache: {e}")
+
+    def observe(self, hit: bool, seconds: float):
+        """Record the time from the request to the first audio of a hit or a miss"""
+        with self._lock:
+            self.latency['hit' if hit else 'miss'].observe(seconds)
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+
+        Returns:
+            dict: hits, misses, bypassed, hit_rate (of cacheable prompts),
+            saved_seconds, entries and latency histograms for hits and misses
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_rate': self.hits / total if total else 0.0,
+                'saved_seconds': self.saved_seconds,
+                'entries': len(self._entries),
+                'latency': {kind: histogram.as_dict() for kind, histogram in self.latency.items()},
+            }
+
+    def close(self):
+        """Save the entries, keeping their recency order for the next start"""
+        try:
+            self.save()
+        except OSError as e:
+            print(f"Error saving response cache: {e}")
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+import threading
+import time
+import numpy as np
+
+
+def dhash(frame: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image
+
+    The frame is reduced to a (hash_size, hash_size + 1) grayscale grid by
+    averaging blocks of pixels, and each bit records whether a cell is
+    brighter than its right-hand neighbour. Near-identical scenes differ in
+    only a few bits.
+
+    Args:
+        frame (np.ndarray): HxW grayscale or HxWx3 RGB image
+        hash_size (int): Bits per row of the hash
+
+    Returns:
+        int: hash_size * hash_size bit hash
+    """
+    pixels = np.asarray(frame, dtype=np.float32)
+    if pixels.ndim == 3:
+        pixels = pixels[..., :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+    height, width = pixels.shape
+    rows = np.linspace(0, height, hash_size + 1).astype(int)[:-1]
+    cols = np.linspace(0, width, hash_size + 2).astype(int)[:-1]
+    # Block sums over the grid, then divide by block sizes to get means
+    grid = np.add.reduceat(np.add.reduceat(pixels, rows, axis=0), cols, axis=1)
+    row_sizes = np.diff(np.append(rows, height))[:, None]
+    col_sizes = np.diff(np.append(cols, width))[None, :]
+    grid = grid / (row_sizes * col_sizes)
+
+    bits = (grid[:, 1:] > grid[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return bin(a ^ b).count('1')
+
+
+class SceneEntry(NamedTuple):
+    frame_hash: int
+    prompt: str
+    text: str
+    created: float
+    latency: float
+
+
+class SceneCache:
+    """
+    Cache of vision model answers keyed by a perceptual hash of the frame
+    and the prompt.
+
+    A frame matches a cached entry with the same prompt when their hashes
+    differ in at most max_distance bits and the entry is younger than ttl.
+    """
+
+    def __init__(self, max_distance: int = 6, ttl: float = 120.0, max_entries: int = 32):
+        """
+        Initialize the cache
+
+        Args:
+            max_distance (int): Largest Hamming distance still treated as the same scene
+            ttl (float): Seconds an answer stays valid
+            max_entries (int): Entries kept before the least recently used is dropped
+        """
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def lookup(self, frame_hash: int, prompt: str) -> Optional[SceneEntry]:
+        """
+        Find the answer for a near-identical scene
+
+        Returns:
+            SceneEntry: The closest live entry, or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            best_id, best_distance = None, None
+            for entry_id, entry in list(self._entries.items()):
+                if now - entry.created > self.ttl:
+                    del self._entries[entry_id]
+                    continue
+                if entry.prompt != prompt:
+                    continue
+                distance = hamming_distance(entry.frame_hash, frame_hash)
+                if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                    best_id, best_distance = entry_id, distance
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            self.hits += 1
+            self.saved_seconds += entry.latency
+            return entry
+
+    def store(self, frame_hash: int, prompt: str, text: str, latency: float):
+        """
+        Remember the model's answer for a scene
+
+        Args:
+            frame_hash (int): dhash of the frame
+            prompt (str): Prompt sent with the frame
+            text (str): Model answer
+            latency (float): Seconds the model call took, counted as saved on a hit
+        """
+        if not text.strip():
+            return
+        with self._lock:
+            self._entries[self._next_id] = SceneEntry(frame_hash, prompt, text, time.time(), latency)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+
+        Returns:
+            dict: hits, misses, hit_rate, saved_seconds and entries
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'saved_seconds': self.saved_seconds,
+                'entries': len(self._entries),
+            }
@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+import pygame
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+# Samples per mixer callback: 512 at 44.1 kHz is about 12 ms
+MIXER_BUFFER = 512
+
+
+def init_mixer(frequency: int = 44100, buffer: int = MIXER_BUFFER):
+    """Initialize pygame's mixer with a buffer small enough for prompt cues"""
+    pygame.mixer.pre_init(frequency=frequency, size=-16, channels=2, buffer=buffer)
+    pygame.mixer.init()
+
+
+class SoundBank:
+    """
+    Sound effects decoded into memory once and played on reserved channels.
+
+    One reserved mixer channel plays short cues and another plays looping
+    cues, so a cue never cuts off the loop and neither touches speech,
+    which plays through its own stream. Start latency is bounded by the
+    mixer buffer, so initialize the mixer with init_mixer() first.
+    """
+
+    CUE_CHANNEL = 0
+    LOOP_CHANNEL = 1
+
+    def __init__(self, sfx_dir: str = os.path.join('assets', 'sfx'), mixer_buffer: int = MIXER_BUFFER):
+        """
+        Args:
+            sfx_dir (str): Directory whose audio files become cues, named
+                after the file without its extension
+            mixer_buffer (int): Buffer the mixer was initialized with, for stats()
+        """
+        if not pygame.mixer.get_init():
+            init_mixer(buffer=mixer_buffer)
+        # Keep pygame's automatic channel picking away from our channels
+        pygame.mixer.set_reserved(2)
+        self.cue_channel = pygame.mixer.Channel(self.CUE_CHANNEL)
+        self.loop_channel = pygame.mixer.Channel(self.LOOP_CHANNEL)
+
+        self.sounds: Dict[str, pygame.mixer.Sound] = {}
+        for filename in sorted(os.listdir(sfx_dir)):
+            name, ext = os.path.splitext(filename)
+            if ext.lower() in ('.mp3', '.wav', '.ogg'):
+                self.sounds[name] = pygame.mixer.Sound(os.path.join(sfx_dir, filename))
+
+        frequency, _, _ = pygame.mixer.get_init()
+        self.buffer_ms = 1000 * mixer_buffer / frequency
+        self._loop_lock = threading.Lock()
+        self._loop_depth = 0
+
+        # Seconds from play() being called to the channel starting, for the
+        # most recent cues
+        self.cue_latencies = deque(maxlen=256)
+        self.cues_played = 0
+
+    def play(self, name: str):
+        """Play a cue, replacing any cue still playing"""
+        sound = self.sounds.get(name)
+        if sound is None:
+            print(f"Unknown sound: {name}")
+            return
+        start = time.perf_counter()
+        self.cue_channel.play(sound)
+        self.cue_latencies.append(time.perf_counter() - start)
+        self.cues_played += 1
+
+    def start_loop(self, name: str = 'loading'):
+        """Loop a cue until stop_loop() has been called as often as this"""
+        with self._loop_lock:
+            self._loop_depth += 1
+            if self._loop_depth > 1:
+                return
+            sound = self.sounds.get(name)
+            if sound is not None:
+                self.loop_channel.play(sound, loops=-1)
+
+    def stop_loop(self, fade_ms: int = 150):
+        """Stop the looping cue, safe to call when nothing is looping"""
+        with self._loop_lock:
+            if self._loop_depth == 0:
+                return
+            self._loop_depth -= 1
+            if self._loop_depth == 0:
+                self.loop_channel.fadeout(fade_ms)
+
+    @contextmanager
+    def working(self, name: str = 'loading'):
+        """Loop a cue while the block runs"""
+        self.start_loop(name)
+        try:
+            yield
+        finally:
+            self.stop_loop()
+
+    def stats(self) -> dict:
+        """
+        Get cue latency
+
+        Returns:
+            dict: Cue count, mean/max call latency over recent cues and the
+                mixer buffer, all in milliseconds; a cue is heard within
+                call + buffer latency
+        """
+        latencies = self.cue_latencies
+        return {
+            'cues': self.cues_played,
+            'mean_call_ms': 1000 * sum(latencies) / len(latencies) if latencies else None,
+            'max_call_ms': 1000 * max(latencies) if latencies else None,
+            'buffer_ms': self.buffer_ms,
+        }
+
+    def close(self):
+        with self._loop_lock:
+            self._loop_depth = 0
+            self.loop_channel.stop()
+        self.cue_channel.stop()
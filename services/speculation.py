@@ -0,0 +1,106 @@
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Optional
+import threading
+import time
+
+
+class Speculator:
+    """
+    Runs work before it is known to be needed and tracks whether it paid off.
+
+    start() begins the work on an executor. The caller later either claims
+    the result, when the work turned out to be needed, or discards it.
+    """
+
+    def __init__(self, executor: Executor):
+        """
+        Args:
+            executor (Executor): Runs the speculative work
+        """
+        self.executor = executor
+        self._pending: Optional[Future] = None
+        self._started_at = 0.0
+        self._finished_at = None
+        self._lock = threading.Lock()
+
+        self.started = 0
+        self.hits = 0
+        self.wasted = 0
+        self.saved_seconds = 0.0
+
+    def start(self, fn: Callable[[], Any]) -> bool:
+        """
+        Start speculative work unless some is already pending
+
+        Returns:
+            bool: True if new work was started
+        """
+        with self._lock:
+            if self._pending is not None:
+                return False
+            self._started_at = time.time()
+            self._finished_at = None
+            self._pending = self.executor.submit(self._run, fn)
+            self.started += 1
+            return True
+
+    def _run(self, fn):
+        try:
+            return fn()
+        finally:
+            self._finished_at = time.time()
+
+    def claim(self, timeout: Optional[float] = None) -> Any:
+        """
+        Take the result of the pending work, waiting for it if needed
+
+        Returns:
+            The work's result, or None if nothing was pending or it failed
+        """
+        with self._lock:
+            future, self._pending = self._pending, None
+            started_at = self._started_at
+        if future is None:
+            return None
+
+        claimed_at = time.time()
+        try:
+            result = future.result(timeout)
+        except Exception as e:
+            print(f"Speculative work failed: {str(e)}")
+            with self._lock:
+                self.wasted += 1
+            return None
+
+        # Time the work ran before it was asked for
+        finished_at = self._finished_at or time.time()
+        with self._lock:
+            self.hits += 1
+            self.saved_seconds += max(0.0, min(claimed_at, finished_at) - started_at)
+        return result
+
+    def discard(self):
+        """Drop pending work that turned out not to be needed"""
+        with self._lock:
+            future, self._pending = self._pending, None
+            if future is None:
+                return
+            self.wasted += 1
+        future.cancel()
+
+    def stats(self) -> dict:
+        """
+        Get speculation counters
+
+        Returns:
+            dict: started, hits, wasted, hit_rate and saved_seconds
+        """
+        with self._lock:
+            decided = self.hits + self.wasted
+            return {
+                'started': self.started,
+                'hits': self.hits,
+                'wasted': self.wasted,
+                'hit_rate': self.hits / decided if decided else 0.0,
+                'saved_seconds': self.saved_seconds,
+            }
@@ -0,0 +1,259 @@
+import os
+import threading
+import time
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+# File header, padded to 256 bytes, followed by the record ring
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u4'),
+    ('capacity', '<u8'),
+    ('count', '<u8'),
+    ('head', '<u8'),
+    ('value_dtype', 'S8'),
+    ('columns', 'S216'),
+])
+MAGIC = b'VTS1'
+VERSION = 1
+
+
+class Buckets(NamedTuple):
+    start: np.ndarray  # Start time of each non-empty bucket
+    min: np.ndarray
+    max: np.ndarray
+    mean: np.ndarray
+    count: np.ndarray
+
+
+class TimeSeriesStore:
+    """
+    Fixed-width sensor records in a ring buffer backed by a memory-mapped file.
+
+    Each record is a float64 timestamp followed by one value per column.
+    Once capacity is reached the oldest records are overwritten. The file
+    survives restarts; reopening it with the same columns continues where
+    it left off. Records are expected to be appended in time order, which
+    lets queries binary search instead of scanning.
+    """
+
+    def __init__(self, path: str, columns: Sequence[str], capacity: int = 1_000_000,
+                 value_dtype: str = '<f4', flush_interval: float = 30.0):
+        """
+        Args:
+            path (str): File holding the store, created if missing
+            columns (Sequence[str]): Names of the value columns
+            capacity (int): Number of records kept
+            value_dtype (str): NumPy dtype of the values, '<f8' for coordinates
+            flush_interval (float): Seconds between writes of dirty pages to disk
+        """
+        self.path = path
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.dtype = np.dtype([('t', '<f8')] + [(name, value_dtype) for name in self.columns])
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._last_flush = time.time()
+
+        column_spec = ','.join(self.columns).encode()
+        if len(column_spec) > HEADER_DTYPE['columns'].itemsize:
+            raise ValueError("Column names too long for the store header")
+
+        expected_size = HEADER_DTYPE.itemsize + capacity * self.dtype.itemsize
+        if os.path.exists(path) and os.path.getsize(path) == expected_size:
+            self._header = np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+            header = self._header[0]
+            if (header['magic'] != MAGIC or header['version'] != VERSION
+                    or header['capacity'] != capacity or header['columns'] != column_spec
+                    or header['value_dtype'] != value_dtype.encode()):
+                del self._header
+                self._create(path, column_spec, value_dtype)
+        else:
+            self._create(path, column_spec, value_dtype)
+
+        self._records = np.memmap(path, dtype=self.dtype, mode='r+',
+                                  offset=HEADER_DTYPE.itemsize, shape=(capacity,))
+        self._head = int(self._header[0]['head'])
+        self._count = int(self._header[0]['count'])
+
+    def _create(self, path, column_spec, value_dtype):
+        """Start a new file, keeping an incompatible old one aside"""
+        if os.path.exists(path):
+            print(f"Time series file {path} does not match, moving it to {path}.old")
+            os.replace(path, path + '.old')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.truncate(HEADER_DTYPE.itemsize + self.capacity * self.dtype.itemsize)
+        self._header = np.memmap(path, dtype=HEADER_DTYPE, mode='r+', shape=(1,))
+        self._header[0] = (MAGIC, VERSION, self.capacity, 0, 0, value_dtype.encode(), column_spec)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp: float, *values: float):
+        """Add one record, overwriting the oldest once the store is full"""
+        with self._lock:
+            self._records[self._head] = (timestamp, *values)
+            self._advance(1)
+
+    def extend(self, timestamps: np.ndarray, values: np.ndarray):
+        """
+        Add many records at once
+
+        Args:
+            timestamps (np.ndarray): Shape (n,)
+            values (np.ndarray): Shape (n, len(columns))
+        """
+        timestamps = np.asarray(timestamps)[-self.capacity:]
+        values = np.asarray(values).reshape(len(values), len(self.columns))[-self.capacity:]
+        with self._lock:
+            written = 0
+            while written < len(timestamps):
+                n = min(len(timestamps) - written, self.capacity - self._head)
+                rows = self._records[self._head:self._head + n]
+                rows['t'] = timestamps[written:written + n]
+                for i, name in enumerate(self.columns):
+                    rows[name] = values[written:written + n, i]
+                written += n
+                self._advance(n)
+
+    def _advance(self, n):
+        self._head = (self._head + n) % self.capacity
+        self._count = min(self._count + n, self.capacity)
+        header = self._header[0]
+        header['head'] = self._head
+        header['count'] = self._count
+        if time.time() - self._last_flush > self.flush_interval:
+            self._flush()
+
+    def _segments(self):
+        """The stored records as one or two slices, oldest first"""
+        if self._count < self.capacity:
+            return [self._records[:self._count]]
+        return [self._records[self._head:], self._records[:self._head]]
+
+    def query(self, start: Optional[float] = None, end: Optional[float] = None) -> np.ndarray:
+        """
+        Get records with start <= t < end
+
+        Returns:
+            np.ndarray: Structured array with 't' and one field per column, a copy
+        """
+        start = -np.inf if start is None else start
+        end = np.inf if end is None else end
+        with self._lock:
+            parts = []
+            for segment in self._segments():
+                times = segment['t']
+                lo = np.searchsorted(times, start, side='left')
+                hi = np.searchsorted(times, end, side='left')
+                if hi > lo:
+                    parts.append(segment[lo:hi])
+            if not parts:
+                return np.empty(0, dtype=self.dtype)
+            return np.concatenate(parts)
+
+    def latest(self) -> Optional[np.void]:
+        """The newest record, or None if the store is empty"""
+        with self._lock:
+            if not self._count:
+                return None
+            return self._records[(self._head - 1) % self.capacity].copy()
+
+    def downsample(self, column: str, bucket_seconds: float,
+                   start: Optional[float] = None, end: Optional[float] = None) -> Buckets:
+        """
+        Summarize a column per time bucket
+
+        Args:
+            column (str): Column to summarize
+            bucket_seconds (float): Bucket width
+            start (float, optional): Start of the first bucket, the oldest record by default
+            end (float, optional): End of the range, exclusive
+
+        Returns:
+            Buckets: min, max, mean and count of each bucket holding records
+        """
+        records = self.query(start, end)
+        if not len(records):
+            empty = np.empty(0)
+            return Buckets(empty, empty, empty, empty, np.empty(0, dtype=np.int64))
+
+        times = records['t']
+        values = records[column].astype(np.float64)
+        origin = times[0] if start is None else start
+        bucket = ((times - origin) // bucket_seconds).astype(np.int64)
+        # Records are in time order, so each bucket is a contiguous run
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        counts = np.diff(np.r_[starts, len(values)])
+        return Buckets(
+            start=origin + bucket[starts] * bucket_seconds,
+            min=np.minimum.reduceat(values, starts),
+            max=np.maximum.reduceat(values, starts),
+            mean=np.add.reduceat(values, starts) / counts,
+            count=counts,
+        )
+
+    def _flush(self):
+        self._records.flush()
+        self._header.flush()
+        self._last_flush = time.time()
+
+    def flush(self):
+        """Write dirty pages to disk"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+
+def _benchmark(samples: int = 1_000_000):
+    """Append and query throughput at a million samples"""
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.ts')
+    store = TimeSeriesStore(path, ['temperature', 'humidity'], capacity=samples)
+    base = time.time() - samples * 2.0
+    timestamps = base + np.arange(samples) * 2.0
+    values = np.column_stack([20 + np.random.rand(samples) * 5, 40 + np.random.rand(samples) * 20])
+
+    singles = 100_000
+    start = time.perf_counter()
+    for i in range(singles):
+        store.append(timestamps[i], values[i, 0], values[i, 1])
+    elapsed = time.perf_counter() - start
+    print(f"append(): {singles / elapsed:,.0f} records/s")
+
+    start = time.perf_counter()
+    store.extend(timestamps[singles:], values[singles:])
+    elapsed = time.perf_counter() - start
+    print(f"extend(): {(samples - singles) / elapsed:,.0f} records/s, {len(store):,} stored, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB file")
+
+    # Wrap around so queries span both ring segments
+    store.extend(timestamps[-1] + 2.0 + np.arange(1000) * 2.0, values[:1000])
+    end_time = timestamps[-1] + 2000.0
+
+    for label, span in (("last hour", 3600), ("last day", 86400), ("everything", None)):
+        begin = None if span is None else end_time - span
+        start = time.perf_counter()
+        rows = store.query(begin, end_time)
+        query_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        buckets = store.downsample('temperature', 900 if span == 3600 else 3600, begin, end_time)
+        downsample_ms = (time.perf_counter() - start) * 1000
+        print(f"{label}: query {len(rows):,} rows in {query_ms:.2f} ms, "
+              f"downsample to {len(buckets.start):,} buckets in {downsample_ms:.2f} ms")
+
+    store.close()
+    start = time.perf_counter()
+    reopened = TimeSeriesStore(path, ['temperature', 'humidity'], capacity=samples)
+    print(f"Reopened with {len(reopened):,} records in {(time.perf_counter() - start) * 1000:.2f} ms, "
+          f"latest t={reopened.latest()['t']:.0f}")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    _benchmark()
@@ -0,0 +1,172 @@
+from gtts import gTTS
+from collections import OrderedDict
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache of synthesized speech.
+
+    MP3 files are stored under cache_dir, named after a hash of
+    (text, language, slow). The directory is kept under max_bytes by
+    evicting the least recently used files.
+    """
+
+    def __init__(self, cache_dir=os.path.expanduser("~/.cache/visio/tts"), max_bytes=50 * 1024 * 1024):
+        """
+        Initialize the cache and index the files already on disk
+
+        Args:
+            cache_dir: Directory that holds cached MP3 files
+            max_bytes: Maximum total size of the cache directory in bytes
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.hits = 0
+        self.misses = 0
+
+        # key -> size in bytes, least recently used first
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file modification times"""
+        files = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, name[:-4], stat.st_size))
+
+        for _, key, size in sorted(files):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    @staticmethod
+    def make_key(text, lang="en", slow=False):
+        """Return the cache key for a phrase"""
+        raw = f"{lang}\0{int(bool(slow))}\0{text.strip()}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _evict(self):
+        """Remove least recently used files until the cache fits max_bytes"""
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, text, lang="en", slow=False):
+        """
+        Look up a phrase without synthesizing it
+
+        Returns:
+            str: Path to the cached MP3 or None if it is not cached
+        """
+        key = self.make_key(text, lang, slow)
+        path = self._path(key)
+        with self._lock:
+            if key not in self._entries or not os.path.exists(path):
+                return None
+            self._entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def get_or_synthesize(self, text, lang="en", slow=False):
+        """
+        Return the path to an MP3 of the phrase, synthesizing it on a miss
+
+        Args:
+            text: Text to speak
+            lang: Language code for gTTS
+            slow: Whether gTTS should speak slowly
+
+        Returns:
+            str: Path to the MP3 file inside the cache directory
+        """
+        path = self.get(text, lang, slow)
+        if path:
+            with self._lock:
+                self.hits += 1
+            return path
+
+        with self._lock:
+            self.misses += 1
+
+        key = self.make_key(text, lang, slow)
+        path = self._path(key)
+
+        # Write to a temporary file first so readers never see a partial MP3
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                gTTS(text=text, lang=lang, slow=slow).write_to_fp(f)
+            os.replace(tmp_path, path)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._evict()
+        return path
+
+    async def get_or_synthesize_async(self, text, lang="en", slow=False, executor=None):
+        """
+        Async variant of get_or_synthesize
+
+        Hits are answered on the event loop; only misses go to a worker
+        thread, since gTTS is blocking.
+
+        Args:
+            executor: Executor for synthesis, the loop's default if None
+        """
+        path = self.get(text, lang, slow)
+        if path:
+            with self._lock:
+                self.hits += 1
+            return path
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.get_or_synthesize, text, lang, slow)
+
+    def stats(self):
+        """
+        Get cache counters
+
+        Returns:
+            dict: hits, misses, hit_rate, entries and bytes
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+            }
@@ -0,0 +1,103 @@
+from typing import Tuple
+import numpy as np
+
+
+class EnergyVad:
+    """
+    Energy / zero-crossing voice activity detector for 16-bit mono PCM.
+
+    Chunks are classified as speech when their RMS energy is above a
+    threshold and their zero-crossing rate is below a limit (broadband
+    hiss crosses zero far more often than voiced speech). Leading silence
+    is dropped except for a short pre-roll, and recording should stop once
+    speech has been followed by trailing_silence seconds of silence.
+    """
+
+    def __init__(self, rate: int = 16000, energy_threshold: float = 500.0, zcr_max: float = 0.35,
+                 trailing_silence: float = 0.8, pre_roll: float = 0.2, min_speech: float = 0.15):
+        """
+        Initialize the detector
+
+        Args:
+            rate (int): Sample rate of the audio in Hz
+            energy_threshold (float): Minimum RMS amplitude of a speech chunk
+            zcr_max (float): Maximum zero-crossing rate (crossings per sample) of a speech chunk
+            trailing_silence (float): Seconds of silence after speech that end the recording
+            pre_roll (float): Seconds of audio kept before the first speech chunk
+            min_speech (float): Seconds of speech needed before trailing silence can end the recording
+        """
+        self.rate = rate
+        self.energy_threshold = energy_threshold
+        self.zcr_max = zcr_max
+        self.trailing_silence = trailing_silence
+        self.pre_roll = pre_roll
+        self.min_speech = min_speech
+        self.reset()
+
+    def reset(self):
+        """Clear state before a new recording"""
+        self.speech_started = False
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+        self.trimmed_seconds = 0.0
+        self._leading_silence = 0.0
+
+    @staticmethod
+    def features(chunk) -> Tuple[float, float]:
+        """
+        Compute RMS energy and zero-crossing rate of a PCM chunk
+
+        Returns:
+            tuple: (rms, zero_crossing_rate)
+        """
+        samples = np.frombuffer(chunk, dtype=np.int16)
+        if samples.size == 0:
+            return 0.0, 0.0
+        as_float = samples.astype(np.float32)
+        rms = float(np.sqrt(np.mean(as_float * as_float)))
+        crossings = np.count_nonzero(np.signbit(samples[1:]) != np.signbit(samples[:-1]))
+        return rms, crossings / samples.size
+
+    def is_speech(self, chunk) -> bool:
+        """Classify a single chunk as speech or silence"""
+        rms, zcr = self.features(chunk)
+        return rms >= self.energy_threshold and zcr <= self.zcr_max
+
+    @property
+    def pre_roll_bytes(self) -> int:
+        """Size of the pre-roll in bytes of 16-bit mono PCM"""
+        return int(self.pre_roll * self.rate) * 2
+
+    def update(self, chunk) -> Tuple[bool, bool]:
+        """
+        Feed the next recorded chunk without keeping a copy of it
+
+        The caller holds the audio and keeps only the last pre_roll_bytes
+        while speech has not started.
+
+        Args:
+            chunk: 16-bit mono PCM (bytes or memoryview)
+
+        Returns:
+            tuple: (whether speech has started, whether recording should stop)
+        """
+        duration = len(chunk) / 2 / self.rate
+        speech = self.is_speech(chunk)
+
+        if not self.speech_started:
+            if not speech:
+                self._leading_silence += duration
+                self.trimmed_seconds = max(0.0, self._leading_silence - self.pre_roll)
+                return False, False
+            self.speech_started = True
+            self.speech_seconds += duration
+            return True, False
+
+        if speech:
+            self.speech_seconds += duration
+            self.silence_seconds = 0.0
+        else:
+            self.silence_seconds += duration
+
+        stop = self.speech_seconds >= self.min_speech and self.silence_seconds >= self.trailing_silence
+        return True, stop
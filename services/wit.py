@@ -1,13 +1,22 @@
 from enum import Enum
-import pyaudio
 import wave
-import requests
+import aiohttp
+import asyncio
 import json
 import threading
 import time
-import re
+import codecs
 from pathlib import Path
-from typing import Tuple, Optional, Dict, Any
+from typing import Tuple, Optional, Dict, Any, Iterable, Iterator, AsyncIterable, AsyncIterator, Callable, NamedTuple, List
+from services.vad import EnergyVad
+from services.pcm_buffer import PcmBuffer
+from services.aio import get_runner
+
+try:
+    import pyaudio
+except ImportError:
+    # Only needed to record from a microphone, not with input_stream_factory
+    pyaudio = None
 
 class IntentType(Enum):
     TEMPERATURE = "wit$get_temperature"
@@ -17,75 +26,331 @@ class IntentType(Enum):
     MAPS = "maps"
     GPT = "gpt"
 
+class WitEventType(Enum):
+    PARTIAL_TRANSCRIPTION = "PARTIAL_TRANSCRIPTION"
+    PARTIAL_UNDERSTANDING = "PARTIAL_UNDERSTANDING"
+    FINAL_TRANSCRIPTION = "FINAL_TRANSCRIPTION"
+    FINAL_UNDERSTANDING = "FINAL_UNDERSTANDING"
+    UNKNOWN = "UNKNOWN"
+
+class WitEvent(NamedTuple):
+    type: WitEventType
+    text: str
+    intent: Optional[IntentType]
+    confidence: float
+    result: Dict[str, Any]
+
+class WitStreamDecoder:
+    """Incremental decoder for the concatenated JSON objects sent by Wit.ai."""
+    
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ""
+        
+    def feed(self, chunk: bytes) -> List[dict]:
+        """Add response bytes and return the objects they complete."""
+        self._buffer += self._text_decoder.decode(chunk)
+        objects = []
+        while True:
+            self._buffer = self._buffer.lstrip()
+            if not self._buffer:
+                break
+            try:
+                obj, end = self._decoder.raw_decode(self._buffer)
+            except json.JSONDecodeError:
+                break  # Object is not complete yet
+            self._buffer = self._buffer[end:]
+            objects.append(obj)
+        return objects
+        
+    def close(self):
+        """Report data left over at the end of the response."""
+        if self._buffer.strip():
+            print(f"Error parsing Wit.ai response: trailing data {self._buffer[:50]!r}")
+
+def iter_wit_objects(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """Decode the stream of concatenated JSON objects sent by Wit.ai.
+    
+    Objects are yielded as soon as they are complete, without waiting for
+    the rest of the response body.
+    
+    Args:
+        chunks (Iterable[bytes]): Raw response body chunks
+    """
+    decoder = WitStreamDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    decoder.close()
+
+def _intent_from_result(result: dict) -> Tuple[Optional[IntentType], float]:
+    """Return the top intent of a Wit.ai result and its confidence."""
+    if not result.get('intents'):
+        return None, 0.0
+    top = result['intents'][0]
+    try:
+        return IntentType(top['name']), top.get('confidence', 0.0)
+    except ValueError:
+        return None, top.get('confidence', 0.0)
+
+def _event_from_object(obj: dict) -> WitEvent:
+    try:
+        event_type = WitEventType(obj.get('type'))
+    except ValueError:
+        event_type = WitEventType.UNKNOWN
+    intent, confidence = _intent_from_result(obj)
+    return WitEvent(event_type, obj.get('text', ''), intent, confidence, obj)
+
+def iter_wit_events(chunks: Iterable[bytes]) -> Iterator[WitEvent]:
+    """Turn a Wit.ai response stream into typed events as they arrive.
+    
+    Args:
+        chunks (Iterable[bytes]): Raw response body chunks
+    """
+    for obj in iter_wit_objects(chunks):
+        yield _event_from_object(obj)
+
+async def aiter_wit_events(chunks: AsyncIterable[bytes]) -> AsyncIterator[WitEvent]:
+    """Async variant of iter_wit_events for aiohttp response streams.
+    
+    Args:
+        chunks (AsyncIterable[bytes]): Raw response body chunks
+    """
+    decoder = WitStreamDecoder()
+    async for chunk in chunks:
+        for obj in decoder.feed(chunk):
+            yield _event_from_object(obj)
+    decoder.close()
+
 def parse_wit_respose(response:str)->dict:
     try:
-        # First Get Last JSON object from the string response using regex \n{.*}$
-        # Extract all JSON-like structures using a regular expression
-        json_strings = re.split(r'\n(?=\{)', response)
-        last_json = json.loads(json_strings[-1])        
-        return last_json;
+        # Return the last JSON object of the complete response
+        objects = list(iter_wit_objects([response.encode('utf-8')]))
+        return objects[-1]
     except Exception as e:
         print(f"Error parsing Wit.ai response: {str(e)}")
     return {}
 
+WIT_SPEECH_URL = 'https://api.wit.ai/speech'
+WIT_API_VERSION = '20240101'
+
+class WavFileStream:
+    """Stand-in for a PyAudio input stream that plays back a recorded WAV file.
+    
+    Once the file is exhausted it returns silence, like a quiet microphone.
+    """
+    
+    def __init__(self, path: str, realtime: bool = False):
+        """
+        Args:
+            path (str): 16-bit mono WAV file
+            realtime (bool): Sleep so reads take as long as the audio they return
+        """
+        self.wav = wave.open(path, 'rb')
+        self.realtime = realtime
+        
+    def read(self, num_frames: int, exception_on_overflow: bool = True) -> bytes:
+        data = self.wav.readframes(num_frames)
+        sample_width = self.wav.getsampwidth()
+        if len(data) < num_frames * sample_width:
+            data += b'\x00' * (num_frames * sample_width - len(data))
+        if self.realtime:
+            time.sleep(num_frames / self.wav.getframerate())
+        return data
+        
+    def readinto(self, buffer: memoryview, num_frames: int) -> int:
+        data = self.read(num_frames)
+        buffer[:len(data)] = data
+        return len(data)
+        
+    def stop_stream(self):
+        pass
+        
+    def close(self):
+        self.wav.close()
+
 class WitAiClient:
-    def __init__(self, wit_api_key: str, temp_dir: str = "/tmp"):
+    def __init__(self, wit_api_key: str, temp_dir: str = "/tmp", streaming: bool = False,
+                 api_url: str = WIT_SPEECH_URL, early_intent_threshold: float = 0.9,
+                 vad: Optional[EnergyVad] = None,
+                 input_stream_factory: Optional[Callable[[], Any]] = None,
+                 max_record_seconds: float = 30.0):
         """Initialize WitAi client with API key and temporary directory for audio files.
         
         Args:
             wit_api_key (str): Your Wit.ai API key
             temp_dir (str): Directory to store temporary audio files
+            streaming (bool): Upload audio to Wit.ai while it is being recorded
+            api_url (str): Speech endpoint, can point at a local stand-in server
+            early_intent_threshold (float): Confidence a partial understanding
+                needs before its intent is dispatched early
+            vad (EnergyVad, optional): Trims leading silence and stops the
+                recording after trailing silence
+            input_stream_factory (callable, optional): Returns an object with
+                PyAudio's stream read() interface, e.g. a WavFileStream
+            max_record_seconds (float): Capacity of the preallocated recording
+                buffer; audio beyond it is dropped and the recording stops
         """
         self.wit_api_key = wit_api_key
+        self.api_url = api_url
+        self.streaming = streaming
+        self.early_intent_threshold = early_intent_threshold
+        self.vad = vad
+        self.input_stream_factory = input_stream_factory
         self.temp_dir = Path(temp_dir)
         self.temp_dir.mkdir(parents=True, exist_ok=True)
         
-        # Audio recording settings
-        self.format = pyaudio.paInt16
+        # Audio recording settings, 16-bit PCM
+        self.format = pyaudio.paInt16 if pyaudio else None
+        self.sample_width = 2
         self.channels = 1
         self.rate = 16000
         self.chunk = 1024
         self.recording = False
-        self.audio = pyaudio.PyAudio()
+        # The microphone is opened through PyAudio unless a stream is injected
+        self.audio = None if input_stream_factory else pyaudio.PyAudio()
         
-        # Recording state
-        self.frames = []
+        # Recording state, preallocated once and reused for every recording
+        self.pcm = PcmBuffer(
+            int(max_record_seconds * self.rate) * self.channels * self.sample_width,
+            frame_bytes=self.channels * self.sample_width,
+        )
         self.audio_thread = None
+        self.auto_stopped = False
+        self.on_auto_stop = None
+        
+        # Streaming upload state, the upload runs on the shared event loop
+        self._runner = get_runner()
+        self._runner.http.keep_warm(api_url)
+        self._upload_queue = None
+        self._upload_task = None
+        self.upload_metrics = {}
 
-    def _record_audio(self, timeout: Optional[float] = None):
-        """Internal method to record audio from microphone."""
-        stream = self.audio.open(
+    def _raw_content_type(self) -> str:
+        """Content type describing the raw PCM sent in streaming mode."""
+        bits = self.sample_width * 8
+        return f'audio/raw;encoding=signed-integer;bits={bits};rate={self.rate};endian=little'
+
+    def _headers(self, content_type: str) -> Dict[str, str]:
+        return {
+            'Authorization': f'Bearer {self.wit_api_key}',
+            'Content-Type': content_type,
+        }
+
+    async def _upload_body(self, upload_queue: asyncio.Queue):
+        """Yield PCM chunks for the chunked request body until recording ends."""
+        while True:
+            data = await upload_queue.get()
+            if data is None:
+                return
+            if 'first_byte_sent' not in self.upload_metrics:
+                self.upload_metrics['first_byte_sent'] = time.time()
+            yield data
+
+    async def _upload_stream(self, upload_queue: asyncio.Queue) -> aiohttp.ClientResponse:
+        """Internal coroutine that POSTs the live recording to Wit.ai."""
+        session = await self._runner.session()
+        # An async generator body makes aiohttp use chunked transfer encoding
+        resp = await session.post(
+            self.api_url,
+            headers=self._headers(self._raw_content_type()),
+            data=self._upload_body(upload_queue),
+            params={'v': WIT_API_VERSION},
+        )
+        self.upload_metrics['response_received'] = time.time()
+        return resp
+
+    async def _begin_upload(self):
+        upload_queue = asyncio.Queue()
+        return upload_queue, asyncio.ensure_future(self._upload_stream(upload_queue))
+
+    def _start_upload(self):
+        """Open the streaming request before the first audio chunk is read."""
+        self.upload_metrics = {'upload_started': time.time()}
+        self._upload_queue, self._upload_task = self._runner.run(self._begin_upload())
+
+    def _feed_upload(self, data):
+        """Hand a chunk (or None for end of body) to the upload, from any thread."""
+        self._runner.loop.call_soon_threadsafe(self._upload_queue.put_nowait, data)
+
+    def _open_input_stream(self):
+        """Open the microphone, or the injected stand-in stream."""
+        if self.input_stream_factory:
+            return self.input_stream_factory()
+        return self.audio.open(
             format=self.format,
             channels=self.channels,
             rate=self.rate,
             input=True,
             frames_per_buffer=self.chunk
         )
+
+    def _record_audio(self, timeout: Optional[float] = None):
+        """Internal method to record audio from microphone."""
+        stream = self._open_input_stream()
         
         start_time = time.time()
-        self.frames = []
+        self.pcm.reset()
+        if self.vad:
+            self.vad.reset()
         
         while self.recording:
             if timeout and (time.time() - start_time) > timeout:
-                self.stop()
+                self.auto_stopped = True
                 break
                 
-            data = stream.read(self.chunk, exception_on_overflow=False)
-            self.frames.append(data)
+            chunk = self.pcm.read_from(stream, self.chunk)
+            if chunk is None:
+                print("Recording buffer full, stopping")
+                self.auto_stopped = True
+                break
+            
+            end_of_speech = False
+            if self.vad:
+                was_started = self.vad.speech_started
+                started, end_of_speech = self.vad.update(chunk)
+                if not started:
+                    # Trim leading silence, keeping only the pre-roll
+                    self.pcm.keep_tail(self.vad.pre_roll_bytes)
+                    continue
+                if not was_started:
+                    chunk = self.pcm.view()  # Pre-roll and first speech chunk
+            
+            if self._upload_queue is not None:
+                self._feed_upload(chunk)
+            if end_of_speech:
+                self.auto_stopped = True
+                break
             
         stream.stop_stream()
         stream.close()
+        if self._upload_queue is not None:
+            # End of the chunked request body
+            self.upload_metrics['recording_stopped'] = time.time()
+            self._feed_upload(None)
+        if self.auto_stopped and self.on_auto_stop:
+            # Run outside this thread, since the callback is expected to call stop()
+            threading.Thread(target=self.on_auto_stop, daemon=True).start()
 
-    def record(self, timeout: Optional[float] = None):
+    def record(self, timeout: Optional[float] = None, on_auto_stop: Optional[Callable[[], None]] = None):
         """Start recording audio from microphone.
         
         Args:
             timeout (float, optional): Recording timeout in seconds
+            on_auto_stop (callable, optional): Called when the recording ends
+                by itself, on timeout or when the VAD detects end of speech
         """
         if self.recording:
             return
             
         self.recording = True
+        self.auto_stopped = False
+        self.on_auto_stop = on_auto_stop
+        if self.streaming:
+            self._start_upload()
+        else:
+            # Have a connection ready by the time the recording is uploaded
+            self._runner.submit(self._runner.http.warm(self.api_url))
         self.audio_thread = threading.Thread(
             target=self._record_audio,
             args=(timeout,)
@@ -109,48 +374,96 @@ class WitAiClient:
         temp_file = self.temp_dir / f"recording_{int(time.time())}.wav"
         with wave.open(str(temp_file), 'wb') as wf:
             wf.setnchannels(self.channels)
-            wf.setsampwidth(self.audio.get_sample_size(self.format))
+            wf.setsampwidth(self.sample_width)
             wf.setframerate(self.rate)
-            wf.writeframes(b''.join(self.frames))
+            wf.writeframes(self.pcm.view())
             
         return str(temp_file)
 
-    def process_audio(self, audio_file: str) -> Tuple[IntentType, Dict[str, Any], str]:
+    async def _take_streamed_response(self) -> aiohttp.ClientResponse:
+        """Wait for the streaming upload of the last recording to finish."""
+        task = self._upload_task
+        self._upload_task = None
+        self._upload_queue = None
+        return await task
+
+    async def _post_audio_file(self, audio_file: str) -> aiohttp.ClientResponse:
+        """Upload a recorded WAV file to Wit.ai in one request."""
+        with open(audio_file, 'rb') as f:
+            audio_data = f.read()
+            
+        session = await self._runner.session()
+        return await session.post(
+            self.api_url,
+            headers=self._headers('audio/wav'),
+            data=audio_data,  # Send raw audio data
+            params={
+                'v': WIT_API_VERSION,
+                'content-type': 'audio/wav'  # Added content type parameter
+            },
+        )
+
+    async def stream_events_async(self, audio_file: str) -> AsyncIterator[WitEvent]:
+        """Send audio to Wit.ai and yield response events as they arrive.
+        
+        In streaming mode the audio has already been uploaded while it was
+        recorded, so this only reads the pending response.
+        
+        Args:
+            audio_file (str): Path to audio file
+            
+        Yields:
+            WitEvent: Partial and final transcriptions and understandings
+        """
+        if self._upload_task is not None:
+            resp = await self._take_streamed_response()
+        else:
+            resp = await self._post_audio_file(audio_file)
+        try:
+            if resp.status != 200:
+                text = await resp.text()
+                print(f"Wit.ai API error response: {text}")
+                raise Exception(f"Wit.ai API error: {resp.status} - {text}")
+            
+            async for event in aiter_wit_events(resp.content.iter_any()):
+                yield event
+        finally:
+            resp.release()
+
+    def stream_events(self, audio_file: str) -> Iterator[WitEvent]:
+        """Blocking wrapper around stream_events_async."""
+        yield from self._runner.iterate(self.stream_events_async(audio_file))
+
+    async def process_audio_async(self, audio_file: str,
+                                  on_early_intent: Optional[Callable[[IntentType], None]] = None,
+                                  timeout: Optional[float] = None
+                                  ) -> Tuple[Optional[IntentType], Dict[str, Any], str, Dict[str, Any]]:
         """Send audio file to Wit.ai API and process the response.
         
         Args:
             audio_file (str): Path to audio file
+            on_early_intent (callable, optional): Called once, on the event loop
+                thread, with the intent of the first partial understanding whose
+                confidence reaches early_intent_threshold, before the final
+                result arrives. It must not block.
+            timeout (float, optional): Seconds to wait for the final result
             
         Returns:
             Tuple containing:
-            - IntentType: Detected intent
+            - IntentType: Detected intent, None if unknown or on error
             - Dict: Extracted entities and data
             - str: Transcript of the audio
+            - Dict: Raw final Wit.ai result, empty on error
         """
-        headers = {
-            'Authorization': f'Bearer {self.wit_api_key}',
-            'Content-Type': 'audio/wav',  # Added content type header
-        }
-        
         try:
-            with open(audio_file, 'rb') as f:
-                audio_data = f.read()
-                
-            resp = requests.post(
-                'https://api.wit.ai/speech',
-                headers=headers,
-                data=audio_data,  # Send raw audio data
-                params={
-                    'v': '20240101',
-                    'content-type': 'audio/wav'  # Added content type parameter
-                }
-            )
-            print(f"Wit.ai API response: {resp.text}")
-            if resp.status_code != 200:
-                print(f"Wit.ai API error response: {resp.text}")
-                raise Exception(f"Wit.ai API error: {resp.status_code} - {resp.text}")
-                
-            result = parse_wit_respose(resp.text)
+            result = await asyncio.wait_for(self._read_result(audio_file, on_early_intent), timeout)
+            
+            self.upload_metrics['result_received'] = time.time()
+            if 'recording_stopped' in self.upload_metrics:
+                self.upload_metrics['stop_to_result'] = (
+                    self.upload_metrics['result_received'] - self.upload_metrics['recording_stopped']
+                )
+            print(f"Wit.ai API response: {json.dumps(result)}")
             
             # Extract intent
             intent = None
@@ -174,11 +487,35 @@ class WitAiClient:
             return intent, data, transcript, result
             
         except Exception as e:
-            print(f"Error processing audio: {str(e)}")
+            print(f"Error processing audio: {str(e) or type(e).__name__}")
             # Return empty results in case of error
-            return None, {}, ""
+            return None, {}, "", {}
 
-    def listen_and_process(self, timeout: Optional[float] = None) -> Tuple[IntentType, Dict[str, Any], str]:
+    async def _read_result(self, audio_file: str,
+                           on_early_intent: Optional[Callable[[IntentType], None]]) -> dict:
+        """Read response events, dispatching an early intent, and return the final result."""
+        result = {}
+        early_intent = None
+        async for event in self.stream_events_async(audio_file):
+            if 'intents' in event.result or not result:
+                result = event.result
+            if (on_early_intent and early_intent is None
+                    and event.type == WitEventType.PARTIAL_UNDERSTANDING
+                    and event.intent is not None
+                    and event.confidence >= self.early_intent_threshold):
+                early_intent = event.intent
+                self.upload_metrics['early_intent'] = time.time()
+                on_early_intent(early_intent)
+        return result
+
+    def process_audio(self, audio_file: str,
+                      on_early_intent: Optional[Callable[[IntentType], None]] = None,
+                      timeout: Optional[float] = None
+                      ) -> Tuple[Optional[IntentType], Dict[str, Any], str, Dict[str, Any]]:
+        """Blocking wrapper around process_audio_async, see its arguments."""
+        return self._runner.run(self.process_audio_async(audio_file, on_early_intent, timeout))
+
+    def listen_and_process(self, timeout: Optional[float] = None) -> Tuple[Optional[IntentType], Dict[str, Any], str, Dict[str, Any]]:
         """Record audio and process it through Wit.ai in one step.
         
         Args:
@@ -186,15 +523,13 @@ class WitAiClient:
             
         Returns:
             Tuple containing:
-            - IntentType: Detected intent
+            - IntentType: Detected intent, None if unknown or on error
             - Dict: Extracted entities and data
             - str: Transcript of the audio
+            - Dict: Raw final Wit.ai result, empty on error
         """
         self.record(timeout)
-        time.sleep(0.5)  # Small delay to ensure recording starts
-        
-        while self.recording:
-            time.sleep(0.1)  # Wait for recording to finish
+        self.audio_thread.join()  # Wait for timeout or end of speech
             
         audio_file = self.stop()
         return self.process_audio(audio_file)
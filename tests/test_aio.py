@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("requests")
+from services.aio import AsyncRunner  # noqa: E402
+
+
+@pytest.fixture
+def runner():
+    runner = AsyncRunner()
+    yield runner
+    runner.close()
+
+
+def test_run_and_iterate(runner):
+    async def double(x):
+        await asyncio.sleep(0)
+        return 2 * x
+
+    async def count(n):
+        for i in range(n):
+            yield i
+
+    assert runner.run(double(21)) == 42
+    assert list(runner.iterate(count(5))) == [0, 1, 2, 3, 4]
+
+
+def test_run_timeout_and_errors(runner):
+    with pytest.raises(TimeoutError):
+        runner.run(asyncio.sleep(5), timeout=0.05)
+
+    async def fail():
+        raise ValueError("boom")
+
+    async def fail_midway():
+        yield 1
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        runner.run(fail())
+    items = runner.iterate(fail_midway())
+    assert next(items) == 1
+    with pytest.raises(ValueError):
+        next(items)
+
+
+def test_run_from_loop_thread_is_refused(runner):
+    async def nested():
+        runner.run(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError):
+        runner.run(nested())
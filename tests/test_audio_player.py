@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+pytest.importorskip("pygame")
+pytest.importorskip("pyaudio")
+from services import audio_player  # noqa: E402
+from services.audio_player import PcmPlayer  # noqa: E402
+
+RATE = 8000
+FRAME_BYTES = 4  # 16-bit stereo
+
+
+class FakeStream:
+    """Takes writes at real-time pace, like a sound card"""
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, data):
+        time.sleep(len(data) / FRAME_BYTES / RATE)
+        self.written.append(data)
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeAudio:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.stream = FakeStream()
+        self.terminated = False
+
+    def open(self, **kwargs):
+        if self.fail:
+            raise OSError("Device unavailable")
+        return self.stream
+
+    def get_format_from_width(self, width):
+        return width
+
+    def terminate(self):
+        self.terminated = True
+
+
+@pytest.fixture(autouse=True)
+def mixer_format(monkeypatch):
+    monkeypatch.setattr(audio_player.pygame.mixer, "get_init", lambda: (RATE, -16, 2))
+
+
+@pytest.fixture
+def player():
+    player = PcmPlayer(block_ms=20, audio=FakeAudio())
+    yield player
+    player.close()
+
+
+def seconds(duration, value=1):
+    return bytes([value]) * int(RATE * duration) * FRAME_BYTES
+
+
+def test_chunks_play_back_to_back(player):
+    futures = [player.enqueue(seconds(0.1, value)) for value in (1, 2)]
+    first, second = (f.result(timeout=2) for f in futures)
+    assert first.completed and second.completed
+    assert second.started - first.ended < 0.01
+    assert player.wait_idle(1)
+    written = b"".join(player.audio.stream.written)
+    assert written == seconds(0.1, 1) + seconds(0.1, 2)
+    assert player.stats()['blocks_written'] == 10
+    assert player.stats()['block_ms'] == 20
+
+
+def test_stop_silences_within_a_block(player):
+    playing = player.enqueue(seconds(1))
+    queued = player.enqueue(seconds(1))
+    time.sleep(0.1)
+    player.stop()
+    assert not playing.result(timeout=1).completed
+    assert not queued.result(timeout=1).completed
+    assert player.wait_idle(1)
+    assert player.stats()['last_stop_latency'] < 0.05
+    assert len(player.audio.stream.written) < 10
+
+
+def test_chunk_from_before_a_stop_is_dropped(player):
+    generation = player.generation
+    player.stop()
+    result = player.enqueue(seconds(0.1), generation).result(timeout=0)
+    assert not result.completed and result.started is None
+    assert player.enqueue(seconds(0.02), player.generation).result(timeout=1).completed
+
+
+def test_stop_latency_history_is_bounded(player):
+    for _ in range(300):
+        player.stop_latencies.append(0.001)
+    assert len(player.stop_latencies) == 256
+
+
+def test_failed_stream_open_releases_owned_audio(monkeypatch, capsys):
+    shared = FakeAudio(fail=True)
+    with pytest.raises(OSError):
+        PcmPlayer(audio=shared)
+    assert not shared.terminated  # Belongs to the caller
+    assert "must allow mixing" in capsys.readouterr().out
+
+    owned = FakeAudio(fail=True)
+    monkeypatch.setattr(audio_player.pyaudio, "PyAudio", lambda: owned)
+    with pytest.raises(OSError):
+        PcmPlayer()
+    assert owned.terminated
@@ -0,0 +1,134 @@
+import io
+import time
+from collections import deque
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from sensors.camera import CameraSensor, FileCameraBackend
+
+
+class SoundBank:
+    def __init__(self):
+        self.played = []
+
+    def play(self, name):
+        self.played.append(name)
+
+
+@pytest.fixture
+def photos(tmp_path):
+    """Two 1600x1200 photos, the first red and the second blue"""
+    paths = []
+    for i, color in enumerate(((200, 30, 30), (30, 30, 200))):
+        path = tmp_path / f"photo{i}.png"
+        Image.new('RGB', (1600, 1200), color).save(path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def camera(photos):
+    sounds = SoundBank()
+    camera = CameraSensor(backend=FileCameraBackend(photos), max_size=768, sound_bank=sounds)
+    yield camera
+    camera.close()
+
+
+def test_capture_is_downscaled_jpeg(camera):
+    captured = camera.capture_jpeg()
+    assert (captured.width, captured.height) == (768, 576)
+    with Image.open(io.BytesIO(captured.jpeg)) as img:
+        assert img.format == 'JPEG'
+        assert img.size == (768, 576)
+    assert captured.pixels.shape == (576, 768, 3)
+    assert camera.last_capture is captured
+    assert camera.sound_bank.played == ['capture']
+
+
+def test_capture_size_and_quality_overrides(camera):
+    small = camera.capture_jpeg(max_size=320, play_sound=False)
+    assert (small.width, small.height) == (320, 240)
+    assert camera.sound_bank.played == []
+
+    noisy = np.random.default_rng(0).integers(0, 256, (600, 800, 3), dtype=np.uint8)
+    assert len(camera.encode_jpeg(noisy, quality=30).jpeg) < len(camera.encode_jpeg(noisy, quality=90).jpeg)
+
+
+def test_small_frames_are_not_upscaled(camera):
+    frame = np.zeros((240, 320, 3), np.uint8)
+    assert camera.encode_jpeg(frame).width == 320
+
+
+def test_capture_frame_keeps_full_resolution(camera):
+    frame = camera.capture_frame(play_sound=False)
+    assert frame.shape == (1200, 1600, 3)
+    assert camera.sound_bank.played == []
+
+
+class CountingBackend(FileCameraBackend):
+    def __init__(self, paths):
+        super().__init__(paths)
+        self.captures = 0
+
+    def capture_array(self):
+        self.captures += 1
+        return super().capture_array()
+
+
+def wait_for_frames(camera, count, timeout=5.0):
+    deadline = time.time() + timeout
+    while camera.background_stats()['frames'] < count:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_capture_uses_the_background_frame(photos):
+    backend = CountingBackend(photos)
+    camera = CameraSensor(backend=backend, sound_bank=SoundBank())
+    camera.start_background(interval=10, ring_size=2)
+    try:
+        wait_for_frames(camera, 1)
+        captured = camera.capture_jpeg()
+        assert backend.captures == 1  # Served from the ring
+        assert tuple(captured.pixels[0, 0]) == pytest.approx((200, 30, 30), abs=3)
+    finally:
+        camera.close()
+
+
+def test_stale_background_frame_waits_for_a_new_one(photos):
+    backend = CountingBackend(photos)
+    camera = CameraSensor(backend=backend, sound_bank=SoundBank())
+    camera.start_background(interval=0.3, max_frame_age=0.05)
+    try:
+        wait_for_frames(camera, 1)
+        time.sleep(0.1)
+        captured = camera.capture_jpeg()
+        # The next background frame, not a direct capture
+        assert backend.captures == 2
+        assert camera.background_stats()['frames'] == 2
+        assert tuple(captured.pixels[0, 0]) == pytest.approx((30, 30, 200), abs=3)
+    finally:
+        camera.close()
+
+
+def test_ring_can_store_downscaled_frames(photos):
+    camera = CameraSensor(backend=FileCameraBackend(photos), sound_bank=SoundBank())
+    camera.start_background(interval=0.01, ring_size=3, store_max_size=400)
+    try:
+        wait_for_frames(camera, 3)
+        stats = camera.background_stats()
+        assert stats['ring_bytes'] == 3 * 400 * 300 * 3
+        assert stats['cpu_seconds'] > 0
+        assert 'cpu_percent' in stats
+    finally:
+        camera.stop_background()
+    assert camera._ring == deque()
+    # Without the ring captures go straight to the camera again
+    assert camera.capture_frame(play_sound=False).shape == (1200, 1600, 3)
+    camera.close()
+
+
+def test_no_stats_before_the_background_loop(camera):
+    assert camera.background_stats() == {}
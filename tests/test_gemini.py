@@ -0,0 +1,148 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+pytest.importorskip("gtts")
+pytest.importorskip("pygame")
+pytest.importorskip("pyaudio")
+from services import gemini  # noqa: E402
+from services.audio_player import PlaybackResult  # noqa: E402
+from services.gemini import GeminiHandler  # noqa: E402
+
+
+class FakePlayer:
+    """Plays each chunk for a fixed time on one thread, like PcmPlayer"""
+
+    def __init__(self, seconds=0.05):
+        self.seconds = seconds
+        self.generation = 0
+        self.played = []
+        self.started = threading.Event()
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._play_loop, daemon=True).start()
+
+    def decode(self, path):
+        return path.encode()
+
+    def enqueue(self, pcm, generation=None):
+        future = Future()
+        if generation is not None and generation != self.generation:
+            future.set_result(PlaybackResult(False, None, time.time()))
+        else:
+            self._queue.put((self.generation, pcm, future))
+        return future
+
+    def _play_loop(self):
+        while True:
+            generation, pcm, future = self._queue.get()
+            if generation != self.generation:
+                future.set_result(PlaybackResult(False, None, time.time()))
+                continue
+            started = time.time()
+            self.started.set()
+            self._stopped.clear()
+            completed = not self._stopped.wait(self.seconds)
+            if completed:
+                self.played.append(pcm.decode())
+            future.set_result(PlaybackResult(completed, started, time.time()))
+
+    def stop(self):
+        self.generation += 1
+        self._stopped.set()
+        return self.generation
+
+    def close(self):
+        pass
+
+
+class FakeTTSCache:
+    """Hands the sentence back as its 'file', which FakePlayer decodes"""
+
+    async def get_or_synthesize_async(self, text, lang='en', slow=False, executor=None):
+        return text
+
+
+class Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, chunks, fail_after=None, delay=0.01):
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.delay = delay
+
+    async def generate_content_async(self, prompt, stream=True):
+        async def stream_chunks():
+            for i, text in enumerate(self.chunks):
+                if i == self.fail_after:
+                    raise ConnectionError("stream reset")
+                await asyncio.sleep(self.delay)
+                yield Chunk(text)
+        return stream_chunks()
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    monkeypatch.setattr(gemini.pygame.mixer, "init", lambda *args, **kwargs: None)
+    player = FakePlayer()
+    handler = GeminiHandler("test-key", tts_cache=FakeTTSCache(), player=player)
+    yield handler
+    handler.close()
+
+
+ANSWER = ["The note is a twenty.", " It is a euro note.", " Hold it closer.", " That is all."]
+
+
+def test_complete_answer_is_played_in_order(handler):
+    handler.model = FakeModel(ANSWER)
+    text = handler.generate_with_tts("What is this?")
+    assert text == "".join(ANSWER)
+    assert handler.player.played == [s.strip() for s in ANSWER]
+    metrics = handler.metrics
+    assert metrics['complete'] is True
+    assert metrics['interrupted'] is False
+    assert 0 < metrics['time_to_first_audio'] < 1
+    assert len(metrics['inter_sentence_gaps']) == len(ANSWER) - 1
+    assert metrics['max_inter_sentence_gap'] < 0.05
+
+
+def test_barge_in_marks_the_answer_interrupted(handler):
+    handler.player.seconds = 0.5
+    handler.model = FakeModel(ANSWER)
+
+    def barge_in():
+        if handler.player.started.wait(5):
+            handler.stop_speaking()
+
+    listener = threading.Thread(target=barge_in)
+    listener.start()
+    started = time.time()
+    handler.generate_with_tts("What is this?")
+    listener.join()
+    assert time.time() - started < 1.5  # Not all four sentences
+    assert handler.player.played == []
+    assert handler.metrics['interrupted'] is True
+    assert handler.metrics['complete'] is False
+
+
+def test_broken_stream_is_incomplete(handler):
+    handler.model = FakeModel(ANSWER, fail_after=2)
+    text = handler.generate_with_tts("What is this?")
+    assert text == "".join(ANSWER[:2])
+    assert handler.player.played == [s.strip() for s in ANSWER[:2]]
+    assert handler.metrics['interrupted'] is False
+    assert handler.metrics['complete'] is False
+
+
+def test_speak_runs_text_through_the_same_pipeline(handler):
+    handler.speak("First sentence. Second sentence.")
+    assert handler.player.played == ["First sentence.", "Second sentence."]
+    assert handler.metrics['complete'] is True
@@ -0,0 +1,178 @@
+import queue
+import time
+
+import pytest
+
+from sensors.gesture import GestureRecognizer, TimerScheduler, TouchType
+from sensors.gpio_backend import FakeGpioBackend
+from sensors.touch import TouchSensor
+
+
+@pytest.fixture
+def touch():
+    """TouchSensor on a FakeGpioBackend, recognised gestures go to touch.gestures_seen"""
+    seen = queue.Queue()
+    sensor = TouchSensor(17, callback=seen.put, bounce_time=20, backend=FakeGpioBackend())
+    sensor.gestures_seen = seen
+    sensor.start()
+    yield sensor
+    sensor.cleanup()
+
+
+def next_gesture(sensor, timeout=2.0):
+    return sensor.gestures_seen.get(timeout=timeout)
+
+
+def assert_no_gesture(sensor, wait=0.1):
+    with pytest.raises(queue.Empty):
+        sensor.gestures_seen.get(timeout=wait)
+
+
+def tap(backend, at, duration=0.05):
+    backend.inject(True, at)
+    backend.inject(False, at + duration)
+
+
+def test_single_tap(touch):
+    now = time.monotonic()
+    tap(touch.backend, now)
+    # Waits out double_click_time for a second tap
+    assert next_gesture(touch) == TouchType.SINGLE
+    assert_no_gesture(touch)
+
+
+def test_double_tap_fires_on_second_touch(touch):
+    now = time.monotonic()
+    tap(touch.backend, now)
+    touch.backend.inject(True, now + 0.2)
+    assert next_gesture(touch, timeout=0.3) == TouchType.DOUBLE
+    touch.backend.inject(False, now + 0.25)
+    assert_no_gesture(touch, wait=0.7)
+
+
+def test_taps_too_far_apart_are_two_singles(touch):
+    now = time.monotonic() - 2.0
+    tap(touch.backend, now)
+    tap(touch.backend, now + 1.0)
+    assert next_gesture(touch) == TouchType.SINGLE
+    assert next_gesture(touch) == TouchType.SINGLE
+
+
+def test_long_press_then_release(touch):
+    now = time.monotonic() - 1.5
+    touch.backend.inject(True, now)
+    assert next_gesture(touch) == TouchType.LONG
+    touch.backend.inject(False, now + 1.5)
+    assert next_gesture(touch) == TouchType.HOLD_RELEASE
+
+
+def test_bounce_is_filtered(touch):
+    now = time.monotonic()
+    touch.backend.inject(True, now)
+    # Contact bounce inside the 20 ms debounce window
+    touch.backend.inject(False, now + 0.005)
+    touch.backend.inject(True, now + 0.01)
+    touch.backend.inject(False, now + 0.1)
+    assert next_gesture(touch) == TouchType.SINGLE
+    assert_no_gesture(touch)
+
+
+def test_press_callback_and_level(touch):
+    pressed = queue.Queue()
+    touch.on_press(lambda: pressed.put(True))
+    touch.backend.inject(True)
+    assert pressed.get(timeout=1.0)
+    assert touch.is_touched() and touch.is_touching
+    touch.backend.inject(False, time.monotonic() + 0.05)
+    assert not touch.is_touched()
+
+
+def test_played_edges(touch):
+    touch.backend.play([(0.0, True), (0.05, False), (0.1, True), (0.05, False)])
+    assert next_gesture(touch) == TouchType.DOUBLE
+
+
+def test_triple_tap():
+    seen = queue.Queue()
+    recognizer = GestureRecognizer(seen.put, max_taps=3)
+    try:
+        now = time.monotonic()
+        for i in range(3):
+            recognizer.post_edge(True, now + i * 0.1)
+            recognizer.post_edge(False, now + i * 0.1 + 0.05)
+        assert seen.get(timeout=0.3) == TouchType.TRIPLE
+    finally:
+        recognizer.stop()
+
+
+def test_slow_callback_does_not_delay_recognition():
+    seen = queue.Queue()
+
+    def slow(touch_type):
+        time.sleep(0.3)
+        seen.put(touch_type)
+
+    recognizer = GestureRecognizer(slow, double_click_time=0.05, long_press_time=0.2)
+    try:
+        now = time.monotonic()
+        for i in range(3):
+            recognizer.post_edge(True, now + i * 0.1)
+            recognizer.post_edge(False, now + i * 0.1 + 0.02)
+        assert [seen.get(timeout=2.0) for _ in range(3)] == [TouchType.SINGLE] * 3
+        # The last tap's timer ran while the callback was still busy
+        assert recognizer.scheduler.max_lateness < 0.1
+    finally:
+        recognizer.stop()
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = TimerScheduler(name="test-scheduler")
+    yield scheduler
+    scheduler.stop()
+
+
+def test_timers_run_in_deadline_order(scheduler):
+    ran = queue.Queue()
+    now = time.monotonic()
+    scheduler.call_at(now + 0.06, lambda: ran.put("third"))
+    scheduler.call_at(now + 0.02, lambda: ran.put("first"))
+    scheduler.call_later(0.04, lambda: ran.put("second"))
+    assert [ran.get(timeout=1) for _ in range(3)] == ["first", "second", "third"]
+    assert 0 <= scheduler.max_lateness < 0.05
+
+
+def test_posted_tasks_run_first_in_posting_order(scheduler):
+    ran = queue.Queue()
+    scheduler.call_later(0.02, lambda: ran.put("timer"))
+    for i in range(3):
+        scheduler.post(lambda i=i: ran.put(i))
+    assert [ran.get(timeout=1) for _ in range(4)] == [0, 1, 2, "timer"]
+
+
+def test_cancelled_timer_does_not_run(scheduler):
+    ran = queue.Queue()
+    handle = scheduler.call_later(0.02, lambda: ran.put("cancelled"))
+    scheduler.call_later(0.04, lambda: ran.put("kept"))
+    scheduler.cancel(handle)
+    scheduler.cancel(None)
+    assert ran.get(timeout=1) == "kept"
+    assert ran.empty()
+
+
+def test_failing_task_does_not_stop_the_scheduler(scheduler, capsys):
+    ran = queue.Queue()
+    scheduler.post(lambda: 1 / 0)
+    scheduler.post(lambda: ran.put("after"))
+    assert ran.get(timeout=1) == "after"
+    assert "Error in gesture scheduler" in capsys.readouterr().out
+
+
+def test_stop_drops_pending_timers():
+    ran = queue.Queue()
+    scheduler = TimerScheduler()
+    scheduler.call_later(0.05, lambda: ran.put("late"))
+    scheduler.stop()
+    assert not scheduler._thread.is_alive()
+    time.sleep(0.1)
+    assert ran.empty()
@@ -0,0 +1,128 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("serial")
+pytest.importorskip("pynmea2")
+from sensors import gps  # noqa: E402
+from sensors.gps import GPSReader  # noqa: E402
+from sensors.gps_source import ReplayGpsSource  # noqa: E402
+
+
+def sentence(body: str) -> bytes:
+    checksum = 0
+    for char in body.encode():
+        checksum ^= char
+    return f"${body}*{checksum:02X}\r\n".encode()
+
+
+GGA = "GNGGA,123519.00,4807.03812,N,01131.00045,E,1,12,0.9,545.4,M,46.9,M,,"
+
+
+def replay(tmp_path, lines, **kwargs):
+    path = tmp_path / "log.nmea"
+    path.write_bytes(b"".join(lines))
+    return ReplayGpsSource(str(path), speed=0, timeout=0.05, **kwargs)
+
+
+def run_to_end(reader, source, timeout=5.0):
+    reader.start()
+    try:
+        assert source.finished.wait(timeout)
+    finally:
+        reader.stop()
+
+
+def test_malformed_field_does_not_stop_the_reader(tmp_path):
+    # Valid checksum, but the latitude cannot be parsed by either parser
+    bad = sentence(GGA.replace("4807.03812", "48X7.03812"))
+    source = replay(tmp_path, [bad, sentence(GGA)])
+    reader = GPSReader(source=source)
+    run_to_end(reader, source)
+    assert reader.sentence_stats == {'sentences': 1, 'parse_errors': 1}
+    assert reader.fix.latitude == pytest.approx(48.117302)
+
+
+def test_wait_for_fix_without_receiver_does_not_spin(capsys):
+    reader = GPSReader(port="/dev/does-not-exist")
+    assert not reader.wait_for_fix(timeout=1.0)
+    attempts = capsys.readouterr().out.count("Error connecting to GPS module")
+    assert 1 <= attempts <= 3
+
+
+RMC = "GNRMC,123519.00,A,4807.03812,N,01131.00045,E,10.0,84.4,230394,003.1,W"
+VTG = "GNVTG,84.4,T,,M,10.0,N,18.5,K,A"
+GSA = "GNGSA,A,3,04,05,09,12,24,,,,,,,,2.5,1.3,2.1"
+
+
+class History:
+    def __init__(self):
+        self.rows = []
+
+    def append(self, timestamp, latitude, longitude, altitude):
+        self.rows.append((latitude, longitude, altitude))
+
+
+def test_background_reader_merges_sentence_types(tmp_path):
+    source = replay(tmp_path, [sentence(s) for s in (GGA, RMC, VTG, GSA)])
+    history = History()
+    reader = GPSReader(source=source, history=history)
+    run_to_end(reader, source)
+    fix = reader.fix
+    assert fix.latitude == pytest.approx(48.117302)
+    assert fix.longitude == pytest.approx(11.516674)
+    assert fix.altitude == 545.4
+    assert fix.satellites == 12
+    assert fix.speed_kmh == 18.5  # VTG came after RMC's knots
+    assert fix.course == 84.4
+    assert fix.fix_type == 3
+    assert fix.hdop == 1.3  # GSA came after GGA
+    assert fix.fix_time == datetime(1994, 3, 23, 12, 35, 19, tzinfo=timezone.utc)
+    assert reader.sentence_stats == {'sentences': 4, 'parse_errors': 0}
+    # Only GGA carries altitude, so only GGA goes to the history
+    assert history.rows == [(pytest.approx(48.117302), pytest.approx(11.516674), 545.4)]
+
+
+def test_wait_for_fix_wakes_on_first_fix(tmp_path):
+    no_fix = GGA.replace(",1,12,", ",0,00,")
+    source = replay(tmp_path, [sentence(no_fix), sentence(GGA)])
+    # The fix arrives 0.3 s after the reader starts
+    source.speed = 1.0
+    source.entries[1] = (0.3, source.entries[1][1])
+    reader = GPSReader(source=source)
+    reader.start()
+    try:
+        started = time.monotonic()
+        assert reader.wait_for_fix(timeout=5)
+        assert time.monotonic() - started < 2
+        assert reader.get_location() == (pytest.approx(48.117302), pytest.approx(11.516674))
+        assert reader.read_gps_data()['quality'] == 1
+    finally:
+        reader.stop()
+
+
+def test_no_location_from_a_silent_receiver(tmp_path, monkeypatch):
+    source = replay(tmp_path, [sentence(GGA)])
+    reader = GPSReader(source=source)
+    reader.start()
+    try:
+        assert source.finished.wait(5)
+        assert reader.get_location() is not None
+        # The replay has gone quiet, as a receiver that lost power would
+        monkeypatch.setattr(gps, "MAX_FIX_AGE", 0.0)
+        time.sleep(0.01)
+        assert not reader.fix.has_fix
+        assert reader.get_location() is None
+    finally:
+        reader.stop()
+
+
+def test_read_gps_data_without_the_reader(tmp_path):
+    source = replay(tmp_path, [sentence(RMC), sentence(GGA)])
+    reader = GPSReader(source=source)
+    data = reader.read_gps_data()
+    assert data['latitude'] == pytest.approx(48.117302)
+    assert data['satellites'] == 12
+    # Within min_read_interval nothing is read
+    assert reader.read_gps_data() is None
@@ -0,0 +1,98 @@
+import time
+
+import pytest
+
+from sensors.gps_source import ReplayGpsSource, load_nmea_log, write_sample_log
+from sensors.nmea import parse_fix_updates
+
+
+def sentence(body: str) -> bytes:
+    checksum = 0
+    for char in body.encode():
+        checksum ^= char
+    return f"${body}*{checksum:02X}\r\n".encode()
+
+
+def gga(clock: str) -> bytes:
+    return sentence(f"GNGGA,{clock},4807.03812,N,01131.00045,E,1,12,0.9,545.4,M,46.9,M,,")
+
+
+GSA = sentence("GNGSA,A,3,04,05,09,12,24,,,,,,,,2.5,1.3,2.1")
+
+
+def write_log(tmp_path, lines):
+    path = tmp_path / "log.nmea"
+    path.write_bytes(b"".join(lines))
+    return str(path)
+
+
+def test_log_times_come_from_fix_sentences(tmp_path):
+    path = write_log(tmp_path, [GSA, gga("120000.00"), GSA, b"garbage\r\n", gga("120001.50")])
+    entries = load_nmea_log(path)
+    assert [relative for relative, _ in entries] == [0.0, 0.0, 0.0, 1.5]
+    assert all(line.endswith(b"\r\n") for _, line in entries)
+
+
+def test_log_times_run_on_past_midnight(tmp_path):
+    path = write_log(tmp_path, [gga("235959.00"), gga("000001.00")])
+    assert [relative for relative, _ in load_nmea_log(path)] == [0.0, 2.0]
+
+
+def test_replay_is_scaled_by_speed(tmp_path):
+    path = write_log(tmp_path, [gga("120000.00"), gga("120001.00")])
+    source = ReplayGpsSource(path, speed=10)
+    source.open()
+    source.readline()
+    started = time.monotonic()
+    assert source.readline()
+    assert 0.05 < time.monotonic() - started < 0.5
+
+
+def test_replay_goes_quiet_or_loops_at_the_end(tmp_path):
+    path = write_log(tmp_path, [gga("120000.00"), GSA])
+    source = ReplayGpsSource(path, speed=0, timeout=0.01)
+    source.open()
+    assert [source.readline() for _ in range(3)] == [gga("120000.00"), GSA, b""]
+    assert source.finished.is_set()
+
+    looping = ReplayGpsSource(path, speed=0, loop=True)
+    looping.open()
+    assert [looping.readline() for _ in range(3)] == [gga("120000.00"), GSA, gga("120000.00")]
+    assert not looping.finished.is_set()
+
+
+def test_replay_of_an_empty_log_fails_to_open(tmp_path):
+    source = ReplayGpsSource(write_log(tmp_path, [b"no sentences here\n"]))
+    with pytest.raises(OSError):
+        source.open()
+
+
+def test_sample_log_parses_cleanly(tmp_path):
+    path = str(tmp_path / "sample.nmea")
+    write_sample_log(path, seconds=2, hz=10)
+    entries = load_nmea_log(path)
+    assert entries[-1][0] == pytest.approx(1.9)
+    # Raises on a bad checksum or field
+    types = [parse_fix_updates(line) for _, line in entries]
+    assert sum(1 for parsed in types if parsed and parsed[0] == 'GGA') == 20
+
+
+def test_pty_replay_runs_through_the_serial_path(tmp_path):
+    pytest.importorskip("serial")
+    from sensors.gps import GPSReader
+    from sensors.gps_source import PtyGpsReplay
+
+    path = str(tmp_path / "sample.nmea")
+    write_sample_log(path, seconds=1, hz=10)
+    # Looped, as opening the port flushes whatever was written before
+    pty_replay = PtyGpsReplay(path, speed=0, loop=True)
+    reader = GPSReader(port=pty_replay.start(), baud_rate=115200, timeout=0.2)
+    reader.start()
+    try:
+        assert reader.wait_for_fix(timeout=5)
+    finally:
+        reader.stop()
+        pty_replay.stop()
+    assert reader.sentence_stats['sentences'] > 0
+    # At most the line the flush cut in two
+    assert reader.sentence_stats['parse_errors'] <= 1
@@ -0,0 +1,166 @@
+import shutil
+import ssl
+import wave
+
+import pytest
+
+pytest.importorskip("aiohttp")
+requests = pytest.importorskip("requests")
+from aiohttp import web  # noqa: E402
+
+from services.aio import AsyncRunner, get_runner  # noqa: E402
+from services.http_pool import (  # noqa: E402
+    HttpPool,
+    _BorrowedSession,
+    _GttsRequests,
+    _gtts_supported,
+    _HandshakeCountingServer,
+)
+from services.wit import WitAiClient  # noqa: E402
+
+
+@pytest.fixture
+def runner():
+    runner = AsyncRunner()
+    yield runner
+    runner.close()
+
+
+@pytest.fixture
+def server(runner):
+    """Plain HTTP server on the runner's loop, yields its base URL"""
+    async def handle(request):
+        return web.Response(text='{}', content_type='application/json')
+
+    async def start():
+        app = web.Application()
+        app.router.add_route('*', '/{tail:.*}', handle)
+        app_runner = web.AppRunner(app)
+        await app_runner.setup()
+        site = web.TCPSite(app_runner, '127.0.0.1', 0)
+        await site.start()
+        return app_runner, site._server.sockets[0].getsockname()[1]
+
+    app_runner, port = runner.run(start())
+    yield f"http://127.0.0.1:{port}"
+    runner.run(app_runner.cleanup())
+
+
+def test_aiohttp_connections_are_reused(runner, server):
+    async def fetch(times):
+        session = await runner.session()
+        for _ in range(times):
+            async with session.get(f"{server}/speech") as response:
+                await response.read()
+
+    runner.run(fetch(5))
+    stats, = runner.http.stats().values()
+    assert stats['requests'] == 5
+    assert stats['handshakes'] == 1
+    assert stats['reused'] == 4
+
+
+def test_warm_opens_the_connection_ahead(runner, server):
+    runner.run(runner.http.warm(server))
+
+    async def fetch():
+        session = await runner.session()
+        async with session.post(f"{server}/speech", data=b'audio') as response:
+            await response.read()
+
+    runner.run(fetch())
+    stats, = runner.http.stats().values()
+    assert stats['warmups'] == 1
+    assert stats['requests'] == 1
+    assert stats['reused'] == 1
+
+
+def test_requests_connections_are_reused(runner, server):
+    session = runner.http.requests_session()
+    for _ in range(3):
+        session.get(f"{server}/translate").raise_for_status()
+    stats, = runner.http.stats().values()
+    assert stats['requests'] == 3
+    assert stats['handshakes'] == 1
+
+
+def test_borrowed_session_stays_open_and_forces_verify(runner, server):
+    session = runner.http.requests_session()
+    borrowed = _BorrowedSession(session, verify=True)
+    sent = {}
+    original_send = session.send
+
+    def send(request, **kwargs):
+        sent.update(kwargs)
+        return original_send(request, **kwargs)
+
+    session.send = send
+    with borrowed as s:
+        prepared = requests.Request('GET', f"{server}/translate").prepare()
+        s.send(prepared, verify=False).raise_for_status()
+    assert sent['verify'] is True
+    # Closing the borrowed session must not close the shared one
+    session.get(f"{server}/translate").raise_for_status()
+
+
+@pytest.mark.parametrize("version, supported", [
+    ("2.2.0", True), ("2.5.1", True), ("2.99", True),
+    ("2.1.1", False), ("3.0.0", False), ("", False), ("dev", False),
+])
+def test_gtts_version_guard(version, supported):
+    assert _gtts_supported(version) is supported
+
+
+@pytest.fixture
+def tls_server(tmp_path):
+    """
+    Local HTTPS server counting TLS handshakes, with the shared runner's
+    pool pointed at its certificate for the test
+    """
+    if shutil.which('openssl') is None:
+        pytest.skip("openssl is needed to make the test certificate")
+    runner = get_runner()
+    server = _HandshakeCountingServer(str(tmp_path))
+    server.url = runner.run(server.start())
+    original = runner.http
+    runner.http = HttpPool(ssl=ssl.create_default_context(cafile=server.cert), verify=server.cert)
+    yield server
+    runner.run(runner.http.close())
+    runner.http = original
+    runner.run(server.stop())
+
+
+def test_one_tls_handshake_per_session_across_clients(tls_server, tmp_path):
+    runner = get_runner()
+    pool = runner.http
+    recording = tmp_path / "recording.wav"
+    with wave.open(str(recording), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\0\0" * 1600)
+
+    # Warm-up, then Wit.ai requests over the shared aiohttp session
+    runner.run(pool.warm(tls_server.url))
+    assert tls_server.handshakes == 1
+    wit = WitAiClient("test-key", temp_dir=str(tmp_path), api_url=tls_server.url,
+                      input_stream_factory=lambda: None)
+    for _ in range(3):
+        wit.process_audio(str(recording))
+    assert tls_server.handshakes == 1
+
+    # gTTS opens a Session per sentence and sends with verify=False; the
+    # borrowed sessions still reuse the connection warm_requests() opened
+    pool.warm_requests(tls_server.url)
+    assert tls_server.handshakes == 2
+    gtts_requests = _GttsRequests(pool)
+    for _ in range(3):
+        prepared = requests.Request('POST', tls_server.url, data={'f.req': 'x'}).prepare()
+        with gtts_requests.Session() as session:
+            session.send(request=prepared, verify=False, timeout=5).raise_for_status()
+    assert tls_server.handshakes == 2
+
+    stats, = pool.stats().values()
+    assert stats['warmups'] == 2
+    assert stats['requests'] == 6
+    assert stats['reused'] == 6
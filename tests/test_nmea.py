@@ -0,0 +1,52 @@
+import pytest
+
+from sensors.nmea import ChecksumError, _sample_log, checksum_ok, parse_fix_updates
+
+pynmea2 = pytest.importorskip("pynmea2")
+pytest.importorskip("serial")
+from sensors.gps import _fix_updates  # noqa: E402
+
+
+def sentence(body: str) -> bytes:
+    checksum = 0
+    for char in body.encode():
+        checksum ^= char
+    return f"${body}*{checksum:02X}\r\n".encode()
+
+
+SENTENCES = _sample_log(6) + [
+    # Southern and western hemispheres
+    sentence("GPGGA,002153.000,3342.6618,S,11751.3858,W,1,10,1.2,27.0,M,-34.2,M,,0000"),
+    # No fix yet, position fields empty
+    sentence("GPGGA,002153.000,,,,,0,00,,,M,,M,,"),
+    sentence("GPRMC,002153.000,V,,,,,,,280511,,,N"),
+    # Fractional seconds in the fix time
+    sentence("GPRMC,161229.487,A,3723.2475,N,12158.3416,W,0.13,309.62,120598,,"),
+    sentence("GPVTG,,T,,M,,N,,K,N"),
+    sentence("GPGSA,A,1,,,,,,,,,,,,,,,"),
+]
+
+
+@pytest.mark.parametrize("line", SENTENCES, ids=lambda line: line[1:6].decode())
+def test_matches_pynmea2(line):
+    parsed = parse_fix_updates(line)
+    expected = _fix_updates(pynmea2.parse(line.decode().strip()))
+    if expected is None:
+        assert parsed is None
+    else:
+        sentence_type, updates = parsed
+        assert updates == expected
+
+
+def test_checksum():
+    line = sentence("GNVTG,084.4,T,034.4,M,022.4,N,041.5,K,A")
+    assert checksum_ok(line.strip())[0]
+    corrupted = line.replace(b"084.4", b"084.5", 1)
+    assert not checksum_ok(corrupted.strip())[0]
+    with pytest.raises(ChecksumError):
+        parse_fix_updates(corrupted)
+
+
+def test_truncated_sentence():
+    with pytest.raises(ValueError):
+        parse_fix_updates(sentence("GNGGA,123519.00,4807.03812,N"))
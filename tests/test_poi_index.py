@@ -0,0 +1,98 @@
+import math
+
+import numpy as np
+import pytest
+
+from services.poi_index import PoiIndex, _synthetic_city, iter_osm_pois
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * 6371000.0 * math.asin(math.sqrt(a))
+
+
+def brute_force(pois, lat, lon):
+    """(distance, name) of every point, nearest first"""
+    return sorted((haversine(lat, lon, p_lat, p_lon), name) for name, _, p_lat, p_lon in pois)
+
+
+@pytest.fixture(scope="module")
+def city():
+    pois = list(_synthetic_city(5000))
+    return pois, PoiIndex.build(pois, cell_size=200.0)
+
+
+def queries(count=50, seed=3):
+    rng = np.random.default_rng(seed)
+    return rng.normal([51.5, -0.12], [0.05, 0.07], size=(count, 2))
+
+
+def test_within_matches_brute_force(city):
+    pois, index = city
+    for lat, lon in queries():
+        for radius in (150, 600):
+            expected = [name for distance, name in brute_force(pois, lat, lon) if distance <= radius]
+            found = index.within(lat, lon, radius)
+            assert sorted(p.name for p in found) == sorted(expected)
+            distances = [p.distance for p in found]
+            assert distances == sorted(distances)
+
+
+def test_nearest_matches_brute_force(city):
+    pois, index = city
+    for lat, lon in queries():
+        expected = [(d, name) for d, name in brute_force(pois, lat, lon)[:5] if d <= 2000]
+        found = index.nearest(lat, lon, k=5)
+        assert [p.distance for p in found] == pytest.approx([d for d, _ in expected], abs=1e-3)
+
+
+def test_nearest_respects_max_distance(city):
+    _, index = city
+    assert index.nearest(0.0, 0.0, k=3) == []
+
+
+def test_search_far_from_the_index_origin():
+    # Two points on the same parallel far north of the origin, where the
+    # flat projection squeezes east-west distances the most
+    pois = [("South", "cafe", 0.0, 0.0), ("North", "cafe", 60.0, 0.0),
+            ("North east", "bank", 60.0, 0.009)]
+    index = PoiIndex.build(pois, cell_size=250.0)
+    found = index.within(60.0, 0.0, 600)
+    assert [p.name for p in found] == ["North", "North east"]
+    assert found[1].distance == pytest.approx(haversine(60.0, 0.0, 60.0, 0.009))
+    assert found[1].bearing == pytest.approx(90, abs=0.1)
+
+
+def test_saved_index_loads_memory_mapped(city, tmp_path):
+    pois, index = city
+    index.save(str(tmp_path))
+    loaded = PoiIndex.load(str(tmp_path))
+    assert isinstance(loaded.points, np.memmap)
+    lat, lon = queries(1)[0]
+    assert loaded.nearest(lat, lon, k=5) == index.nearest(lat, lon, k=5)
+
+
+def test_osm_extract_yields_named_pois(tmp_path):
+    path = tmp_path / "extract.osm"
+    path.write_text("""<?xml version="1.0"?>
+<osm>
+  <node id="1" lat="51.5" lon="-0.1">
+    <tag k="name" v="Corner Chemist"/><tag k="healthcare" v="pharmacy"/>
+  </node>
+  <node id="2" lat="51.6" lon="-0.2"><tag k="amenity" v="bench"/></node>
+  <node id="3" lat="51.7" lon="-0.3">
+    <tag k="name" v="Stop A"/><tag k="public_transport" v="platform_stop"/>
+  </node>
+  <way id="4"><nd ref="1"/><tag k="name" v="High Street"/></way>
+</osm>""")
+    assert list(iter_osm_pois(str(path))) == [
+        ("Corner Chemist", "pharmacy", 51.5, -0.1),
+        ("Stop A", "platform stop", 51.7, -0.3),
+    ]
+
+
+def test_empty_build_is_rejected():
+    with pytest.raises(ValueError):
+        PoiIndex.build([])
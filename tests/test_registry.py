@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from services.registry import ResourceRegistry
+
+
+class Resource:
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+        log.append(f"build {name}")
+
+    def close(self):
+        self.log.append(f"close {self.name}")
+
+
+@pytest.fixture
+def log():
+    return []
+
+
+@pytest.fixture
+def registry(log):
+    registry = ResourceRegistry()
+    for name in ("camera", "gemini", "gps"):
+        registry.register(name, lambda name=name: Resource(name, log), close=Resource.close)
+    return registry
+
+
+def test_built_lazily_once(registry, log):
+    assert log == []
+    camera = registry.get("camera")
+    assert registry.get("camera") is camera
+    assert log == ["build camera"]
+    assert "camera" in registry.build_times
+
+
+def test_unknown_resource(registry):
+    with pytest.raises(KeyError):
+        registry.get("radar")
+
+
+def test_peek_never_builds(registry, log):
+    assert registry.peek("gemini") is None
+    assert log == []
+    gemini = registry.get("gemini")
+    assert registry.peek("gemini") is gemini
+
+
+def test_peek_does_not_wait_for_a_build():
+    registry = ResourceRegistry()
+    building = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        building.set()
+        release.wait(5)
+        return object()
+
+    registry.register("gemini", slow)
+    thread = registry.warm(["gemini"])
+    assert building.wait(5)
+    start = time.monotonic()
+    assert registry.peek("gemini") is None
+    assert time.monotonic() - start < 0.1
+    release.set()
+    thread.join(5)
+    assert registry.peek("gemini") is not None
+
+
+def test_get_waits_for_warming_instead_of_building_twice():
+    registry = ResourceRegistry()
+    builds = []
+
+    def slow():
+        builds.append(1)
+        time.sleep(0.2)
+        return object()
+
+    registry.register("camera", slow)
+    registry.warm()
+    time.sleep(0.05)
+    results = []
+    getters = [threading.Thread(target=lambda: results.append(registry.get("camera"))) for _ in range(4)]
+    for getter in getters:
+        getter.start()
+    for getter in getters:
+        getter.join(5)
+    assert len(builds) == 1
+    assert len(set(map(id, results))) == 1
+
+
+def test_warm_reports_failures_and_continues(log, capsys):
+    registry = ResourceRegistry()
+
+    def broken():
+        raise OSError("no camera")
+
+    registry.register("camera", broken)
+    registry.register("gps", lambda: Resource("gps", log))
+    registry.warm().join(5)
+    assert "Error warming camera: no camera" in capsys.readouterr().out
+    assert registry.peek("gps") is not None
+
+
+def test_shutdown_closes_in_reverse_build_order(registry, log):
+    registry.get("gps")
+    registry.get("camera")
+    registry.shutdown()
+    assert log == ["build gps", "build camera", "close camera", "close gps"]
+    assert registry.peek("camera") is None
+    with pytest.raises(RuntimeError):
+        registry.get("gemini")
+
+
+def test_shutdown_continues_after_a_failing_close(log, capsys):
+    registry = ResourceRegistry()
+
+    def failing_close(resource):
+        raise OSError("device busy")
+
+    registry.register("camera", lambda: Resource("camera", log), close=failing_close)
+    registry.register("gps", lambda: Resource("gps", log), close=Resource.close)
+    registry.get("gps")
+    registry.get("camera")
+    registry.shutdown()
+    assert "Error closing camera: device busy" in capsys.readouterr().out
+    assert log[-1] == "close gps"
@@ -0,0 +1,133 @@
+import json
+import os
+import time
+
+import pytest
+
+from services.response_cache import DEFAULT_TTL, ResponseCache, normalize_prompt
+
+
+def write_cache(path, entries):
+    path.write_text(json.dumps(entries))
+    return str(path)
+
+
+def entry(prompt, **overrides):
+    now = time.time()
+    item = {'prompt': prompt, 'text': 'answer', 'created': now, 'expires': now + 60, 'latency': 1.5}
+    item.update(overrides)
+    return item
+
+
+def test_load_skips_bad_entries(tmp_path, capsys):
+    good = entry('what can you do')
+    missing = entry('who made you')
+    del missing['latency']
+    renamed = entry('how do i')
+    renamed['answer'] = renamed.pop('text')
+    path = write_cache(tmp_path / "responses.json", [good, missing, renamed, "not an entry", None])
+
+    cache = ResponseCache(path)
+    assert cache.stats()['entries'] == 1
+    assert cache.lookup('What can you do?').text == 'answer'
+    assert "Skipped 4 unreadable entries" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("content", ['{"prompt": "x"}', '"text"', '42', 'null'])
+def test_load_ignores_non_list(tmp_path, content):
+    path = tmp_path / "responses.json"
+    path.write_text(content)
+    cache = ResponseCache(str(path))
+    assert cache.stats()['entries'] == 0
+
+
+def test_load_ignores_invalid_json(tmp_path):
+    path = tmp_path / "responses.json"
+    path.write_text('[{"prompt": ')
+    assert ResponseCache(str(path)).stats()['entries'] == 0
+
+
+@pytest.mark.parametrize("transcript, normalized", [
+    ("Hey Visio, what can you do?", "what can you do"),
+    ("  WHAT can   you do ", "what can you do"),
+    ("ask visio: who made you!", "who made you"),
+    ("Hey Visio", ""),
+])
+def test_normalize_prompt(transcript, normalized):
+    assert normalize_prompt(transcript) == normalized
+
+
+@pytest.mark.parametrize("prompt, ttl", [
+    ("what is the weather today", None),
+    ("whats the time", None),
+    ("tell me a joke", 3600),
+    ("what is the capital of france", DEFAULT_TTL),
+])
+def test_ttl_policy(tmp_path, prompt, ttl):
+    cache = ResponseCache(str(tmp_path / "responses.json"))
+    assert cache.ttl_for(prompt) == ttl
+
+
+def test_time_sensitive_prompts_bypass_the_cache(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.json"))
+    cache.store("What's the weather today?", "Sunny", latency=2.0)
+    assert cache.lookup("What's the weather today?") is None
+    assert cache.stats()['entries'] == 0
+    assert cache.stats()['bypassed'] == 1
+
+
+def test_hit_counts_saved_time(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.json"))
+    assert cache.lookup("What can you do?") is None
+    cache.store("What can you do?", "I can describe scenes", latency=2.5)
+    assert cache.lookup("hey visio what can you do").text == "I can describe scenes"
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
+    assert stats['saved_seconds'] == 2.5
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "responses.json"))
+    cache.store("Tell me a joke", "Knock knock", latency=1.0)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 3601)
+    assert cache.lookup("Tell me a joke") is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_is_dropped(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.json"), max_entries=2)
+    cache.store("first question", "one", latency=1.0)
+    cache.store("second question", "two", latency=1.0)
+    cache.lookup("first question")
+    cache.store("third question", "three", latency=1.0)
+    assert cache.lookup("second question") is None
+    assert cache.lookup("first question").text == "one"
+
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "cache" / "responses.json")
+    cache = ResponseCache(path, max_entries=2)
+    cache.store("first question", "one", latency=1.0)
+    cache.store("second question", "two", latency=1.5)
+    cache.lookup("first question")  # Now the most recent
+    cache.close()
+    assert not os.path.exists(path + ".tmp")
+
+    reopened = ResponseCache(path, max_entries=2)
+    assert reopened.lookup("second question").latency == 1.5
+    # Recency was kept: first question is older than the second's lookup now
+    reopened.store("third question", "three", latency=1.0)
+    assert reopened.lookup("first question") is None
+
+
+def test_latency_histogram(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.json"))
+    cache.observe(True, 0.03)
+    cache.observe(False, 1.5)
+    cache.observe(False, 30.0)
+    latency = cache.stats()['latency']
+    assert latency['hit']['buckets']['<=0.05s'] == 1
+    assert latency['miss']['buckets']['<=2s'] == 1
+    assert latency['miss']['buckets']['>8s'] == 1
+    assert latency['miss']['mean'] == pytest.approx(15.75)
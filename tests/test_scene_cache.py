@@ -0,0 +1,79 @@
+import time
+
+import numpy as np
+import pytest
+
+from services.scene_cache import SceneCache, dhash, hamming_distance
+
+PROMPT = "Describe the scene"
+
+
+def scene(seed=0, height=120, width=160):
+    """A smooth random scene: blurred noise, so small changes stay small"""
+    rng = np.random.default_rng(seed)
+    coarse = rng.integers(0, 256, (6, 8, 3)).astype(np.float32)
+    return np.kron(coarse, np.ones((height // 6, width // 8, 1))).astype(np.uint8)
+
+
+def test_hash_size():
+    assert dhash(scene()) < 1 << 64
+    assert dhash(scene(), hash_size=16) < 1 << 256
+
+
+def test_hamming_distance():
+    assert hamming_distance(0b1011, 0b1011) == 0
+    assert hamming_distance(0b1011, 0b0110) == 3
+
+
+def test_same_scene_hashes_close():
+    frame = scene()
+    rng = np.random.default_rng(1)
+    # Sensor noise and a slight exposure change
+    noisy = np.clip(frame * 1.05 + rng.normal(0, 4, frame.shape), 0, 255).astype(np.uint8)
+    assert hamming_distance(dhash(frame), dhash(noisy)) <= 6
+    # Grayscale and RGB versions of a frame hash alike
+    gray = frame @ np.array([0.299, 0.587, 0.114])
+    assert hamming_distance(dhash(frame), dhash(gray)) <= 2
+
+
+def test_different_scenes_hash_far():
+    assert hamming_distance(dhash(scene(0)), dhash(scene(2))) > 16
+
+
+@pytest.mark.parametrize("distance, hit", [(0, True), (6, True), (7, False)])
+def test_lookup_threshold(distance, hit):
+    cache = SceneCache(max_distance=6)
+    base = 0xFFFF_0000_FFFF_0000
+    cache.store(base, PROMPT, "A kitchen", latency=2.0)
+    nearby = base ^ ((1 << distance) - 1)  # Flip the lowest `distance` bits
+    entry = cache.lookup(nearby, PROMPT)
+    assert (entry is not None) == hit
+    assert cache.stats()['saved_seconds'] == (2.0 if hit else 0.0)
+
+
+def test_lookup_prefers_closest_and_matches_prompt():
+    cache = SceneCache(max_distance=6)
+    cache.store(0b1111, PROMPT, "far", latency=1.0)
+    cache.store(0b0001, PROMPT, "near", latency=1.0)
+    cache.store(0b0000, "Which note is this?", "other prompt", latency=1.0)
+    assert cache.lookup(0b0000, PROMPT).text == "near"
+    assert cache.lookup(0b0000, "Read the text") is None
+
+
+def test_expired_entries_are_dropped(monkeypatch):
+    cache = SceneCache(ttl=10)
+    cache.store(1, PROMPT, "A kitchen", latency=1.0)
+    now = time.time()
+    monkeypatch.setattr("services.scene_cache.time.time", lambda: now + 11)
+    assert cache.lookup(1, PROMPT) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_max_entries_and_empty_answers():
+    cache = SceneCache(max_entries=2)
+    cache.store(1, PROMPT, "   ", latency=1.0)
+    assert cache.stats()['entries'] == 0
+    for frame_hash in (0, 0xFFFF, 0xFFFF << 16):  # 16 bits apart
+        cache.store(frame_hash, PROMPT, "answer", latency=1.0)
+    assert cache.stats()['entries'] == 2
+    assert cache.lookup(0, PROMPT) is None  # Oldest was dropped
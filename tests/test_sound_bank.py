@@ -0,0 +1,77 @@
+import pytest
+
+pytest.importorskip("pygame")
+from services import sound_bank  # noqa: E402
+from services.sound_bank import SoundBank  # noqa: E402
+
+
+class FakeSound:
+    def __init__(self, path):
+        self.path = path
+
+
+class FakeChannel:
+    def __init__(self, index):
+        self.index = index
+        self.playing = None
+        self.loops = 0
+
+    def play(self, sound, loops=0):
+        self.playing, self.loops = sound, loops
+
+    def fadeout(self, ms):
+        self.playing = None
+
+    def stop(self):
+        self.playing = None
+
+
+@pytest.fixture
+def bank(tmp_path, monkeypatch):
+    for name in ("capture.mp3", "loading.wav", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    mixer = sound_bank.pygame.mixer
+    monkeypatch.setattr(mixer, "get_init", lambda: (44100, -16, 2))
+    monkeypatch.setattr(mixer, "set_reserved", lambda count: count)
+    monkeypatch.setattr(mixer, "Channel", FakeChannel)
+    monkeypatch.setattr(mixer, "Sound", FakeSound)
+    bank = SoundBank(str(tmp_path), mixer_buffer=441)
+    yield bank
+    bank.close()
+
+
+def test_audio_files_become_cues(bank):
+    assert sorted(bank.sounds) == ["capture", "loading"]
+    assert bank.cue_channel.index == SoundBank.CUE_CHANNEL
+    assert bank.loop_channel.index == SoundBank.LOOP_CHANNEL
+
+
+def test_cues_are_counted_and_timed(bank, capsys):
+    for _ in range(300):
+        bank.play("capture")
+    bank.play("missing")
+    assert "Unknown sound: missing" in capsys.readouterr().out
+    assert bank.cue_channel.playing is bank.sounds["capture"]
+    stats = bank.stats()
+    assert stats['cues'] == 300
+    assert len(bank.cue_latencies) == 256  # Recent cues only
+    assert 0 <= stats['mean_call_ms'] <= stats['max_call_ms']
+    assert stats['buffer_ms'] == 10
+
+
+def test_no_latency_before_the_first_cue(bank):
+    assert bank.stats() == {'cues': 0, 'mean_call_ms': None, 'max_call_ms': None, 'buffer_ms': 10}
+
+
+def test_nested_loops_stop_with_the_outermost(bank):
+    with bank.working():
+        assert bank.loop_channel.playing is bank.sounds["loading"]
+        assert bank.loop_channel.loops == -1
+        with bank.working():
+            pass
+        assert bank.loop_channel.playing is not None
+        bank.play("capture")  # A cue does not touch the loop
+        assert bank.loop_channel.playing is not None
+    assert bank.loop_channel.playing is None
+    bank.stop_loop()  # Nothing looping, no effect
+    assert bank._loop_depth == 0
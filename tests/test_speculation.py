@@ -0,0 +1,65 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.speculation import Speculator
+
+
+@pytest.fixture
+def speculator():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield Speculator(executor)
+    executor.shutdown(wait=True)
+
+
+def test_claim_returns_the_result(speculator):
+    assert speculator.start(lambda: "frame")
+    time.sleep(0.05)  # Finished before it is claimed
+    assert speculator.claim() == "frame"
+    stats = speculator.stats()
+    assert (stats['started'], stats['hits'], stats['wasted'], stats['hit_rate']) == (1, 1, 0, 1.0)
+    assert stats['saved_seconds'] < 0.05
+
+
+def test_claim_waits_for_running_work(speculator):
+    speculator.start(lambda: time.sleep(0.2) or "frame")
+    time.sleep(0.1)
+    assert speculator.claim(timeout=1) == "frame"
+    # Only the time it ran before the claim was saved
+    assert speculator.stats()['saved_seconds'] == pytest.approx(0.1, abs=0.05)
+
+
+def test_claim_without_work(speculator):
+    assert speculator.claim() is None
+    assert speculator.stats()['hits'] == 0
+
+
+def test_only_one_pending(speculator):
+    release = threading.Event()
+    assert speculator.start(lambda: release.wait(1) and "first")
+    assert not speculator.start(lambda: "second")
+    release.set()
+    assert speculator.claim() == "first"
+    assert speculator.start(lambda: "third")
+    assert speculator.claim() == "third"
+
+
+def test_discard(speculator):
+    speculator.start(lambda: "frame")
+    speculator.discard()
+    speculator.discard()  # Nothing pending, not counted again
+    assert speculator.claim() is None
+    stats = speculator.stats()
+    assert (stats['hits'], stats['wasted'], stats['hit_rate']) == (0, 1, 0.0)
+
+
+def test_failed_work_counts_as_wasted(speculator, capsys):
+    def broken():
+        raise OSError("camera busy")
+
+    speculator.start(broken)
+    assert speculator.claim() is None
+    assert "camera busy" in capsys.readouterr().out
+    assert speculator.stats()['wasted'] == 1
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from sensors.temperature import DHT11Sensor, Reading
+
+
+class FakeDHT:
+    """Plays back scripted samples; (temperature, humidity), None or an exception"""
+
+    def __init__(self, samples):
+        self.samples = list(samples)
+        self.current = None
+        self.reads = 0
+        self.exhausted = threading.Event()
+
+    @property
+    def temperature(self):
+        self.reads += 1
+        if not self.samples:
+            self.exhausted.set()
+            raise RuntimeError("Checksum did not validate. Try again.")
+        self.current = self.samples.pop(0)
+        if isinstance(self.current, Exception):
+            raise self.current
+        return None if self.current is None else self.current[0]
+
+    @property
+    def humidity(self):
+        return None if self.current is None else self.current[1]
+
+    def exit(self):
+        pass
+
+
+class History:
+    def __init__(self):
+        self.rows = []
+
+    def append(self, timestamp, temperature, humidity):
+        self.rows.append((temperature, humidity))
+
+
+def sampled(samples, interval=0.01, window=5, retries=1, history=None):
+    """A sensor sampling in the background until the script runs out"""
+    fake = FakeDHT(samples)
+    sensor = DHT11Sensor(sensor=fake, history=history)
+    sensor.min_interval = interval
+    sensor.start_background(interval=interval, window=window, retries=retries)
+    assert fake.exhausted.wait(5)
+    return sensor
+
+
+def test_median_filters_outliers():
+    history = History()
+    sensor = sampled([(20, 40), (21, 41), (35, 90), (22, 42), (23, 43)], history=history)
+    try:
+        # Median of the window, so the 35 degree spike never shows
+        assert [t for t, _ in history.rows] == [20, 20.5, 21, 21.5, 22]
+        assert sensor.latest.temperature == 22
+        assert sensor.latest.humidity == 42
+        assert sensor.read_sensor() == (22, 42)
+    finally:
+        sensor.close()
+
+
+def test_implausible_and_failed_samples_are_skipped():
+    samples = [(20, 40), (99, 40), (20, 140), None, OSError("timeout"), (22, 44)]
+    sensor = sampled(samples)
+    try:
+        assert sensor.sample_stats['samples'] == 2
+        assert sensor.sample_stats['rejected'] == 2
+        assert sensor.sample_stats['failures'] >= 2
+        assert sensor.latest.temperature == 21
+    finally:
+        sensor.close()
+
+
+def test_reading_goes_stale_when_the_sensor_stops_answering():
+    sensor = sampled([(20, 40)], interval=0.05, retries=1)
+    try:
+        # Three intervals plus one round of retries
+        assert sensor.max_age == pytest.approx(0.2)
+        assert sensor.fresh_reading() is not None
+        time.sleep(sensor.max_age + 0.05)
+        assert sensor.fresh_reading() is None
+        assert sensor.read_sensor() == (None, None)
+        assert sensor.latest.temperature == 20  # Still kept, for the log
+    finally:
+        sensor.close()
+
+
+def test_no_reading_before_the_first_sample():
+    sensor = DHT11Sensor(sensor=FakeDHT([]))
+    assert sensor.fresh_reading() is None
+    assert sensor.latest is None
+
+
+def test_stale_reading_age():
+    reading = Reading(20, 40, time.time() - 30)
+    assert reading.age == pytest.approx(30, abs=1)
+
+
+def test_direct_reads_are_rate_limited():
+    fake = FakeDHT([(20, 40), (25, 45)])
+    sensor = DHT11Sensor(sensor=fake)
+    assert sensor.read_sensor() == (20, 40)
+    # Within min_interval the last values are returned without a read
+    assert sensor.read_sensor() == (20, 40)
+    assert fake.reads == 1
+    assert sensor.get_fahrenheit() == 68
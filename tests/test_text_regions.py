@@ -0,0 +1,78 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from services.text_regions import estimate_skew, find_text_regions, otsu_threshold, prepare_text_upload
+
+
+def page(lines, size=(640, 480)):
+    """Gray page with rows of dark glyph-like strokes, lines as (x, y, words)"""
+    img = Image.new('L', size, 200)
+    draw = ImageDraw.Draw(img)
+    for x, y, words in lines:
+        for _ in range(words):
+            for stroke in range(6):
+                draw.rectangle((x + stroke * 5, y, x + stroke * 5 + 1, y + 14), fill=30)
+            x += 40
+    return img
+
+
+def rgb(img):
+    return np.asarray(img.convert('RGB'))
+
+
+def inside(box, outer):
+    return box[0] >= outer[0] and box[1] >= outer[1] and box[2] <= outer[2] and box[3] <= outer[3]
+
+
+def test_text_lines_are_found_and_the_border_is_not():
+    img = page([(100, 100, 6), (100, 300, 3)])
+    ImageDraw.Draw(img).line((20, 0, 20, 479), fill=0, width=3)
+    regions = find_text_regions(rgb(img))
+    assert len(regions) == 2
+    # Largest first, each covering its line with a small margin
+    long_line, short_line = regions
+    assert inside((100, 100, 335, 115), long_line) and inside(long_line, (70, 70, 370, 145))
+    assert inside((100, 300, 215, 315), short_line) and inside(short_line, (70, 270, 250, 345))
+
+
+def test_regions_map_back_to_full_resolution():
+    small = find_text_regions(rgb(page([(100, 100, 6)])))
+    large = find_text_regions(rgb(page([(100, 100, 6)]).resize((1280, 960), Image.NEAREST)))
+    assert large == [pytest.approx(tuple(2 * v for v in small[0]), abs=2)]
+
+
+def test_blank_frame_has_no_upload():
+    assert find_text_regions(np.full((480, 640, 3), 200, np.uint8)) == []
+    assert prepare_text_upload(np.full((480, 640, 3), 200, np.uint8)) is None
+
+
+def test_upload_is_a_small_bilevel_png():
+    frame = rgb(page([(100, 100, 6), (100, 300, 3)]))
+    upload = prepare_text_upload(frame)
+    assert upload.mime_type == 'image/png'
+    assert len(upload.regions) == 2
+    with Image.open(io.BytesIO(upload.data)) as mosaic:
+        assert mosaic.mode == '1'
+        # Both crops stacked, narrower than the frame
+        assert mosaic.width < frame.shape[1]
+        assert mosaic.height > 2 * 30
+
+
+def test_page_filling_text_is_not_cropped():
+    frame = rgb(page([(20, y, 15) for y in range(20, 460, 24)]))
+    assert find_text_regions(frame)
+    assert prepare_text_upload(frame) is None
+
+
+@pytest.mark.parametrize("angle", [0, 4, -6])
+def test_skew_estimate_levels_rotated_text(angle):
+    binary = page([(20, 40, 5), (20, 70, 5), (20, 100, 5)], (260, 160)).point(lambda v: 255 if v > 100 else 0)
+    assert estimate_skew(binary.rotate(angle, fillcolor=255)) == pytest.approx(-angle, abs=0.5)
+
+
+def test_otsu_splits_ink_from_paper():
+    threshold = otsu_threshold(np.asarray(page([(20, 40, 5)], (260, 160))))
+    assert 30 <= threshold < 200
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pytest
+
+from services.timeseries import TimeSeriesStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "history" / "climate.vts")
+
+
+def store(path, capacity=10, **kwargs):
+    return TimeSeriesStore(path, ["temperature", "humidity"], capacity=capacity, **kwargs)
+
+
+def test_append_and_query(path):
+    ts = store(path)
+    assert ts.latest() is None
+    for t in range(5):
+        ts.append(100.0 + t, 20.0 + t, 50.0)
+    assert len(ts) == 5
+    assert list(ts.query()['t']) == [100, 101, 102, 103, 104]
+    # start inclusive, end exclusive
+    assert list(ts.query(101, 103)['t']) == [101, 102]
+    assert ts.latest()['temperature'] == 24.0
+
+
+def test_ring_wraps_oldest_first(path):
+    ts = store(path, capacity=4)
+    for t in range(7):
+        ts.append(float(t), float(t), 0.0)
+    assert len(ts) == 4
+    assert list(ts.query()['t']) == [3, 4, 5, 6]
+    # Ranges that span the wrap point
+    assert list(ts.query(4, 6)['t']) == [4, 5]
+    assert list(ts.query(start=5)['temperature']) == [5, 6]
+    assert len(ts.query(10, 20)) == 0
+
+
+def test_extend_across_the_wrap_and_past_capacity(path):
+    ts = store(path, capacity=4)
+    ts.append(0.0, 0.0, 0.0)
+    ts.append(1.0, 1.0, 0.0)
+    ts.extend(np.arange(2.0, 5.0), np.column_stack([np.arange(2.0, 5.0), np.zeros(3)]))
+    assert list(ts.query()['t']) == [1, 2, 3, 4]
+    ts.extend(np.arange(10.0, 20.0), np.zeros((10, 2)))
+    assert list(ts.query()['t']) == [16, 17, 18, 19]
+
+
+def test_reopen_continues(path):
+    ts = store(path, capacity=4)
+    for t in range(6):
+        ts.append(float(t), float(t), 0.0)
+    ts.close()
+
+    reopened = store(path, capacity=4)
+    assert list(reopened.query()['t']) == [2, 3, 4, 5]
+    reopened.append(6.0, 6.0, 0.0)
+    assert list(reopened.query()['t']) == [3, 4, 5, 6]
+
+
+def test_incompatible_file_is_moved_aside(path, capsys):
+    store(path, capacity=4).append(1.0, 1.0, 1.0)
+    other = TimeSeriesStore(path, ["latitude", "longitude"], capacity=4)
+    assert len(other) == 0
+    assert os.path.exists(path + ".old")
+    assert "does not match" in capsys.readouterr().out
+
+
+def test_downsample(path):
+    ts = store(path, capacity=100)
+    for t in range(10):
+        ts.append(float(t), float(t), 0.0)
+    buckets = ts.downsample("temperature", 4)
+    assert list(buckets.start) == [0, 4, 8]
+    assert list(buckets.min) == [0, 4, 8]
+    assert list(buckets.max) == [3, 7, 9]
+    assert list(buckets.mean) == [1.5, 5.5, 8.5]
+    assert list(buckets.count) == [4, 4, 2]
+
+
+def test_downsample_skips_empty_buckets_and_honours_start(path):
+    ts = store(path, capacity=100)
+    for t in (1.0, 2.0, 11.0):
+        ts.append(t, t, 0.0)
+    buckets = ts.downsample("temperature", 5, start=0.0)
+    assert list(buckets.start) == [0, 10]
+    assert list(buckets.count) == [2, 1]
+    assert len(ts.downsample("temperature", 5, start=50.0).start) == 0
@@ -0,0 +1,86 @@
+import os
+
+import pytest
+
+pytest.importorskip("gtts")
+from services import tts_cache  # noqa: E402
+from services.tts_cache import TTSCache  # noqa: E402
+
+
+class FakeTTS:
+    """Stands in for gTTS, writing a fixed number of bytes per phrase"""
+
+    size = 100
+    calls = []
+    fail_after = None  # Bytes written before raising, like a dropped connection
+
+    def __init__(self, text, lang="en", slow=False):
+        self.text = text
+        FakeTTS.calls.append(text)
+
+    def write_to_fp(self, fp):
+        if FakeTTS.fail_after is not None:
+            fp.write(b"x" * FakeTTS.fail_after)
+            raise ConnectionError("connection dropped")
+        fp.write(b"x" * FakeTTS.size)
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    FakeTTS.calls = []
+    FakeTTS.fail_after = None
+    monkeypatch.setattr(tts_cache, "gTTS", FakeTTS)
+    return str(tmp_path / "tts")
+
+
+def test_hit_after_miss(cache_dir):
+    cache = TTSCache(cache_dir)
+    first = cache.get_or_synthesize("Hello there")
+    second = cache.get_or_synthesize("  Hello there ")
+    assert first == second
+    assert FakeTTS.calls == ["Hello there"]
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1, "bytes": 100}
+
+
+def test_key_includes_language_and_speed():
+    keys = {TTSCache.make_key("hola"), TTSCache.make_key("hola", "es"), TTSCache.make_key("hola", slow=True)}
+    assert len(keys) == 3
+
+
+def test_evicts_least_recently_used(cache_dir):
+    cache = TTSCache(cache_dir, max_bytes=250)
+    a = cache.get_or_synthesize("a")
+    b = cache.get_or_synthesize("b")
+    assert cache.get("a") == a  # a is now the most recent
+    c = cache.get_or_synthesize("c")
+    assert not os.path.exists(b)
+    assert os.path.exists(a) and os.path.exists(c)
+    assert cache.get("b") is None
+    assert cache.stats()["bytes"] == 200
+
+
+def test_lru_order_survives_restart(cache_dir):
+    cache = TTSCache(cache_dir, max_bytes=250)
+    a = cache.get_or_synthesize("a")
+    b = cache.get_or_synthesize("b")
+    os.utime(b, (1, 1))  # b was used long ago
+    os.utime(a, (2, 2))
+
+    reopened = TTSCache(cache_dir, max_bytes=250)
+    assert reopened.stats()["entries"] == 2
+    reopened.get_or_synthesize("c")
+    assert os.path.exists(a)
+    assert not os.path.exists(b)
+
+
+def test_failed_synthesis_leaves_no_partial_file(cache_dir):
+    cache = TTSCache(cache_dir)
+    FakeTTS.fail_after = 40
+    with pytest.raises(ConnectionError):
+        cache.get_or_synthesize("cut off")
+    assert os.listdir(cache_dir) == []
+    assert cache.get("cut off") is None
+
+    FakeTTS.fail_after = None
+    path = cache.get_or_synthesize("cut off")
+    assert os.path.getsize(path) == FakeTTS.size
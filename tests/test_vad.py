@@ -0,0 +1,123 @@
+import threading
+import wave
+
+import numpy as np
+import pytest
+
+from services.vad import EnergyVad
+
+pytest.importorskip("aiohttp")
+from services.wit import WavFileStream, WitAiClient  # noqa: E402
+
+RATE = 16000
+CHUNK = 1024  # Frames per read, as WitAiClient records
+TOLERANCE = 2 * CHUNK / RATE
+
+
+def write_wav(path, *segments):
+    """Write 16-bit mono PCM made of (kind, seconds) segments, returning the PCM"""
+    rng = np.random.default_rng(0)
+    parts = []
+    for kind, seconds in segments:
+        n = int(seconds * RATE)
+        t = np.arange(n) / RATE
+        if kind == "silence":
+            samples = rng.normal(0, 30, n)  # Quiet room noise
+        elif kind == "speech":
+            # Voiced sound: a low fundamental with harmonics
+            samples = sum(3000 / k * np.sin(2 * np.pi * 160 * k * t) for k in (1, 2, 3))
+        elif kind == "hiss":
+            samples = rng.normal(0, 2000, n)  # Loud but broadband
+        parts.append(samples)
+    pcm = np.clip(np.concatenate(parts), -32768, 32767).astype(np.int16).tobytes()
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(RATE)
+        wav.writeframes(pcm)
+    return pcm
+
+
+def record(tmp_path, vad, *segments, timeout=None, realtime=False):
+    """
+    Record a generated WAV file through WitAiClient with the VAD
+
+    Returns:
+        (source PCM, recorded PCM, whether the recording stopped by itself)
+    """
+    source = write_wav(tmp_path / "input.wav", *segments)
+    # Nothing listens on the discard port, so warming the upload connection fails fast
+    client = WitAiClient("test-key", temp_dir=str(tmp_path), api_url="http://127.0.0.1:9/speech", vad=vad,
+                         input_stream_factory=lambda: WavFileStream(str(tmp_path / "input.wav"), realtime))
+    auto_stopped = threading.Event()
+    client.record(timeout=timeout, on_auto_stop=auto_stopped.set)
+    stopped = auto_stopped.wait(5.0)
+    with wave.open(client.stop(), "rb") as wav:
+        recorded = wav.readframes(wav.getnframes())
+    return source, recorded, stopped
+
+
+def seconds(pcm):
+    return len(pcm) / 2 / RATE
+
+
+def test_features():
+    silence = np.zeros(CHUNK, dtype=np.int16).tobytes()
+    assert EnergyVad.features(silence) == (0.0, 0.0)
+    assert EnergyVad.features(b"") == (0.0, 0.0)
+    # A full-scale square wave flipping every sample crosses zero each sample
+    square = np.tile(np.array([10000, -10000], dtype=np.int16), CHUNK // 2).tobytes()
+    rms, zcr = EnergyVad.features(square)
+    assert rms == pytest.approx(10000)
+    assert zcr == pytest.approx(1.0, abs=0.01)
+
+
+def test_trims_leading_silence_and_stops_after_speech(tmp_path):
+    vad = EnergyVad(rate=RATE)
+    source, recorded, stopped = record(tmp_path, vad, ("silence", 1.0), ("speech", 1.0), ("silence", 2.0))
+
+    assert stopped
+    assert vad.speech_seconds == pytest.approx(1.0, abs=TOLERANCE)
+    assert vad.trimmed_seconds == pytest.approx(1.0 - vad.pre_roll, abs=TOLERANCE)
+    # Pre-roll, the speech and trailing_silence of what followed
+    assert seconds(recorded) == pytest.approx(vad.pre_roll + 1.0 + vad.trailing_silence, abs=TOLERANCE)
+    # The recording is one unbroken slice of the input, starting in the pre-roll
+    start = source.find(recorded[:4096])
+    assert seconds(source[:start]) == pytest.approx(vad.trimmed_seconds, abs=TOLERANCE)
+    assert source[start:start + len(recorded)] == recorded
+
+
+def test_silence_never_starts(tmp_path):
+    vad = EnergyVad(rate=RATE)
+    _, recorded, stopped = record(tmp_path, vad, ("silence", 1.0), timeout=0.3, realtime=True)
+    assert stopped  # By the timeout, not the VAD
+    assert not vad.speech_started
+    # Only the rolling pre-roll is held while waiting for speech
+    assert len(recorded) <= vad.pre_roll_bytes
+
+
+def test_hiss_is_not_speech(tmp_path):
+    vad = EnergyVad(rate=RATE)
+    record(tmp_path, vad, ("hiss", 1.0), timeout=0.3, realtime=True)
+    assert not vad.speech_started
+
+
+def test_short_blip_does_not_end_recording(tmp_path):
+    vad = EnergyVad(rate=RATE, min_speech=0.5)
+    _, recorded, stopped = record(tmp_path, vad, ("silence", 0.5), ("speech", 0.1), ("silence", 1.5),
+                                  timeout=1.6, realtime=True)
+    assert vad.speech_started
+    assert vad.speech_seconds < vad.min_speech
+    # Still recording after the blip and trailing_silence, until the timeout
+    assert stopped
+    assert vad.silence_seconds > vad.trailing_silence
+    assert seconds(recorded) == pytest.approx(1.6 - vad.trimmed_seconds, abs=TOLERANCE)
+
+
+def test_reset():
+    vad = EnergyVad(rate=RATE)
+    speech = (3000 * np.sin(2 * np.pi * 160 * np.arange(CHUNK) / RATE)).astype(np.int16).tobytes()
+    assert vad.update(speech) == (True, False)
+    vad.reset()
+    assert not vad.speech_started
+    assert vad.speech_seconds == vad.silence_seconds == vad.trimmed_seconds == 0.0
@@ -0,0 +1,157 @@
+import json
+import threading
+import time
+import wave
+
+import numpy as np
+import pytest
+
+pytest.importorskip("aiohttp")
+from aiohttp import web  # noqa: E402
+
+from services.aio import get_runner  # noqa: E402
+from services.wit import (  # noqa: E402
+    IntentType,
+    WavFileStream,
+    WitAiClient,
+    WitEventType,
+    WitStreamDecoder,
+    iter_wit_events,
+    iter_wit_objects,
+    parse_wit_respose,
+)
+
+RESPONSE = [
+    {"type": "PARTIAL_TRANSCRIPTION", "text": "what's"},
+    {"type": "PARTIAL_UNDERSTANDING", "text": "what's the temperature",
+     "intents": [{"name": "wit$get_temperature", "confidence": 0.91}]},
+    {"type": "FINAL_UNDERSTANDING", "text": "what's the temperature «here»",
+     "intents": [{"name": "wit$get_temperature", "confidence": 0.97}], "entities": {}},
+]
+BODY = "\r\n".join(json.dumps(obj, ensure_ascii=False, indent=2) for obj in RESPONSE).encode()
+
+
+def chunked(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, len(BODY)])
+def test_decoder_any_chunking(size):
+    # Single-byte chunks split the multi-byte « » characters too
+    assert list(iter_wit_objects(chunked(BODY, size))) == RESPONSE
+
+
+def test_decoder_yields_objects_as_they_complete():
+    decoder = WitStreamDecoder()
+    first = json.dumps(RESPONSE[0]).encode()
+    assert decoder.feed(first[:-1]) == []
+    assert decoder.feed(first[-1:] + b"\n") == [RESPONSE[0]]
+    assert decoder.feed(b"") == []
+
+
+def test_decoder_reports_trailing_data(capsys):
+    decoder = WitStreamDecoder()
+    decoder.feed(b'{"text": "unfinished')
+    decoder.close()
+    assert "trailing data" in capsys.readouterr().out
+
+
+def test_events():
+    events = list(iter_wit_events(chunked(BODY, 16)))
+    assert [event.type for event in events] == [
+        WitEventType.PARTIAL_TRANSCRIPTION,
+        WitEventType.PARTIAL_UNDERSTANDING,
+        WitEventType.FINAL_UNDERSTANDING,
+    ]
+    assert events[0].intent is None and events[0].confidence == 0.0
+    assert events[1].intent == IntentType.TEMPERATURE
+    assert events[1].confidence == pytest.approx(0.91)
+    assert events[2].text == "what's the temperature «here»"
+
+
+def test_unknown_event_and_intent():
+    body = json.dumps({"type": "SOMETHING_NEW", "intents": [{"name": "not_an_intent", "confidence": 0.5}]})
+    event, = iter_wit_events([body.encode()])
+    assert event.type == WitEventType.UNKNOWN
+    assert event.intent is None
+    assert event.confidence == 0.5
+
+
+def test_parse_wit_response_returns_last_object():
+    assert parse_wit_respose(BODY.decode()) == RESPONSE[-1]
+    assert parse_wit_respose("") == {}
+
+
+class SpeechStandIn:
+    """Local Wit.ai speech endpoint that records when body bytes arrive"""
+
+    def __init__(self):
+        self.first_chunk_at = None
+        self.first_chunk = threading.Event()
+        self.body = bytearray()
+        self.headers = None
+
+    async def handle(self, request):
+        self.headers = dict(request.headers)
+        async for chunk in request.content.iter_any():
+            if self.first_chunk_at is None:
+                self.first_chunk_at = time.time()
+                self.first_chunk.set()
+            self.body += chunk
+        return web.Response(body=BODY, content_type='application/json')
+
+
+@pytest.fixture
+def stand_in():
+    runner = get_runner()
+    handler = SpeechStandIn()
+
+    async def start():
+        app = web.Application()
+        app.router.add_post('/speech', handler.handle)
+        app_runner = web.AppRunner(app)
+        await app_runner.setup()
+        site = web.TCPSite(app_runner, '127.0.0.1', 0)
+        await site.start()
+        return app_runner, site._server.sockets[0].getsockname()[1]
+
+    app_runner, port = runner.run(start())
+    handler.url = f"http://127.0.0.1:{port}/speech"
+    yield handler
+    runner.run(app_runner.cleanup())
+
+
+@pytest.fixture
+def speech_wav(tmp_path):
+    t = np.arange(16000) / 16000
+    pcm = (3000 * np.sin(2 * np.pi * 160 * t)).astype(np.int16)
+    path = tmp_path / "speech.wav"
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(pcm.tobytes())
+    return str(path)
+
+
+def test_audio_is_uploaded_while_recording(stand_in, speech_wav, tmp_path):
+    client = WitAiClient("test-key", temp_dir=str(tmp_path), streaming=True, api_url=stand_in.url,
+                         input_stream_factory=lambda: WavFileStream(speech_wav, realtime=True))
+    client.record()
+    assert stand_in.first_chunk.wait(2.0)
+    time.sleep(0.3)
+    stop_called = time.time()
+    audio_file = client.stop()
+
+    # The first audio reached the server while recording was still running
+    assert stand_in.first_chunk_at < stop_called
+    assert stand_in.headers['Transfer-Encoding'] == 'chunked'
+    assert stand_in.headers['Content-Type'].startswith('audio/raw;encoding=signed-integer;bits=16')
+
+    intent, data, transcript, result = client.process_audio(audio_file)
+    assert intent == IntentType.TEMPERATURE
+    assert transcript == RESPONSE[-1]['text']
+    assert result == RESPONSE[-1]
+    # Everything recorded was uploaded, and nothing else
+    with wave.open(audio_file, 'rb') as wav:
+        assert bytes(stand_in.body) == wav.readframes(wav.getnframes())